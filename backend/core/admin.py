@@ -13,8 +13,11 @@ from .models import (
     Caixa,
     MovimentacaoCaixa,
     Alerta,
+    NotificacaoAlerta,
     Lote,
 )
+from .services.cache_service import CacheService
+from .services.lote_service import LoteService
 
 
 @admin.register(Cliente)
@@ -33,9 +36,10 @@ class ClienteAdmin(admin.ModelAdmin):
     list_editable = ["ativo"]
 
     def saldo_devedor(self, obj):
-        return f"R$ {obj.saldo_devedor():.2f}"
+        return f"R$ {obj.saldo_em_aberto:.2f}"
 
     saldo_devedor.short_description = "Saldo Devedor"
+    saldo_devedor.admin_order_field = "saldo_em_aberto"
 
 
 @admin.register(Fornecedor)
@@ -164,6 +168,15 @@ class CaixaAdmin(admin.ModelAdmin):
         "valor_final_sistema",
         "diferenca",
         "status",
+        # Contadores mantidos pelas vendas e movimentações
+        "total_dinheiro",
+        "total_debito",
+        "total_credito",
+        "total_pix",
+        "total_fiado",
+        "total_vendas",
+        "total_sangrias",
+        "total_suprimentos",
     ]
     inlines = [MovimentacaoCaixaInline]
 
@@ -225,6 +238,7 @@ class AlertaAdmin(admin.ModelAdmin):
 
     def marcar_como_lido(self, request, queryset):
         count = queryset.update(lido=True)
+        CacheService.invalidar("alertas")
         self.message_user(request, f"{count} alerta(s) marcado(s) como lido(s).")
 
     marcar_como_lido.short_description = "Marcar como lido"
@@ -233,11 +247,33 @@ class AlertaAdmin(admin.ModelAdmin):
         from django.utils import timezone
 
         count = queryset.update(resolvido=True, resolvido_em=timezone.now())
+        CacheService.invalidar("alertas")
         self.message_user(request, f"{count} alerta(s) marcado(s) como resolvido(s).")
 
     marcar_como_resolvido.short_description = "Marcar como resolvido"
 
 
+@admin.register(NotificacaoAlerta)
+class NotificacaoAlertaAdmin(admin.ModelAdmin):
+    list_display = ["alerta", "destinatario", "status", "tentativas", "proxima_tentativa", "enviada_em"]
+    list_filter = ["status", "created_at"]
+    search_fields = ["destinatario", "alerta__titulo"]
+    readonly_fields = ["created_at", "enviada_em", "ultimo_erro"]
+    raw_id_fields = ["alerta"]
+
+    actions = ["reenviar"]
+
+    def reenviar(self, request, queryset):
+        from django.utils import timezone
+
+        count = queryset.exclude(status="ENVIADA").update(
+            status="PENDENTE", tentativas=0, proxima_tentativa=timezone.now()
+        )
+        self.message_user(request, f"{count} notificação(ões) recolocada(s) na fila.")
+
+    reenviar.short_description = "Recolocar na fila"
+
+
 @admin.register(Lote)
 class LoteAdmin(admin.ModelAdmin):
     list_display = [
@@ -319,12 +355,18 @@ class LoteAdmin(admin.ModelAdmin):
 
     def desativar_lotes(self, request, queryset):
         count = queryset.update(ativo=False)
+        # update() não dispara os signals que mantêm Produto.usa_lotes
+        LoteService.atualizar_usa_lotes(set(queryset.values_list("produto_id", flat=True)))
+        CacheService.invalidar("estoque")
         self.message_user(request, f"{count} lote(s) desativado(s).")
 
     desativar_lotes.short_description = "Desativar lotes selecionados"
 
     def ativar_lotes(self, request, queryset):
         count = queryset.update(ativo=True)
+        # update() não dispara os signals que mantêm Produto.usa_lotes
+        LoteService.atualizar_usa_lotes(set(queryset.values_list("produto_id", flat=True)))
+        CacheService.invalidar("estoque")
         self.message_user(request, f"{count} lote(s) ativado(s).")
 
     ativar_lotes.short_description = "Ativar lotes selecionados"
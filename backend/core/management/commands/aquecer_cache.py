@@ -0,0 +1,44 @@
+"""
+Management command para aquecer as leituras em cache do painel por empresa
+"""
+import uuid
+
+from django.core.management.base import BaseCommand
+from fiscal.models import Empresa
+from core.services.painel_service import PainelService
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega no cache dashboard, estoque baixo, mais lucrativos, clientes "
+        "com dívidas e giro de estoque (use no deploy/startup)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--empresa",
+            type=uuid.UUID,
+            action="append",
+            default=None,
+            help="Empresa a aquecer (pode repetir; padrão: todas as empresas)",
+        )
+        parser.add_argument(
+            "--sem-visao-geral",
+            action="store_true",
+            help="Não aquece a visão sem empresa (todas somadas)",
+        )
+
+    def handle(self, *args, **options):
+        empresas = options["empresa"] or list(
+            Empresa.objects.order_by("id").values_list("id", flat=True)
+        )
+        if not options["sem_visao_geral"]:
+            empresas = [None] + empresas
+
+        for empresa_id in empresas:
+            leituras = PainelService.aquecer(empresa_id)
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✓ Empresa {empresa_id or 'todas'}: {len(leituras)} leitura(s) em cache"
+                )
+            )
@@ -0,0 +1,25 @@
+"""
+Management command para aquecer o índice de códigos de barras do PDV
+"""
+import uuid
+
+from django.core.management.base import BaseCommand
+from core.services.codigo_barras_service import IndiceCodigoBarrasService
+
+
+class Command(BaseCommand):
+    help = "Carrega no cache o índice código de barras → produto (use no deploy/startup)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--empresa",
+            type=uuid.UUID,
+            default=None,
+            help="Restringe à empresa informada (padrão: todas)",
+        )
+
+    def handle(self, *args, **options):
+        total = IndiceCodigoBarrasService.aquecer(options["empresa"])
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {total} produto(s) indexado(s) por código de barras")
+        )
@@ -1,15 +1,23 @@
 """
 Comando para verificar e criar alertas do sistema
 Uso: python manage.py check_alerts [--verbose]
+     python manage.py check_alerts --pendentes [--loop] [--intervalo 10]
+
+Os alertas são reavaliados por evento: as mutações enfileiram os alvos
+afetados (AlertService.agendar) e --pendentes é o worker que os reavalia,
+fora das requisições. Sem --pendentes, o comando é a varredura periódica
+de consistência e grava só as diferenças.
 """
 
+import time
+
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from core.services.alert_service import AlertService
 
 
 class Command(BaseCommand):
-    help = "Verifica e cria alertas do sistema"
+    help = "Varredura de consistência dos alertas do sistema (grava só as diferenças)"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -17,8 +25,46 @@ class Command(BaseCommand):
             action="store_true",
             help="Mostra detalhes dos alertas criados",
         )
+        parser.add_argument(
+            "--pendentes",
+            action="store_true",
+            help="Reavalia apenas os alvos da fila de reavaliação",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Com --pendentes, continua processando a fila até ser interrompido",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=10.0,
+            help="Segundos de espera com a fila vazia (com --loop)",
+        )
+
+    def processar_pendentes(self, loop, intervalo):
+        """Esvazia a fila de reavaliação (em lotes)"""
+        while True:
+            resultado = AlertService.avaliar_pendentes()
+            if resultado["alvos"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"✓ {resultado['alvos']} alvo(s) reavaliado(s); "
+                        f"{resultado['criados']} alerta(s) criado(s)"
+                    )
+                )
+            # Lote cheio: provavelmente há mais na fila, segue sem esperar
+            if resultado["alvos"] >= AlertService.LIMITE_REAVALIACAO:
+                continue
+            if not loop:
+                break
+            time.sleep(intervalo)
 
     def handle(self, *args, **options):
+        if options["pendentes"]:
+            self.processar_pendentes(options["loop"], options["intervalo"])
+            return
+
         verbose = options["verbose"]
 
         self.stdout.write(self.style.SUCCESS("=" * 60))
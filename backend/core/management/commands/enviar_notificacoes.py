@@ -0,0 +1,63 @@
+"""
+Worker da fila de notificações de alertas por WhatsApp
+Uso: python manage.py enviar_notificacoes [--loop] [--intervalo 10]
+
+Envia as notificações pendentes agrupadas por destinatário, com um único
+transporte e concorrência limitada; falhas voltam à fila com backoff.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.services.notificacao_service import NotificacaoService
+
+
+class Command(BaseCommand):
+    help = "Envia as notificações de alertas pendentes na fila (WhatsApp)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limite",
+            type=int,
+            default=NotificacaoService.LIMITE_LOTE,
+            help="Máximo de notificações por passada",
+        )
+        parser.add_argument(
+            "--concorrencia",
+            type=int,
+            default=NotificacaoService.CONCORRENCIA,
+            help="Envios simultâneos",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continua processando a fila até ser interrompido",
+        )
+        parser.add_argument(
+            "--intervalo",
+            type=float,
+            default=10.0,
+            help="Segundos de espera com a fila vazia (com --loop)",
+        )
+
+    def handle(self, *args, **options):
+        if not NotificacaoService.habilitado():
+            raise CommandError("WhatsApp não configurado (WHATSAPP_ENABLED e credenciais)")
+
+        while True:
+            resultado = NotificacaoService.processar(
+                limite=options["limite"], concorrencia=options["concorrencia"]
+            )
+            if resultado["enviadas"] or resultado["falhas"]:
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"✓ {resultado['mensagens']} mensagem(ns) enviada(s) para "
+                        f"{resultado['enviadas']} alerta(s); {resultado['falhas']} falha(s), "
+                        f"{resultado['descartadas']} descartada(s)"
+                    )
+                )
+            if not options["loop"]:
+                break
+            # Lote cheio: provavelmente há mais na fila, segue sem esperar
+            if resultado["enviadas"] + resultado["falhas"] < options["limite"]:
+                time.sleep(options["intervalo"])
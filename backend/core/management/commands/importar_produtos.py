@@ -0,0 +1,61 @@
+"""
+Management command para importar produtos de um arquivo CSV
+"""
+import json
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from core.services.importacao_service import ErroImportacao, ImportacaoProdutosService
+
+
+class Command(BaseCommand):
+    help = "Importa produtos de um CSV (bulk_create/bulk_update em lotes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="Caminho do CSV (UTF-8, separado por ';' ou ',')")
+        parser.add_argument(
+            "--empresa", type=uuid.UUID, default=None, help="Empresa dos produtos"
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas mostra o que seria criado/alterado, sem gravar",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=ImportacaoProdutosService.TAMANHO_LOTE,
+            help=f"Linhas por lote (padrão: {ImportacaoProdutosService.TAMANHO_LOTE})",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["arquivo"], "rb") as arquivo:
+                relatorio = ImportacaoProdutosService.importar(
+                    arquivo,
+                    empresa_id=options["empresa"],
+                    dry_run=options["dry_run"],
+                    tamanho_lote=options["lote"],
+                )
+        except FileNotFoundError:
+            raise CommandError(f"Arquivo não encontrado: {options['arquivo']}")
+        except ErroImportacao as exc:
+            raise CommandError(str(exc))
+
+        for erro in relatorio["erros"]:
+            self.stdout.write(self.style.WARNING(f"Linha {erro['linha']}: {erro['erro']}"))
+        if options["dry_run"]:
+            for alteracao in relatorio["alteracoes"]:
+                self.stdout.write(
+                    f"Linha {alteracao['linha']} ({alteracao['nome']}): "
+                    f"{json.dumps(alteracao['campos'], ensure_ascii=False)}"
+                )
+
+        prefixo = "[DRY-RUN] " if options["dry_run"] else ""
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {prefixo}{relatorio['linhas']} linha(s): {relatorio['criados']} criado(s), "
+                f"{relatorio['atualizados']} atualizado(s), {relatorio['inalterados']} inalterado(s), "
+                f"{len(relatorio['erros'])} erro(s)"
+            )
+        )
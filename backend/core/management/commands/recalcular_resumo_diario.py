@@ -0,0 +1,38 @@
+"""
+Management command para preencher/reconstruir o resumo diário de vendas
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from core.services.resumo_service import ResumoDiarioService
+
+
+class Command(BaseCommand):
+    help = "Reconstrói VendaResumoDiario a partir das vendas finalizadas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--desde",
+            help="Primeiro dia a recalcular (AAAA-MM-DD). Padrão: todo o histórico",
+        )
+        parser.add_argument(
+            "--ate",
+            help="Último dia a recalcular (AAAA-MM-DD). Padrão: hoje",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            desde = date.fromisoformat(options["desde"]) if options["desde"] else None
+            ate = date.fromisoformat(options["ate"]) if options["ate"] else None
+        except ValueError:
+            raise CommandError("❌ Datas devem estar no formato AAAA-MM-DD")
+
+        if desde and ate and desde > ate:
+            raise CommandError("❌ --desde deve ser anterior ou igual a --ate")
+
+        total = ResumoDiarioService.recalcular(data_inicio=desde, data_fim=ate)
+
+        periodo = f"{desde or 'início'} até {ate or 'hoje'}"
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Resumo diário recalculado ({periodo}): {total} linha(s)")
+        )
@@ -0,0 +1,23 @@
+"""
+Management command para reconstruir a flag Produto.usa_lotes
+"""
+from django.core.management.base import BaseCommand
+from core.models import Produto
+from core.services.lote_service import LoteService
+
+
+class Command(BaseCommand):
+    help = "Recalcula Produto.usa_lotes a partir dos lotes ativos (UPDATE único)"
+
+    def handle(self, *args, **options):
+        antes = Produto.objects.filter(usa_lotes=True).count()
+
+        total = LoteService.atualizar_usa_lotes()
+
+        depois = Produto.objects.filter(usa_lotes=True).count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✓ {total} produto(s) recalculado(s). "
+                f"Usando lotes: {depois} (antes: {antes})"
+            )
+        )
@@ -0,0 +1,41 @@
+"""
+Management command para reconciliar o saldo devedor (fiado) dos clientes
+"""
+from django.core.management.base import BaseCommand
+from core.services.saldo_service import SaldoClienteService
+
+
+class Command(BaseCommand):
+    help = "Reconstrói Cliente.saldo_em_aberto a partir das vendas fiado pendentes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Apenas lista as divergências, sem corrigir",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+
+        divergencias = SaldoClienteService.reconciliar(aplicar=not dry_run)
+
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS("✓ Saldos de todos os clientes conferem"))
+            return
+
+        for cliente_id, (registrado, real) in divergencias.items():
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️  Cliente {cliente_id}: registrado R$ {registrado:.2f}, real R$ {real:.2f}"
+                )
+            )
+
+        if dry_run:
+            self.stdout.write(
+                self.style.WARNING(f"ℹ️  {len(divergencias)} divergência(s) encontrada(s) (dry-run)")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"✓ {len(divergencias)} saldo(s) corrigido(s)")
+            )
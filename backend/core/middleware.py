@@ -0,0 +1,25 @@
+"""
+Middlewares do HMConveniencia
+"""
+
+from django.utils.functional import SimpleLazyObject
+
+from .services.empresa_service import EmpresaService
+
+
+class EmpresaMiddleware:
+    """
+    Expõe request.empresa: a empresa do cabeçalho X-Empresa-Id /
+    ?empresa_id= ou a empresa padrão.
+
+    A resolução é preguiçosa (só acontece se a view usar request.empresa) e
+    memorizada na requisição; as linhas de Empresa vêm do cache do processo
+    (EmpresaService). Sem empresas cadastradas, request.empresa é falso.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.empresa = SimpleLazyObject(lambda: EmpresaService.da_requisicao(request))
+        return self.get_response(request)
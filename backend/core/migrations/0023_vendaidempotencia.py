@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-17 00:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_inventarioitem_categoria_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendaIdempotencia",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "chave",
+                    models.CharField(max_length=64, unique=True, verbose_name="Chave"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "venda",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="idempotencia",
+                        to="core.venda",
+                        verbose_name="Venda",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Chave de Idempotência de Venda",
+                "verbose_name_plural": "Chaves de Idempotência de Vendas",
+            },
+        ),
+    ]
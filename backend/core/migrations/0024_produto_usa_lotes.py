@@ -0,0 +1,36 @@
+# Generated by Django 5.0 on 2026-10-17 00:52
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def preencher_usa_lotes(apps, schema_editor):
+    """Preenche usa_lotes com um único UPDATE (EXISTS em lotes ativos)"""
+    Produto = apps.get_model("core", "Produto")
+    Lote = apps.get_model("core", "Lote")
+
+    Produto.objects.update(
+        usa_lotes=Exists(Lote.objects.filter(produto_id=OuterRef("pk"), ativo=True))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0023_vendaidempotencia"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="produto",
+            name="usa_lotes",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                editable=False,
+                help_text="Mantido pelos signals de Lote: indica se há lotes ativos",
+                verbose_name="Usa Lotes",
+            ),
+        ),
+        migrations.RunPython(preencher_usa_lotes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.0 on 2026-10-17 00:56
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def preencher_saldo_em_aberto(apps, schema_editor):
+    """Preenche o saldo em aberto com uma query agrupada por cliente"""
+    Cliente = apps.get_model("core", "Cliente")
+    Venda = apps.get_model("core", "Venda")
+
+    saldos = (
+        Venda.objects.filter(
+            cliente__isnull=False, status="FINALIZADA", status_pagamento="PENDENTE"
+        )
+        .values("cliente_id")
+        .annotate(total=Sum("total"))
+        .values_list("cliente_id", "total")
+    )
+    clientes = []
+    for cliente_id, total in saldos:
+        clientes.append(Cliente(pk=cliente_id, saldo_em_aberto=total))
+    Cliente.objects.bulk_update(clientes, ["saldo_em_aberto"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_produto_usa_lotes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cliente",
+            name="saldo_em_aberto",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=0,
+                editable=False,
+                help_text="Mantido pelas vendas fiado: soma das vendas pendentes",
+                max_digits=12,
+                verbose_name="Saldo em Aberto",
+            ),
+        ),
+        migrations.RunPython(preencher_saldo_em_aberto, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.0 on 2026-10-17 00:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0025_cliente_saldo_em_aberto"),
+        ("fiscal", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendaResumoDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("data", models.DateField(verbose_name="Data")),
+                (
+                    "forma_pagamento",
+                    models.CharField(
+                        choices=[
+                            ("DINHEIRO", "Dinheiro"),
+                            ("DEBITO", "Débito"),
+                            ("CREDITO", "Crédito"),
+                            ("PIX", "PIX"),
+                            ("FIADO", "Fiado"),
+                        ],
+                        max_length=20,
+                        verbose_name="Forma de Pagamento",
+                    ),
+                ),
+                (
+                    "quantidade",
+                    models.IntegerField(default=0, verbose_name="Quantidade de Vendas"),
+                ),
+                (
+                    "total_bruto",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Total Bruto",
+                    ),
+                ),
+                (
+                    "desconto",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=14,
+                        verbose_name="Desconto",
+                    ),
+                ),
+                (
+                    "custo",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14, verbose_name="Custo"
+                    ),
+                ),
+                (
+                    "lucro",
+                    models.DecimalField(
+                        decimal_places=2, default=0, max_digits=14, verbose_name="Lucro"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Atualizado em"),
+                ),
+                (
+                    "empresa",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="resumos_diarios",
+                        to="fiscal.empresa",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Resumo Diário de Vendas",
+                "verbose_name_plural": "Resumos Diários de Vendas",
+                "ordering": ["-data", "forma_pagamento"],
+                "indexes": [
+                    models.Index(fields=["data"], name="resumo_diario_data_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="vendaresumodiario",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("empresa__isnull", False)),
+                fields=("empresa", "data", "forma_pagamento"),
+                name="resumo_diario_empresa_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="vendaresumodiario",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("empresa__isnull", True)),
+                fields=("data", "forma_pagamento"),
+                name="resumo_diario_sem_empresa_uniq",
+            ),
+        ),
+    ]
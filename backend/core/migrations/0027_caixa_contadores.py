@@ -0,0 +1,177 @@
+# Generated by Django 5.0 on 2026-10-17 01:04
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Q, Sum
+
+CAMPOS_POR_FORMA = {
+    "DINHEIRO": "total_dinheiro",
+    "DEBITO": "total_debito",
+    "CREDITO": "total_credito",
+    "PIX": "total_pix",
+    "FIADO": "total_fiado",
+}
+
+
+def preencher_contadores(apps, schema_editor):
+    """
+    Preenche sangrias/suprimentos de todos os caixas (query agrupada) e os
+    totais por forma de pagamento dos caixas ainda abertos (vendas da
+    empresa do caixa).
+    """
+    Caixa = apps.get_model("core", "Caixa")
+    Venda = apps.get_model("core", "Venda")
+    MovimentacaoCaixa = apps.get_model("core", "MovimentacaoCaixa")
+
+    movimentacoes = {
+        linha["caixa_id"]: linha
+        for linha in MovimentacaoCaixa.objects.values("caixa_id").annotate(
+            sangrias=Sum("valor", filter=Q(tipo="SANGRIA")),
+            suprimentos=Sum("valor", filter=Q(tipo="SUPRIMENTO")),
+        )
+    }
+
+    caixas = []
+    for caixa in Caixa.objects.filter(
+        Q(status="ABERTO") | Q(pk__in=movimentacoes.keys())
+    ):
+        linha = movimentacoes.get(caixa.pk, {})
+        caixa.total_sangrias = linha.get("sangrias") or Decimal("0")
+        caixa.total_suprimentos = linha.get("suprimentos") or Decimal("0")
+
+        if caixa.status == "ABERTO":
+            caixa.total_vendas = Decimal("0")
+            for campo in CAMPOS_POR_FORMA.values():
+                setattr(caixa, campo, Decimal("0"))
+            for forma_pagamento, total in (
+                Venda.objects.filter(
+                    created_at__gte=caixa.data_abertura,
+                    status="FINALIZADA",
+                    empresa_id=caixa.empresa_id,
+                )
+                .values("forma_pagamento")
+                .annotate(soma=Sum("total"))
+                .values_list("forma_pagamento", "soma")
+            ):
+                campo = CAMPOS_POR_FORMA.get(forma_pagamento)
+                if campo:
+                    setattr(caixa, campo, total or Decimal("0"))
+                    caixa.total_vendas += total or Decimal("0")
+        caixas.append(caixa)
+
+    Caixa.objects.bulk_update(
+        caixas,
+        ["total_sangrias", "total_suprimentos", "total_vendas", *CAMPOS_POR_FORMA.values()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0026_vendaresumodiario"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="caixa",
+            name="total_sangrias",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Soma das sangrias do caixa",
+                max_digits=10,
+                verbose_name="Total Sangrias",
+            ),
+        ),
+        migrations.AddField(
+            model_name="caixa",
+            name="total_suprimentos",
+            field=models.DecimalField(
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Soma dos suprimentos do caixa",
+                max_digits=10,
+                verbose_name="Total Suprimentos",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="caixa",
+            name="total_credito",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Total de vendas no crédito",
+                max_digits=10,
+                null=True,
+                verbose_name="Total Crédito",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="caixa",
+            name="total_debito",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Total de vendas no débito",
+                max_digits=10,
+                null=True,
+                verbose_name="Total Débito",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="caixa",
+            name="total_dinheiro",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Total de vendas em dinheiro",
+                max_digits=10,
+                null=True,
+                verbose_name="Total Dinheiro",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="caixa",
+            name="total_fiado",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Total de vendas fiado",
+                max_digits=10,
+                null=True,
+                verbose_name="Total Fiado",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="caixa",
+            name="total_pix",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Total de vendas via PIX",
+                max_digits=10,
+                null=True,
+                verbose_name="Total PIX",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="caixa",
+            name="total_vendas",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                default=Decimal("0"),
+                help_text="Total geral de vendas (todas as formas)",
+                max_digits=10,
+                null=True,
+                verbose_name="Total de Vendas",
+            ),
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
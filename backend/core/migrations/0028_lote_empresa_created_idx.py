@@ -0,0 +1,20 @@
+# Generated by Django 5.0 on 2026-10-17 01:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0027_caixa_contadores"),
+        ("fiscal", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="lote",
+            index=models.Index(
+                fields=["empresa", "-created_at"], name="lote_empresa_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.0 on 2026-10-17 01:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0028_lote_empresa_created_idx"),
+        ("fiscal", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RegistroExclusao",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "modelo",
+                    models.CharField(
+                        choices=[
+                            ("produto", "Produto"),
+                            ("cliente", "Cliente"),
+                            ("categoria", "Categoria"),
+                            ("fornecedor", "Fornecedor"),
+                        ],
+                        max_length=20,
+                        verbose_name="Modelo",
+                    ),
+                ),
+                ("objeto_id", models.BigIntegerField(verbose_name="ID do registro")),
+                (
+                    "excluido_em",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Excluído em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Registro de Exclusão",
+                "verbose_name_plural": "Registros de Exclusão",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="categoria",
+            index=models.Index(
+                fields=["empresa", "updated_at"], name="categoria_empresa_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cliente",
+            index=models.Index(
+                fields=["empresa", "updated_at"], name="cliente_empresa_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="fornecedor",
+            index=models.Index(
+                fields=["empresa", "updated_at"], name="fornecedor_empresa_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="produto",
+            index=models.Index(
+                fields=["empresa", "updated_at"], name="produto_empresa_updated_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="registroexclusao",
+            name="empresa",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="registros_exclusao",
+                to="fiscal.empresa",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="registroexclusao",
+            index=models.Index(
+                fields=["modelo", "empresa", "excluido_em"],
+                name="exclusao_modelo_empresa_idx",
+            ),
+        ),
+    ]
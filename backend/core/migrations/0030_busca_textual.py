@@ -0,0 +1,64 @@
+"""
+Índices da busca textual no PostgreSQL: extensões unaccent e pg_trgm, a
+função IMMUTABLE f_unaccent() (unaccent() não pode ser usada em índices) e
+índices GIN de trigramas sobre os campos de texto, além de índices
+varchar_pattern_ops para a busca por prefixo dos códigos.
+
+No SQLite as tabelas FTS5 são criadas no post_migrate (core.signals).
+"""
+
+from django.db import migrations
+
+INDICES_TRIGRAMA = [
+    ("produto_nome_trgm_idx", "core_produto", "nome"),
+    ("produto_marca_trgm_idx", "core_produto", "marca"),
+    ("cliente_nome_trgm_idx", "core_cliente", "nome"),
+    ("fornecedor_nome_trgm_idx", "core_fornecedor", "nome"),
+    ("fornecedor_fantasia_trgm_idx", "core_fornecedor", "nome_fantasia"),
+]
+
+# cpf e cnpj são unique: o Django já cria os índices *_like para prefixo
+INDICES_PREFIXO = [
+    ("produto_codigo_prefixo_idx", "core_produto", "codigo_barras"),
+    ("cliente_telefone_prefixo_idx", "core_cliente", "telefone"),
+]
+
+
+def criar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS "
+        "$func$ SELECT public.unaccent('public.unaccent', $1) $func$ "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"
+    )
+    for nome, tabela, coluna in INDICES_TRIGRAMA:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} "
+            f"USING gin (f_unaccent({coluna}) gin_trgm_ops)"
+        )
+    for nome, tabela, coluna in INDICES_PREFIXO:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {nome} ON {tabela} ({coluna} varchar_pattern_ops)"
+        )
+
+
+def remover_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for nome, _tabela, _coluna in INDICES_TRIGRAMA + INDICES_PREFIXO:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {nome}")
+    schema_editor.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0029_sincronizacao_catalogo"),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
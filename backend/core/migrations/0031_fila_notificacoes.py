@@ -0,0 +1,92 @@
+# Generated by Django 5.0 on 2026-10-17 01:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0030_busca_textual"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NotificacaoAlerta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "destinatario",
+                    models.CharField(max_length=40, verbose_name="Destinatário"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDENTE", "Pendente"),
+                            ("ENVIADA", "Enviada"),
+                            ("FALHA", "Falha"),
+                        ],
+                        default="PENDENTE",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                (
+                    "tentativas",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="Tentativas"
+                    ),
+                ),
+                (
+                    "proxima_tentativa",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        verbose_name="Próxima tentativa",
+                    ),
+                ),
+                (
+                    "ultimo_erro",
+                    models.TextField(blank=True, verbose_name="Último erro"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Criado em"),
+                ),
+                (
+                    "enviada_em",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Enviada em"
+                    ),
+                ),
+                (
+                    "alerta",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="notificacoes",
+                        to="core.alerta",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Notificação de Alerta",
+                "verbose_name_plural": "Notificações de Alertas",
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "proxima_tentativa"],
+                        name="notificacao_fila_idx",
+                    )
+                ],
+            },
+        ),
+    ]
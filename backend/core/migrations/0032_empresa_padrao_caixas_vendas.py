@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.models import F
+
+CAMPOS_RESUMO = ["quantidade", "total_bruto", "desconto", "custo", "lucro"]
+
+
+def atribuir_empresa_padrao(apps, schema_editor):
+    """
+    Atribui a empresa padrão (a primeira cadastrada) aos caixas, movimentações,
+    vendas e linhas do resumo diário gravados sem empresa: leituras e escritas
+    por empresa (caixa aberto, contadores, resumo) passam a enxergá-los.
+    """
+    Empresa = apps.get_model("fiscal", "Empresa")
+    Caixa = apps.get_model("core", "Caixa")
+    MovimentacaoCaixa = apps.get_model("core", "MovimentacaoCaixa")
+    Venda = apps.get_model("core", "Venda")
+    VendaResumoDiario = apps.get_model("core", "VendaResumoDiario")
+
+    empresa = Empresa.objects.order_by("created_at").first()
+    if empresa is None:
+        return
+
+    Caixa.objects.filter(empresa__isnull=True).update(empresa=empresa)
+    MovimentacaoCaixa.objects.filter(empresa__isnull=True).update(empresa=empresa)
+    Venda.objects.filter(empresa__isnull=True).update(empresa=empresa)
+
+    # Resumo: soma na linha da empresa quando ela já existe no mesmo dia/forma
+    for resumo in VendaResumoDiario.objects.filter(empresa__isnull=True):
+        existente = VendaResumoDiario.objects.filter(
+            empresa=empresa, data=resumo.data, forma_pagamento=resumo.forma_pagamento
+        )
+        if existente.update(**{campo: F(campo) + getattr(resumo, campo) for campo in CAMPOS_RESUMO}):
+            resumo.delete()
+        else:
+            resumo.empresa = empresa
+            resumo.save(update_fields=["empresa"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0031_fila_notificacoes"),
+        ("fiscal", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(atribuir_empresa_padrao, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.0 on 2026-10-17 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0032_empresa_padrao_caixas_vendas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReavaliacaoAlerta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "alvo",
+                    models.CharField(
+                        choices=[
+                            ("produtos", "Produto"),
+                            ("lotes", "Lote"),
+                            ("clientes", "Cliente"),
+                            ("vendas", "Venda"),
+                            ("caixas", "Caixa"),
+                        ],
+                        max_length=10,
+                        verbose_name="Alvo",
+                    ),
+                ),
+                (
+                    "objeto_id",
+                    models.PositiveBigIntegerField(verbose_name="ID do objeto"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Agendada em"),
+                ),
+            ],
+            options={
+                "verbose_name": "Reavaliação de Alerta",
+                "verbose_name_plural": "Reavaliações de Alertas",
+                "ordering": ["id"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="reavaliacaoalerta",
+            constraint=models.UniqueConstraint(
+                fields=("alvo", "objeto_id"), name="reavaliacao_alvo_unico"
+            ),
+        ),
+    ]
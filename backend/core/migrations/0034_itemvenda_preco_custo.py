@@ -0,0 +1,42 @@
+# Generated by Django 5.0 on 2026-10-17 02:48
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def preencher_preco_custo(apps, schema_editor):
+    """
+    Itens anteriores não guardaram o custo: usa o custo atual do produto
+    (o mesmo que o resumo diário já tinha somado).
+    """
+    ItemVenda = apps.get_model("core", "ItemVenda")
+    Produto = apps.get_model("core", "Produto")
+
+    ItemVenda.objects.filter(preco_custo__isnull=True).update(
+        preco_custo=Subquery(
+            Produto.objects.filter(pk=OuterRef("produto_id")).values("preco_custo")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0033_fila_reavaliacao_alertas"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="itemvenda",
+            name="preco_custo",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                help_text="Custo do produto no momento da venda",
+                max_digits=10,
+                null=True,
+                verbose_name="Preço de Custo",
+            ),
+        ),
+        migrations.RunPython(preencher_preco_custo, migrations.RunPython.noop),
+    ]
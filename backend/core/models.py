@@ -6,7 +6,8 @@ import uuid
 from decimal import Decimal
 
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 
 
 class Cliente(models.Model):
@@ -28,6 +29,14 @@ class Cliente(models.Model):
         ],
     )
     ativo = models.BooleanField("Ativo", default=True)
+    saldo_em_aberto = models.DecimalField(
+        "Saldo em Aberto",
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        help_text="Mantido pelas vendas fiado: soma das vendas pendentes",
+    )
     created_at = models.DateTimeField("Criado em", auto_now_add=True)
     updated_at = models.DateTimeField("Atualizado em", auto_now=True)
     empresa = models.ForeignKey(
@@ -46,16 +55,37 @@ class Cliente(models.Model):
             models.Index(fields=["ativo"]),
             models.Index(fields=["nome"]),
             models.Index(fields=["empresa", "ativo"]),
+            models.Index(fields=["empresa", "updated_at"], name="cliente_empresa_updated_idx"),
         ]
 
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        # saldo_em_aberto é mantido pelas vendas: um save() completo com uma
+        # instância desatualizada não deve sobrescrevê-lo
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "saldo_em_aberto"
+            ]
+        super().save(*args, **kwargs)
+
     def saldo_devedor(self):
-        """Retorna o total de vendas pendentes (fiado)"""
-        return self.vendas.filter(status_pagamento="PENDENTE").aggregate(
-            total=models.Sum("total")
-        )["total"] or Decimal("0.00")
+        """Retorna o total de vendas pendentes (fiado) lendo o saldo em aberto"""
+        saldo = (
+            Cliente.objects.filter(pk=self.pk)
+            .values_list("saldo_em_aberto", flat=True)
+            .first()
+        )
+        self.saldo_em_aberto = saldo or Decimal("0.00")
+        return self.saldo_em_aberto
 
     def pode_comprar_fiado(self, valor):
         """Verifica se cliente pode comprar fiado baseado no limite"""
@@ -94,6 +124,7 @@ class Fornecedor(models.Model):
             models.Index(fields=["ativo"]),
             models.Index(fields=["nome"]),
             models.Index(fields=["empresa", "ativo"]),
+            models.Index(fields=["empresa", "updated_at"], name="fornecedor_empresa_updated_idx"),
         ]
 
     def __str__(self):
@@ -141,6 +172,9 @@ class Categoria(models.Model):
                 name='unique_categoria_por_empresa'
             )
         ]
+        indexes = [
+            models.Index(fields=["empresa", "updated_at"], name="categoria_empresa_updated_idx"),
+        ]
 
     def __str__(self):
         return self.nome
@@ -217,6 +251,13 @@ class Produto(models.Model):
         verbose_name="Fornecedor",
     )
     ativo = models.BooleanField("Ativo", default=True)
+    usa_lotes = models.BooleanField(
+        "Usa Lotes",
+        default=False,
+        db_index=True,
+        editable=False,
+        help_text="Mantido pelos signals de Lote: indica se há lotes ativos",
+    )
     created_at = models.DateTimeField("Criado em", auto_now_add=True)
     updated_at = models.DateTimeField("Atualizado em", auto_now=True)
     empresa = models.ForeignKey(
@@ -237,11 +278,28 @@ class Produto(models.Model):
             models.Index(fields=["estoque"]),
             models.Index(fields=["nome"]),
             models.Index(fields=["empresa", "ativo"], name="produto_empresa_ativo_idx"),
+            models.Index(fields=["empresa", "updated_at"], name="produto_empresa_updated_idx"),
         ]
 
     def __str__(self):
         return self.nome
 
+    def save(self, *args, **kwargs):
+        # usa_lotes é mantido pelos signals de Lote: um save() completo com
+        # uma instância carregada antes do lote ser criado não deve apagá-lo
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "usa_lotes"
+            ]
+        super().save(*args, **kwargs)
+
     def tem_estoque(self, quantidade):
         """Verifica se tem estoque disponível"""
         return self.estoque >= quantidade
@@ -359,6 +417,41 @@ class Venda(models.Model):
     def __str__(self):
         return f"Venda {self.numero} - R$ {self.total}"
 
+    # Campos que definem quanto a venda soma ao saldo devedor do cliente
+    _CAMPOS_CONTRIBUICAO = {"cliente_id", "status", "status_pagamento", "total", "forma_pagamento"}
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        venda = super().from_db(db, field_names, values)
+        # Guarda as contribuições carregadas, para save() aplicar apenas a
+        # diferença (sem reler a venda do banco)
+        if not venda.get_deferred_fields() & cls._CAMPOS_CONTRIBUICAO:
+            venda._saldo_registrado = venda._contribuicao_saldo()
+            venda._caixa_registrado = venda._contribuicao_caixa()
+        return venda
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        if not self.get_deferred_fields() & self._CAMPOS_CONTRIBUICAO:
+            self._saldo_registrado = self._contribuicao_saldo()
+            self._caixa_registrado = self._contribuicao_caixa()
+
+    def _contribuicao_saldo(self):
+        """Retorna (cliente_id, valor) que a venda soma ao saldo devedor"""
+        if (
+            self.cliente_id
+            and self.status == "FINALIZADA"
+            and self.status_pagamento == "PENDENTE"
+        ):
+            return self.cliente_id, Decimal(str(self.total or 0))
+        return None, Decimal("0")
+
+    def _contribuicao_caixa(self):
+        """Retorna (forma_pagamento, valor) que a venda soma ao caixa aberto"""
+        if self.status == "FINALIZADA":
+            return self.forma_pagamento, Decimal(str(self.total or 0))
+        return None, Decimal("0")
+
     def save(self, *args, **kwargs):
         # Gera número automático se não existir
         if not self.numero:
@@ -368,7 +461,51 @@ class Venda(models.Model):
             # Formato: V2025012314-A3F2 (mais curto + previne colisões com UUID)
             short_uuid = str(uuid.uuid4())[:4].upper()
             self.numero = f'V{hoje.strftime("%Y%m%d%H")}-{short_uuid}'
-        super().save(*args, **kwargs)
+
+        # Saldo devedor do cliente e contadores do caixa aberto: aplica só a
+        # diferença desta venda
+        if self._state.adding:
+            saldo_anterior = caixa_anterior = (None, Decimal("0"))
+        elif hasattr(self, "_saldo_registrado"):
+            saldo_anterior = self._saldo_registrado
+            caixa_anterior = self._caixa_registrado
+        else:
+            registrada = Venda.objects.get(pk=self.pk)
+            saldo_anterior = registrada._saldo_registrado
+            caixa_anterior = registrada._caixa_registrado
+        saldo_atual = self._contribuicao_saldo()
+        caixa_atual = self._contribuicao_caixa()
+
+        if saldo_anterior == saldo_atual and caixa_anterior == caixa_atual:
+            super().save(*args, **kwargs)
+        else:
+            from .services.caixa_service import CaixaService
+            from .services.saldo_service import SaldoClienteService
+
+            with transaction.atomic(savepoint=False):
+                super().save(*args, **kwargs)
+                if saldo_anterior != saldo_atual:
+                    SaldoClienteService.aplicar(
+                        Venda._deltas(saldo_anterior, saldo_atual), empresa_id=self.empresa_id
+                    )
+                if caixa_anterior != caixa_atual:
+                    CaixaService.aplicar_vendas(
+                        Venda._deltas(caixa_anterior, caixa_atual),
+                        self.created_at,
+                        empresa_id=self.empresa_id,
+                    )
+        self._saldo_registrado = saldo_atual
+        self._caixa_registrado = caixa_atual
+
+    @staticmethod
+    def _deltas(anterior, atual):
+        """Converte duas contribuições (chave, valor) em {chave: delta}"""
+        deltas = {}
+        if anterior[0]:
+            deltas[anterior[0]] = -anterior[1]
+        if atual[0]:
+            deltas[atual[0]] = deltas.get(atual[0], Decimal("0")) + atual[1]
+        return deltas
 
     def calcular_total(self):
         """Calcula o total da venda baseado nos itens"""
@@ -394,38 +531,25 @@ class Venda(models.Model):
         else:
             self.status_pagamento = "PAGO"
 
-        self.status = "FINALIZADA"
-        self.save()
-
-        # Baixa estoque usando FEFO (First Expired, First Out)
-        from .services.lote_service import LoteService
+        from .services.resumo_service import ResumoDiarioService
+        from .services.venda_service import VendaService
 
-        for item in self.itens.all():
-            produto = item.produto
+        with transaction.atomic():
+            self.status = "FINALIZADA"
+            self.save()
 
-            # Verifica se produto usa sistema de lotes
-            if LoteService.produto_usa_lotes(produto):
-                # Usa FEFO para baixar dos lotes
-                try:
-                    lotes_afetados = LoteService.baixar_estoque_fefo(
-                        produto, item.quantidade
-                    )
-                    # Log para debug
-                    import logging
+            # Baixa estoque usando FEFO (First Expired, First Out) para produtos
+            # com lotes e um único UPDATE condicional para os demais
+            itens = list(self.itens.select_related("produto"))
+            try:
+                VendaService.baixar_estoque_itens(self, itens)
+            except ValueError as e:
+                # Se falhar, reverte a venda
+                self.status = "ABERTA"
+                self.save()
+                raise e
 
-                    logger = logging.getLogger(__name__)
-                    logger.info(
-                        f"Venda {self.numero}: FEFO aplicado em {produto.nome}. Lotes: {lotes_afetados}"
-                    )
-                except ValueError as e:
-                    # Se falhar, reverte a venda
-                    self.status = "ABERTA"
-                    self.save()
-                    raise e
-            else:
-                # Produto sem lotes: baixa direta do estoque
-                produto.estoque -= item.quantidade
-                produto.save()
+            ResumoDiarioService.registrar_venda(self, itens)
 
     def receber_pagamento(self):
         """Marca a venda como paga"""
@@ -447,6 +571,14 @@ class ItemVenda(models.Model):
     subtotal = models.DecimalField(
         "Subtotal", max_digits=10, decimal_places=2, default=0
     )
+    preco_custo = models.DecimalField(
+        "Preço de Custo",
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Custo do produto no momento da venda",
+    )
 
     class Meta:
         verbose_name = "Item da Venda"
@@ -458,9 +590,131 @@ class ItemVenda(models.Model):
     def save(self, *args, **kwargs):
         # Calcula subtotal automaticamente
         self.subtotal = self.quantidade * self.preco_unitario
+        # Custo congelado na venda: estornos e resumos não mudam com o produto
+        if self.preco_custo is None:
+            self.preco_custo = self.produto.preco_custo
         super().save(*args, **kwargs)
 
 
+class VendaIdempotencia(models.Model):
+    """
+    Chave de idempotência de vendas enviadas pelos terminais (sincronização
+    offline). O índice único permite reconhecer reenvios sem consultar Venda.
+    """
+
+    chave = models.CharField("Chave", max_length=64, unique=True)
+    venda = models.OneToOneField(
+        Venda,
+        on_delete=models.CASCADE,
+        related_name="idempotencia",
+        verbose_name="Venda",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Chave de Idempotência de Venda"
+        verbose_name_plural = "Chaves de Idempotência de Vendas"
+
+    def __str__(self):
+        return f"{self.chave} → Venda {self.venda_id}"
+
+
+class VendaResumoDiario(models.Model):
+    """
+    Resumo diário de vendas finalizadas por empresa e forma de pagamento.
+    Atualizado incrementalmente na finalização e no cancelamento de vendas.
+    """
+
+    empresa = models.ForeignKey(
+        "fiscal.Empresa",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="resumos_diarios",
+    )
+    data = models.DateField("Data")
+    forma_pagamento = models.CharField(
+        "Forma de Pagamento", max_length=20, choices=Venda.FORMA_PAGAMENTO_CHOICES
+    )
+    quantidade = models.IntegerField("Quantidade de Vendas", default=0)
+    total_bruto = models.DecimalField(
+        "Total Bruto", max_digits=14, decimal_places=2, default=0
+    )
+    desconto = models.DecimalField("Desconto", max_digits=14, decimal_places=2, default=0)
+    custo = models.DecimalField("Custo", max_digits=14, decimal_places=2, default=0)
+    lucro = models.DecimalField("Lucro", max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        ordering = ["-data", "forma_pagamento"]
+        verbose_name = "Resumo Diário de Vendas"
+        verbose_name_plural = "Resumos Diários de Vendas"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "data", "forma_pagamento"],
+                condition=models.Q(empresa__isnull=False),
+                name="resumo_diario_empresa_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["data", "forma_pagamento"],
+                condition=models.Q(empresa__isnull=True),
+                name="resumo_diario_sem_empresa_uniq",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["data"], name="resumo_diario_data_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.data} {self.forma_pagamento}: {self.quantidade} venda(s)"
+
+    @property
+    def total(self):
+        """Total líquido (bruto - desconto)"""
+        return self.total_bruto - self.desconto
+
+
+class RegistroExclusao(models.Model):
+    """
+    Lápide de um registro do catálogo excluído, para que os PDVs offline
+    removam o item do cache na sincronização incremental (/sync/...).
+    """
+
+    MODELO_CHOICES = [
+        ("produto", "Produto"),
+        ("cliente", "Cliente"),
+        ("categoria", "Categoria"),
+        ("fornecedor", "Fornecedor"),
+    ]
+
+    modelo = models.CharField("Modelo", max_length=20, choices=MODELO_CHOICES)
+    objeto_id = models.BigIntegerField("ID do registro")
+    # Sem constraint: a lápide é gravada durante a exclusão em cascata da
+    # própria empresa e não deve impedi-la
+    empresa = models.ForeignKey(
+        "fiscal.Empresa",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="registros_exclusao",
+    )
+    excluido_em = models.DateTimeField("Excluído em", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Registro de Exclusão"
+        verbose_name_plural = "Registros de Exclusão"
+        indexes = [
+            models.Index(
+                fields=["modelo", "empresa", "excluido_em"],
+                name="exclusao_modelo_empresa_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id} excluído em {self.excluido_em}"
+
+
 class Caixa(models.Model):
     """Registra a abertura e fechamento do caixa"""
 
@@ -492,31 +746,46 @@ class Caixa(models.Model):
     )
     observacoes = models.TextField("Observações", blank=True)
 
-    # Detalhamento por forma de pagamento (calculado no fechamento)
+    # Detalhamento por forma de pagamento: contadores mantidos enquanto o
+    # caixa está aberto (CaixaService) e conferidos no fechamento
     total_dinheiro = models.DecimalField(
         "Total Dinheiro", max_digits=10, decimal_places=2, null=True, blank=True,
+        default=Decimal("0"),
         help_text="Total de vendas em dinheiro"
     )
     total_debito = models.DecimalField(
         "Total Débito", max_digits=10, decimal_places=2, null=True, blank=True,
+        default=Decimal("0"),
         help_text="Total de vendas no débito"
     )
     total_credito = models.DecimalField(
         "Total Crédito", max_digits=10, decimal_places=2, null=True, blank=True,
+        default=Decimal("0"),
         help_text="Total de vendas no crédito"
     )
     total_pix = models.DecimalField(
         "Total PIX", max_digits=10, decimal_places=2, null=True, blank=True,
+        default=Decimal("0"),
         help_text="Total de vendas via PIX"
     )
     total_fiado = models.DecimalField(
         "Total Fiado", max_digits=10, decimal_places=2, null=True, blank=True,
+        default=Decimal("0"),
         help_text="Total de vendas fiado"
     )
     total_vendas = models.DecimalField(
         "Total de Vendas", max_digits=10, decimal_places=2, null=True, blank=True,
+        default=Decimal("0"),
         help_text="Total geral de vendas (todas as formas)"
     )
+    total_sangrias = models.DecimalField(
+        "Total Sangrias", max_digits=10, decimal_places=2, default=Decimal("0"),
+        help_text="Soma das sangrias do caixa"
+    )
+    total_suprimentos = models.DecimalField(
+        "Total Suprimentos", max_digits=10, decimal_places=2, default=Decimal("0"),
+        help_text="Soma dos suprimentos do caixa"
+    )
 
     empresa = models.ForeignKey(
         "fiscal.Empresa",
@@ -667,6 +936,78 @@ class Alerta(models.Model):
         self.save(update_fields=["resolvido", "resolvido_em"])
 
 
+class NotificacaoAlerta(models.Model):
+    """
+    Fila de envio de alertas por WhatsApp.
+
+    Os alertas entram na fila ao serem criados/alterados e o worker
+    (manage.py enviar_notificacoes) envia em lote, agrupando por destinatário.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDENTE", "Pendente"),
+        ("ENVIADA", "Enviada"),
+        ("FALHA", "Falha"),
+    ]
+
+    alerta = models.ForeignKey(
+        Alerta, on_delete=models.CASCADE, related_name="notificacoes"
+    )
+    destinatario = models.CharField("Destinatário", max_length=40)
+    status = models.CharField(
+        "Status", max_length=10, choices=STATUS_CHOICES, default="PENDENTE"
+    )
+    tentativas = models.PositiveSmallIntegerField("Tentativas", default=0)
+    proxima_tentativa = models.DateTimeField("Próxima tentativa", default=timezone.now)
+    ultimo_erro = models.TextField("Último erro", blank=True)
+    created_at = models.DateTimeField("Criado em", auto_now_add=True)
+    enviada_em = models.DateTimeField("Enviada em", null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        verbose_name = "Notificação de Alerta"
+        verbose_name_plural = "Notificações de Alertas"
+        indexes = [
+            models.Index(fields=["status", "proxima_tentativa"], name="notificacao_fila_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.destinatario} - {self.alerta_id} ({self.get_status_display()})"
+
+
+class ReavaliacaoAlerta(models.Model):
+    """
+    Fila de alvos com alertas a reavaliar.
+
+    As mutações de estoque, lotes, vendas, saldos e caixas gravam os alvos
+    afetados após o commit (um único INSERT) e o worker
+    (manage.py check_alerts --pendentes) reavalia fora da requisição.
+    """
+
+    ALVO_CHOICES = [
+        ("produtos", "Produto"),
+        ("lotes", "Lote"),
+        ("clientes", "Cliente"),
+        ("vendas", "Venda"),
+        ("caixas", "Caixa"),
+    ]
+
+    alvo = models.CharField("Alvo", max_length=10, choices=ALVO_CHOICES)
+    objeto_id = models.PositiveBigIntegerField("ID do objeto")
+    created_at = models.DateTimeField("Agendada em", auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Reavaliação de Alerta"
+        verbose_name_plural = "Reavaliações de Alertas"
+        constraints = [
+            models.UniqueConstraint(fields=["alvo", "objeto_id"], name="reavaliacao_alvo_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.alvo} {self.objeto_id}"
+
+
 class Lote(models.Model):
     """Lote de produtos - controle de validade por lote"""
 
@@ -753,6 +1094,7 @@ class Lote(models.Model):
             models.Index(fields=["numero_lote"]),
             models.Index(fields=["produto", "data_validade", "ativo"]),
             models.Index(fields=["empresa", "ativo"], name="lote_empresa_ativo_idx"),
+            models.Index(fields=["empresa", "-created_at"], name="lote_empresa_created_idx"),
         ]
 
     def __str__(self):
@@ -923,10 +1265,12 @@ class InventarioItem(models.Model):
         if diferenca == 0:
             return None
 
+        from .services.estoque_service import EstoqueService
+
         produto = self.produto
-        produto.estoque = (produto.estoque or Decimal("0")) + diferenca
+        EstoqueService.ajustar({produto.id: diferenca})
         if self.custo_informado and self.custo_informado > 0:
             produto.preco_custo = self.custo_informado
-        produto.save(update_fields=["estoque", "preco_custo", "updated_at"])
+            produto.save(update_fields=["preco_custo", "updated_at"])
 
         return diferenca
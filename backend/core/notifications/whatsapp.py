@@ -1,4 +1,4 @@
-import logging
+import threading
 from dataclasses import dataclass
 from typing import Optional
 
@@ -6,8 +6,6 @@ from decouple import config
 from twilio.base.exceptions import TwilioRestException
 from twilio.rest import Client
 
-logger = logging.getLogger(__name__)
-
 
 @dataclass(frozen=True)
 class WhatsappSettings:
@@ -16,9 +14,13 @@ class WhatsappSettings:
     auth_token: str = config("WHATSAPP_AUTH_TOKEN", default="")
     from_number: str = config("WHATSAPP_FROM_NUMBER", default="")
     default_to_number: str = config("WHATSAPP_DEFAULT_TO_NUMBER", default="")
+    # "twilio" em produção; "stub" guarda as mensagens em memória (testes/dev)
+    transport: str = config("WHATSAPP_TRANSPORT", default="twilio")
 
     @property
     def is_configured(self) -> bool:
+        if self.transport == "stub":
+            return self.enabled
         return (
             self.enabled
             and bool(self.account_sid)
@@ -27,69 +29,61 @@ class WhatsappSettings:
         )
 
 
-class WhatsappNotifier:
-    """Wrapper simples para envio de alertas via WhatsApp (Twilio)."""
+class WhatsappTransportError(Exception):
+    """Falha no envio de uma mensagem pelo transporte"""
 
-    settings = WhatsappSettings()
 
-    @classmethod
-    def send_alert(cls, alerta) -> bool:
-        if not cls.settings.is_configured:
-            logger.debug("WhatsApp desabilitado ou não configurado.")
-            return False
-
-        destinatario = cls._resolve_destinatario(alerta)
-        if not destinatario:
-            logger.warning(
-                "Não foi possível determinar o telefone de destino para o alerta %s",
-                alerta.id,
-            )
-            return False
-
-        to_number = cls._format_number(destinatario)
-        if not to_number:
-            logger.warning(
-                "Telefone inválido para alerta %s: %s", alerta.id, destinatario
-            )
-            return False
-
-        from_number = cls._ensure_whatsapp_prefix(cls.settings.from_number)
-        mensagem = cls._montar_mensagem(alerta)
+class TwilioTransport:
+    """
+    Transporte Twilio com um único Client (e sessão HTTP) reutilizado por
+    todas as mensagens do worker.
+    """
+
+    def __init__(self, settings: WhatsappSettings):
+        self.from_number = WhatsappNotifier._ensure_whatsapp_prefix(settings.from_number)
+        self.client = Client(settings.account_sid, settings.auth_token)
 
+    def send(self, to_number: str, body: str) -> None:
         try:
-            client = Client(cls.settings.account_sid, cls.settings.auth_token)
-            client.messages.create(
-                from_=from_number,
-                to=to_number,
-                body=mensagem,
-            )
-            logger.info(
-                "Alerta %s enviado via WhatsApp para %s", alerta.id, to_number
-            )
-            return True
+            self.client.messages.create(from_=self.from_number, to=to_number, body=body)
         except TwilioRestException as exc:
-            logger.exception("Falha ao enviar alerta %s via WhatsApp: %s", alerta.id, exc)
-            return False
-        except Exception as exc:  # noqa: BLE001
-            logger.exception(
-                "Erro inesperado ao enviar alerta %s via WhatsApp: %s", alerta.id, exc
-            )
-            return False
+            raise WhatsappTransportError(str(exc)) from exc
 
-    @classmethod
-    def _resolve_destinatario(cls, alerta) -> Optional[str]:
-        empresa = getattr(alerta, "empresa", None)
-        if not empresa and alerta.produto_id:
-            empresa = getattr(alerta.produto, "empresa", None)
-        if not empresa and alerta.cliente_id:
-            empresa = getattr(alerta.cliente, "empresa", None)
-
-        telefone = getattr(empresa, "telefone_contato", None) if empresa else None
-        if telefone:
-            return telefone
-
-        # fallback global
-        return cls.settings.default_to_number
+
+class StubTransport:
+    """
+    Transporte local: guarda as mensagens em memória em vez de enviá-las.
+    Números em `failing_numbers` falham, para exercitar as retentativas.
+    """
+
+    def __init__(self, settings: Optional[WhatsappSettings] = None):
+        self.sent = []
+        self.failing_numbers = set()
+        self._lock = threading.Lock()
+
+    def send(self, to_number: str, body: str) -> None:
+        if to_number in self.failing_numbers:
+            raise WhatsappTransportError(f"Falha simulada para {to_number}")
+        with self._lock:
+            self.sent.append((to_number, body))
+
+
+TRANSPORTS = {"twilio": TwilioTransport, "stub": StubTransport}
+
+
+def build_transport(settings: Optional[WhatsappSettings] = None):
+    """Instancia o transporte configurado em WHATSAPP_TRANSPORT"""
+    settings = settings or WhatsappNotifier.settings
+    return TRANSPORTS[settings.transport](settings)
+
+
+class WhatsappNotifier:
+    """
+    Configuração e formatação de números/mensagens do WhatsApp; o envio
+    fica com os transportes (NotificacaoService / enviar_notificacoes).
+    """
+
+    settings = WhatsappSettings()
 
     @classmethod
     def _format_number(cls, raw: Optional[str]) -> Optional[str]:
@@ -0,0 +1,72 @@
+"""
+Paginação padrão da API.
+
+Mantém a paginação por número de página (com COUNT(*)) como padrão e
+oferece, nos endpoints que declaram `cursor_ordering`, um modo cursor
+(keyset) opcional: `?paginacao=cursor`. Cada página é uma busca pelo
+índice de (-created_at, id), com custo constante mesmo em páginas
+profundas, e o total só é contado quando pedido com `?com_total=true`.
+"""
+
+from collections import OrderedDict
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+class CursorPorData(CursorPagination):
+    """Paginação keyset ordenada por data de criação (mais recentes primeiro)"""
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 200
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, "cursor_ordering", None) or self.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # COUNT(*) é opcional: só quando o cliente pede explicitamente
+        self.count = None
+        if request.query_params.get("com_total", "").lower() == "true":
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        resposta = OrderedDict(
+            [("next", self.get_next_link()), ("previous", self.get_previous_link())]
+        )
+        if self.count is not None:
+            resposta["count"] = self.count
+        resposta["results"] = data
+        return Response(resposta)
+
+
+class PaginacaoHibrida(PageNumberPagination):
+    """
+    PageNumberPagination com modo cursor opcional.
+
+    O modo cursor é ativado por `?paginacao=cursor` (ou por um `?cursor=`
+    vindo do link `next`) apenas em views com o atributo `cursor_ordering`.
+    """
+
+    cursor_class = CursorPorData
+
+    def _usar_cursor(self, request, view):
+        if not getattr(view, "cursor_ordering", None):
+            return False
+        return (
+            request.query_params.get("paginacao") == "cursor"
+            or self.cursor_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginador_cursor = None
+        if self._usar_cursor(request, view):
+            self.paginador_cursor = self.cursor_class()
+            return self.paginador_cursor.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.paginador_cursor is not None:
+            return self.paginador_cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -3,9 +3,10 @@ Serializers para API - HMConveniencia
 """
 
 import logging
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from django.db.models import Sum
 from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from fiscal.models import NotaFiscal
 from .models import (
@@ -22,6 +23,7 @@ from .models import (
     InventarioSessao,
     InventarioItem,
 )
+from .services.venda_service import VendaService
 
 logger = logging.getLogger(__name__)
 
@@ -188,7 +190,40 @@ class CategoriaSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at"]
 
 
-class LoteSerializer(serializers.ModelSerializer):
+class VencimentoSerializerMixin:
+    """
+    Campos de vencimento calculados contra um "hoje" único por requisição.
+
+    A view coloca `hoje` no contexto (get_serializer_context); sem ele, a
+    data local é calculada uma vez e guardada no contexto do serializer, que
+    é compartilhado com os serializers aninhados.
+    """
+
+    def _hoje(self):
+        hoje = self.context.get("hoje")
+        if hoje is None:
+            hoje = timezone.localdate()
+            self.context["hoje"] = hoje
+        return hoje
+
+    def _dias_para_vencer(self, obj):
+        if not obj.data_validade:
+            return None
+        return (obj.data_validade - self._hoje()).days
+
+    def get_esta_vencido(self, obj):
+        dias = self._dias_para_vencer(obj)
+        return dias is not None and dias < 0
+
+    def get_dias_para_vencer(self, obj):
+        return self._dias_para_vencer(obj)
+
+    def get_proximo_vencimento(self, obj):
+        dias = self._dias_para_vencer(obj)
+        return dias is not None and 0 <= dias <= 7
+
+
+class LoteSerializer(VencimentoSerializerMixin, serializers.ModelSerializer):
     """Serializer para Lotes"""
 
     produto_nome = serializers.CharField(source="produto.nome", read_only=True)
@@ -233,15 +268,6 @@ class LoteSerializer(serializers.ModelSerializer):
             "fornecedor_nome",
         ]
 
-    def get_esta_vencido(self, obj):
-        return obj.esta_vencido
-
-    def get_dias_para_vencer(self, obj):
-        return obj.dias_para_vencer
-
-    def get_proximo_vencimento(self, obj):
-        return obj.proximo_vencimento
-
     def validate_quantidade(self, value):
         if value is None or value <= 0:
             raise serializers.ValidationError("Quantidade deve ser maior que zero")
@@ -257,7 +283,7 @@ class LoteSerializer(serializers.ModelSerializer):
             return super().update(instance, validated_data)
 
 
-class ProdutoSerializer(serializers.ModelSerializer):
+class ProdutoSerializer(VencimentoSerializerMixin, serializers.ModelSerializer):
     margem_lucro = serializers.SerializerMethodField()
     categoria_nome = serializers.CharField(source="categoria.nome", read_only=True)
     esta_vencido = serializers.SerializerMethodField()
@@ -313,24 +339,21 @@ class ProdutoSerializer(serializers.ModelSerializer):
     def get_margem_lucro(self, obj):
         return float(obj.margem_lucro)
 
-    def get_esta_vencido(self, obj):
-        return obj.esta_vencido
-
-    def get_dias_para_vencer(self, obj):
-        return obj.dias_para_vencer
-
-    def get_proximo_vencimento(self, obj):
-        return obj.proximo_vencimento
-
     def get_total_lotes(self, obj):
         """Retorna quantidade de lotes ativos do produto"""
+        # Usa annotate se disponível (LoteService.anotar_produtos)
+        if hasattr(obj, "lotes_ativos_count"):
+            return obj.lotes_ativos_count
+
+        # Fallback (uma query por produto)
         return obj.lotes.filter(ativo=True).count()
 
     def get_estoque_lotes(self, obj):
         """Retorna estoque total somando todos os lotes ativos"""
-        from django.db.models import Sum
-
-        total = obj.lotes.filter(ativo=True).aggregate(total=Sum("quantidade"))["total"]
+        if hasattr(obj, "lotes_ativos_estoque"):
+            total = obj.lotes_ativos_estoque
+        else:
+            total = obj.lotes.filter(ativo=True).aggregate(total=Sum("quantidade"))["total"]
         return float(total) if total else 0.0
 
 
@@ -515,6 +538,8 @@ class CaixaSerializer(serializers.ModelSerializer):
             "total_pix",
             "total_fiado",
             "total_vendas",
+            "total_sangrias",
+            "total_suprimentos",
         ]
         read_only_fields = [
             "data_abertura",
@@ -529,6 +554,8 @@ class CaixaSerializer(serializers.ModelSerializer):
             "total_pix",
             "total_fiado",
             "total_vendas",
+            "total_sangrias",
+            "total_suprimentos",
         ]
 
 
@@ -576,15 +603,13 @@ class VendaCreateSerializer(serializers.Serializer):
                     )
 
                 # VALIDAÇÃO CRÍTICA: Verifica limite de crédito
-                # Calcula o total da venda
+                # Calcula o total da venda com os produtos já carregados em validate_itens
+                produtos = getattr(self, "_produtos", {})
                 total_venda = Decimal("0")
-                for item in data.get("itens", []):
-                    try:
-                        produto = Produto.objects.get(id=int(item["produto_id"]))
-                        quantidade = Decimal(item["quantidade"])
+                for produto_id, quantidade in data.get("itens", []):
+                    produto = produtos.get(produto_id)
+                    if produto:
                         total_venda += produto.preco * quantidade
-                    except (Produto.DoesNotExist, ValueError, KeyError):
-                        pass  # Será validado em validate_itens
 
                 # Aplica desconto
                 total_venda -= data.get("desconto", Decimal("0"))
@@ -611,10 +636,17 @@ class VendaCreateSerializer(serializers.Serializer):
         return data
 
     def validate_itens(self, value):
-        """Valida os itens da venda"""
+        """
+        Valida os itens da venda.
+        Carrega todos os produtos em uma única query (in_bulk), ou usa o mapa
+        recebido em context["produtos"], e guarda o mapa para validate() e
+        create() não buscarem de novo.
+        Retorna lista de tuplas (produto_id, quantidade).
+        """
         if not value:
             raise serializers.ValidationError("Venda deve ter pelo menos um item")
 
+        itens = []
         for idx, item in enumerate(value):
             if "produto_id" not in item or "quantidade" not in item:
                 raise serializers.ValidationError(
@@ -624,67 +656,131 @@ class VendaCreateSerializer(serializers.Serializer):
             try:
                 produto_id = int(item["produto_id"])
                 quantidade = Decimal(str(item["quantidade"]))
+                if not quantidade.is_finite():
+                    raise ValueError(quantidade)
+            except (ValueError, TypeError, InvalidOperation):
+                raise serializers.ValidationError(
+                    f"Item {idx + 1}: produto_id e quantidade devem ser números válidos"
+                )
 
-                if quantidade <= 0:
-                    raise serializers.ValidationError(
-                        f"Item {idx + 1}: quantidade deve ser maior que zero"
-                    )
+            if quantidade <= 0:
+                raise serializers.ValidationError(
+                    f"Item {idx + 1}: quantidade deve ser maior que zero"
+                )
 
-                produto = Produto.objects.get(id=produto_id)
-                if not produto.ativo:
-                    raise serializers.ValidationError(
-                        f"Produto '{produto.nome}' está inativo e não pode ser vendido"
-                    )
+            itens.append((produto_id, quantidade))
 
-                if not produto.tem_estoque(quantidade):
-                    raise serializers.ValidationError(
-                        f"Estoque insuficiente para '{produto.nome}'. "
-                        f"Disponível: {produto.estoque}, solicitado: {quantidade}"
-                    )
+        # Sincronização em lote pode passar os produtos já carregados no contexto
+        produtos = self.context.get("produtos")
+        if produtos is None:
+            produtos = VendaService.carregar_produtos(
+                produto_id for produto_id, _ in itens
+            )
 
-            except Produto.DoesNotExist:
+        for idx, (produto_id, _) in enumerate(itens):
+            produto = produtos.get(produto_id)
+            if produto is None:
                 raise serializers.ValidationError(
                     f"Item {idx + 1}: produto com ID {produto_id} não encontrado"
                 )
-            except (ValueError, TypeError):
+            if not produto.ativo:
                 raise serializers.ValidationError(
-                    f"Item {idx + 1}: produto_id e quantidade devem ser números válidos"
+                    f"Produto '{produto.nome}' está inativo e não pode ser vendido"
                 )
 
-        return value
+        # Estoque é validado pelo total do produto no carrinho
+        for produto_id, quantidade in VendaService.agrupar_quantidades(itens).items():
+            produto = produtos[produto_id]
+            if not produto.tem_estoque(quantidade):
+                raise serializers.ValidationError(
+                    f"Estoque insuficiente para '{produto.nome}'. "
+                    f"Disponível: {produto.estoque}, solicitado: {quantidade}"
+                )
+
+        self._produtos = produtos
+        return itens
 
     def create(self, validated_data):
-        """Cria venda com itens"""
-        itens_data = validated_data.pop("itens")
-
-        # Cria a venda
-        venda = Venda.objects.create(
-            forma_pagamento=validated_data["forma_pagamento"],
-            desconto=validated_data.get("desconto", 0),
-            observacoes=validated_data.get("observacoes", ""),
-        )
+        """Cria venda com itens (checkout em lote)"""
+        try:
+            return VendaService.registrar_venda(
+                itens=validated_data["itens"],
+                produtos=self._produtos,
+                forma_pagamento=validated_data["forma_pagamento"],
+                cliente_id=validated_data.get("cliente_id"),
+                data_vencimento=validated_data.get("data_vencimento"),
+                desconto=validated_data.get("desconto", 0),
+                observacoes=validated_data.get("observacoes", ""),
+                empresa_id=validated_data.get("empresa_id"),
+            )
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
 
-        # Cria os itens
-        for item_data in itens_data:
-            produto = Produto.objects.get(id=int(item_data["produto_id"]))
-            quantidade = Decimal(item_data["quantidade"])
 
-            ItemVenda.objects.create(
-                venda=venda,
-                produto=produto,
-                quantidade=quantidade,
-                preco_unitario=produto.preco,
+class ReprecificacaoSerializer(serializers.Serializer):
+    """Parâmetros da reprecificação em massa (seleção + regra)"""
+
+    categoria_id = serializers.IntegerField(required=False, allow_null=True)
+    fornecedor_id = serializers.IntegerField(required=False, allow_null=True)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=True
+    )
+    regra = serializers.ChoiceField(choices=["percentual", "margem", "arredondar"])
+    valor = serializers.DecimalField(
+        max_digits=7, decimal_places=2, required=False, allow_null=True
+    )
+    arredondar_99 = serializers.BooleanField(default=False)
+    preview = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        if not (data.get("categoria_id") or data.get("fornecedor_id") or data.get("ids")):
+            raise serializers.ValidationError(
+                "Informe a seleção: categoria_id, fornecedor_id ou ids"
             )
+        if data["regra"] != "arredondar":
+            if data.get("valor") is None:
+                raise serializers.ValidationError({"valor": "Informe o percentual da regra"})
+            if data["valor"] <= Decimal("-100"):
+                raise serializers.ValidationError(
+                    {"valor": "O percentual deve ser maior que -100"}
+                )
+        return data
 
-        # Calcula total e finaliza
-        venda.calcular_total()
-        venda.finalizar(
-            forma_pagamento=validated_data["forma_pagamento"],
-            cliente_id=validated_data.get("cliente_id"),
-            data_vencimento=validated_data.get("data_vencimento"),
-        )
 
-        return venda
+class VendaLoteSerializer(serializers.Serializer):
+    """
+    Serializer para sincronização de vendas offline em lote.
+    Cada venda segue o formato de VendaCreateSerializer mais uma
+    chave_idempotencia gerada pelo terminal.
+    """
+
+    MAX_VENDAS = 500
+
+    vendas = serializers.ListField(
+        child=serializers.DictField(), allow_empty=False, max_length=MAX_VENDAS
+    )
+
+    def validate_vendas(self, value):
+        """Valida presença e unicidade das chaves de idempotência"""
+        chaves = set()
+        for idx, venda in enumerate(value):
+            chave = venda.get("chave_idempotencia")
+            if not isinstance(chave, str) or not chave.strip():
+                raise serializers.ValidationError(
+                    f"Venda {idx + 1}: chave_idempotencia é obrigatória"
+                )
+            chave = chave.strip()
+            if len(chave) > 64:
+                raise serializers.ValidationError(
+                    f"Venda {idx + 1}: chave_idempotencia deve ter no máximo 64 caracteres"
+                )
+            if chave in chaves:
+                raise serializers.ValidationError(
+                    f"Venda {idx + 1}: chave_idempotencia repetida no lote"
+                )
+            chaves.add(chave)
+            venda["chave_idempotencia"] = chave
+        return value
 
 
 class AlertaSerializer(serializers.ModelSerializer):
@@ -746,3 +842,80 @@ class AlertaSerializer(serializers.ModelSerializer):
             "lote_data_validade",
             "lote_fornecedor",
         ]
+
+
+# Sincronização incremental do catálogo (/sync/...): apenas campos do
+# próprio registro e de FKs carregadas com select_related, sem queries por item
+
+
+class ProdutoSyncSerializer(serializers.ModelSerializer):
+    margem_lucro = serializers.FloatField(read_only=True)
+    categoria_nome = serializers.CharField(source="categoria.nome", read_only=True)
+    fornecedor_nome = serializers.CharField(source="fornecedor.nome", read_only=True)
+
+    class Meta:
+        model = Produto
+        fields = [
+            "id",
+            "nome",
+            "marca",
+            "preco",
+            "preco_custo",
+            "estoque",
+            "codigo_barras",
+            "conteudo_valor",
+            "conteudo_unidade",
+            "data_validade",
+            "ativo",
+            "margem_lucro",
+            "categoria",
+            "categoria_nome",
+            "fornecedor",
+            "fornecedor_nome",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class ClienteSyncSerializer(serializers.ModelSerializer):
+    saldo_devedor = serializers.FloatField(source="saldo_em_aberto", read_only=True)
+
+    class Meta:
+        model = Cliente
+        fields = [
+            "id",
+            "nome",
+            "telefone",
+            "cpf",
+            "endereco",
+            "limite_credito",
+            "saldo_devedor",
+            "ativo",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class CategoriaSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Categoria
+        fields = ["id", "nome", "ativo", "validade_dias_padrao", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class FornecedorSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Fornecedor
+        fields = [
+            "id",
+            "nome",
+            "nome_fantasia",
+            "cnpj",
+            "telefone",
+            "email",
+            "ativo",
+            "created_at",
+            "updated_at",
+        ]
+        read_only_fields = fields
@@ -1,350 +1,388 @@
 """
 Serviço de Detecção e Criação de Alertas
+
+As verificações trabalham por conjunto: cada verificar_* monta os alertas
+candidatos com uma query, sincronizar() carrega os alertas abertos do tipo
+em um dicionário por alvo (cliente, produto, venda, caixa, lote) com uma
+query e grava só as diferenças - bulk_create dos novos, bulk_update dos
+alterados e um único UPDATE resolvendo os que deixaram de valer.
+
+Avaliação por evento: mutações de estoque, lotes, vendas, saldos e caixas
+chamam agendar() com os alvos afetados; os alvos se acumulam na transação
+e, após o commit, entram na fila ReavaliacaoAlerta com um único INSERT.
+O worker (check_alerts --pendentes) reavalia só os alvos da fila, fora da
+requisição. A verificação completa (check_alerts) fica como varredura de
+consistência.
 """
 
+import logging
+import threading
 from datetime import timedelta
+from django.db import transaction
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from core.models import Alerta, Cliente, Produto, Venda, Caixa
-from core.notifications.whatsapp import WhatsappNotifier
+from core.models import Alerta, Cliente, Produto, ReavaliacaoAlerta, Venda, Caixa
+from core.services.cache_service import CacheService
+from core.services.notificacao_service import NotificacaoService
+
+logger = logging.getLogger(__name__)
+
+# Alvos aguardando o commit para entrar na fila (por thread)
+_pendentes = threading.local()
 
 
 class AlertService:
     """Serviço para detectar e criar alertas do sistema"""
 
+    CAMPOS_ALVO = ("cliente_id", "produto_id", "venda_id", "caixa_id", "lote_id")
+    CAMPOS_ATUALIZAVEIS = ["prioridade", "titulo", "mensagem", "empresa"]
+    TAMANHO_LOTE = 500
+    TIMEOUT_RESUMO = 300  # invalidado pela tag "alertas" a cada escrita
+    TTL_MAXIMO_RESUMO = 900
+    PRIORIDADES = ("CRITICA", "ALTA", "MEDIA", "BAIXA")
+    LIMITE_POR_PRIORIDADE = 20
+    LIMITE_MAXIMO_POR_PRIORIDADE = 100
+    LIMITE_REAVALIACAO = 1000
+
+    @staticmethod
+    def _alvo(alerta):
+        """Chave do alvo do alerta: (cliente, produto, venda, caixa, lote)"""
+        return tuple(getattr(alerta, campo) for campo in AlertService.CAMPOS_ALVO)
+
+    @staticmethod
+    def _empresa_id(*objetos):
+        """Empresa do primeiro objeto relacionado que tenha uma"""
+        for obj in objetos:
+            if obj is not None and getattr(obj, "empresa_id", None):
+                return obj.empresa_id
+        return None
+
     @staticmethod
-    def criar_alerta(tipo, prioridade, titulo, mensagem, **kwargs):
+    def sincronizar(tipo, candidatos, resolver_ausentes=True, escopo=None):
         """
-        Cria um alerta se não existir um similar não resolvido
-        Retorna: (alerta, created)
+        Sincroniza os alertas abertos de um tipo com os candidatos da verificação.
+
+        Args:
+            tipo: Tipo do alerta (Alerta.TIPO_CHOICES)
+            candidatos: Alertas não salvos, um por alvo
+            resolver_ausentes: Resolve os alertas abertos cujo alvo não está
+                mais entre os candidatos (e duplicatas do mesmo alvo)
+            escopo: Filtro dos alertas abertos considerados (ex.:
+                {"produto_id__in": ids} na reavaliação de alvos específicos)
+
+        Returns:
+            list: Alertas criados
         """
-        filtro = {"tipo": tipo, "resolvido": False}
-        empresa = kwargs.get("empresa")
-
-        if not empresa:
-            for chave in ("produto", "cliente", "venda", "caixa"):
-                obj = kwargs.get(chave)
-                if obj and getattr(obj, "empresa_id", None):
-                    empresa = obj.empresa
-                    break
-
-        if empresa:
-            filtro["empresa"] = empresa
-
-        # Adiciona filtros específicos se fornecidos
-        if kwargs.get("cliente"):
-            filtro["cliente"] = kwargs["cliente"]
-        if kwargs.get("produto"):
-            filtro["produto"] = kwargs["produto"]
-        if kwargs.get("venda"):
-            filtro["venda"] = kwargs["venda"]
-        if kwargs.get("caixa"):
-            filtro["caixa"] = kwargs["caixa"]
-        if kwargs.get("lote"):
-            filtro["lote"] = kwargs["lote"]
-
-        alerta_existente = (
-            Alerta.objects.filter(**filtro).order_by("-created_at").first()
-        )
-
-        created = False
-        if alerta_existente:
-            # Atualiza informações caso prioridade/título/mensagem tenham mudado
+        abertos = {}
+        duplicados = []
+        alertas_abertos = Alerta.objects.filter(tipo=tipo, resolvido=False, **(escopo or {}))
+        # Mais recente primeiro: duplicatas antigas do mesmo alvo ficam de fora
+        for alerta in alertas_abertos.order_by("-created_at"):
+            if abertos.setdefault(AlertService._alvo(alerta), alerta) is not alerta:
+                duplicados.append(alerta.pk)
+
+        novos = []
+        alterados = []
+        for candidato in candidatos:
+            existente = abertos.pop(AlertService._alvo(candidato), None)
+            if existente is None:
+                novos.append(candidato)
+                continue
             alterado = False
-            if alerta_existente.prioridade != prioridade:
-                alerta_existente.prioridade = prioridade
-                alterado = True
-            if alerta_existente.titulo != titulo:
-                alerta_existente.titulo = titulo
-                alterado = True
-            if alerta_existente.mensagem != mensagem:
-                alerta_existente.mensagem = mensagem
-                alterado = True
-            if empresa and alerta_existente.empresa_id != getattr(empresa, "id", None):
-                alerta_existente.empresa = empresa
+            for campo in ("prioridade", "titulo", "mensagem"):
+                if getattr(existente, campo) != getattr(candidato, campo):
+                    setattr(existente, campo, getattr(candidato, campo))
+                    alterado = True
+            if candidato.empresa_id and existente.empresa_id != candidato.empresa_id:
+                existente.empresa_id = candidato.empresa_id
                 alterado = True
             if alterado:
-                alerta_existente.save(
-                    update_fields=["prioridade", "titulo", "mensagem", "updated_at"]
-                )
-            alerta = alerta_existente
-        else:
-            alerta = Alerta.objects.create(
-                tipo=tipo,
-                prioridade=prioridade,
-                titulo=titulo,
-                mensagem=mensagem,
-                cliente=kwargs.get("cliente"),
-                produto=kwargs.get("produto"),
-                venda=kwargs.get("venda"),
-                caixa=kwargs.get("caixa"),
-                lote=kwargs.get("lote"),
-                empresa=empresa,
+                alterados.append(existente)
+
+        criados = Alerta.objects.bulk_create(novos, batch_size=AlertService.TAMANHO_LOTE)
+        if alterados:
+            Alerta.objects.bulk_update(
+                alterados, AlertService.CAMPOS_ATUALIZAVEIS, batch_size=AlertService.TAMANHO_LOTE
             )
-            created = True
 
-        AlertService._enviar_notificacao(alerta)
-        return alerta, created
+        resolvidos = 0
+        ausentes = duplicados + ([alerta.pk for alerta in abertos.values()] if resolver_ausentes else [])
+        if ausentes:
+            resolvidos = Alerta.objects.filter(pk__in=ausentes, resolvido=False).update(
+                resolvido=True, resolvido_em=timezone.now()
+            )
+
+        AlertService._notificar(criados + alterados)
+        if criados or alterados or resolvidos:
+            # bulk_create/bulk_update/update não disparam signals
+            CacheService.invalidar("alertas")
+            logger.info(
+                f"Alertas {tipo}: {len(criados)} criado(s), {len(alterados)} atualizado(s), "
+                f"{resolvidos} resolvido(s)"
+            )
+        return criados
+
+    @staticmethod
+    def _restringir(queryset, ids, campo_alvo):
+        """
+        Restringe a verificação aos alvos informados.
+
+        Returns:
+            tuple: (queryset filtrado, escopo dos alertas abertos para sincronizar)
+        """
+        if ids is None:
+            return queryset, None
+        ids = list(ids)
+        return queryset.filter(pk__in=ids), {f"{campo_alvo}__in": ids}
 
     @staticmethod
-    def _enviar_notificacao(alerta: Alerta) -> None:
-        if alerta.prioridade not in {"ALTA", "CRITICA"}:
-            return
-        if alerta.notificado:
-            return
-        if WhatsappNotifier.send_alert(alerta):
-            alerta.notificado = True
-            alerta.save(update_fields=["notificado", "updated_at"])
+    def _notificar(alertas):
+        """Enfileira os alertas de prioridade alta (envio pelo worker enviar_notificacoes)"""
+        NotificacaoService.enfileirar(alertas)
 
     @classmethod
-    def verificar_limite_credito(cls):
+    def verificar_limite_credito(cls, ids=None):
         """
         Verifica clientes que estão usando >80% do limite de crédito
+        (ids: restringe aos clientes informados)
         Retorna: lista de alertas criados
         """
-        alertas_criados = []
+        candidatos = []
 
-        clientes_ativos = Cliente.objects.filter(ativo=True, limite_credito__gt=0)
+        # Saldo em aberto já vem na própria linha do cliente (sem agregação por cliente)
+        clientes_ativos, escopo = cls._restringir(
+            Cliente.objects.filter(ativo=True, limite_credito__gt=0, saldo_em_aberto__gt=0),
+            ids,
+            "cliente_id",
+        )
 
         for cliente in clientes_ativos:
-            saldo = cliente.saldo_devedor()
+            saldo = cliente.saldo_em_aberto
             limite = cliente.limite_credito
-
-            if saldo == 0:
-                continue
-
             percentual = (saldo / limite) * 100
 
             # Alerta CRÍTICO: >90%
             if percentual > 90:
                 titulo = f"🔴 {cliente.nome} - Limite Crítico ({percentual:.0f}%)"
-                mensagem = (
-                    f"Cliente está usando {percentual:.1f}% do limite de crédito!\n"
-                    f"Limite: R$ {limite:.2f}\n"
-                    f"Deve: R$ {saldo:.2f}\n"
-                    f"Disponível: R$ {(limite - saldo):.2f}"
-                )
-                alerta, created = cls.criar_alerta(
-                    tipo="LIMITE_CREDITO",
-                    prioridade="CRITICA",
-                    titulo=titulo,
-                    mensagem=mensagem,
-                    cliente=cliente,
-                )
-                if created:
-                    alertas_criados.append(alerta)
-
+                prioridade = "CRITICA"
+                mensagem = f"Cliente está usando {percentual:.1f}% do limite de crédito!\n"
             # Alerta ALTA: >80%
             elif percentual > 80:
                 titulo = f"⚠️ {cliente.nome} - Limite Alto ({percentual:.0f}%)"
-                mensagem = (
-                    f"Cliente está usando {percentual:.1f}% do limite de crédito.\n"
-                    f"Limite: R$ {limite:.2f}\n"
-                    f"Deve: R$ {saldo:.2f}\n"
-                    f"Disponível: R$ {(limite - saldo):.2f}"
-                )
-                alerta, created = cls.criar_alerta(
+                prioridade = "ALTA"
+                mensagem = f"Cliente está usando {percentual:.1f}% do limite de crédito.\n"
+            else:
+                continue
+
+            mensagem += (
+                f"Limite: R$ {limite:.2f}\n"
+                f"Deve: R$ {saldo:.2f}\n"
+                f"Disponível: R$ {(limite - saldo):.2f}"
+            )
+            candidatos.append(
+                Alerta(
                     tipo="LIMITE_CREDITO",
-                    prioridade="ALTA",
+                    prioridade=prioridade,
                     titulo=titulo,
                     mensagem=mensagem,
                     cliente=cliente,
+                    empresa_id=cliente.empresa_id,
                 )
-                if created:
-                    alertas_criados.append(alerta)
+            )
 
-        return alertas_criados
+        return cls.sincronizar("LIMITE_CREDITO", candidatos, escopo=escopo)
+
+    @staticmethod
+    def _lote_info(lote):
+        return f"Lote {lote.numero_lote}" if lote.numero_lote else f"Lote #{lote.id}"
 
     @classmethod
-    def verificar_produtos_vencendo(cls):
+    def verificar_produtos_vencendo(cls, ids=None):
         """
         Verifica LOTES que vencerão nos próximos 3 dias
+        (ids: restringe aos lotes informados)
         Retorna: lista de alertas criados
         """
         from ..models import Lote
 
-        alertas_criados = []
+        candidatos = []
 
         hoje = timezone.localdate()
         daqui_3_dias = hoje + timedelta(days=3)
 
         # Busca lotes ativos que vencerão nos próximos 3 dias
-        lotes = Lote.objects.filter(
-            ativo=True,
-            data_validade__isnull=False,
-            data_validade__lte=daqui_3_dias,
-            data_validade__gt=hoje,
-        ).select_related("produto")
+        lotes, escopo = cls._restringir(
+            Lote.objects.filter(
+                ativo=True,
+                data_validade__isnull=False,
+                data_validade__lte=daqui_3_dias,
+                data_validade__gt=hoje,
+            ).select_related("produto__categoria"),
+            ids,
+            "lote_id",
+        )
 
         for lote in lotes:
             dias = (lote.data_validade - hoje).days
             produto = lote.produto
-
-            lote_info = (
-                f"Lote {lote.numero_lote}" if lote.numero_lote else f"Lote #{lote.id}"
-            )
-
-            titulo = f"📅 {produto.nome} - {lote_info} vence em {dias} dia(s)"
-            mensagem = (
-                f"Lote vence em {lote.data_validade.strftime('%d/%m/%Y')}\n"
-                f"{lote_info}\n"
-                f"Quantidade: {lote.quantidade} un\n"
-                f"Produto: {produto.nome}\n"
-                f"Categoria: {produto.categoria.nome if produto.categoria else 'Sem categoria'}"
-            )
-
-            prioridade = "CRITICA" if dias <= 1 else "ALTA"
-
-            alerta, created = cls.criar_alerta(
-                tipo="PRODUTO_VENCENDO",
-                prioridade=prioridade,
-                titulo=titulo,
-                mensagem=mensagem,
-                produto=produto,
-                lote=lote,
+            lote_info = cls._lote_info(lote)
+
+            candidatos.append(
+                Alerta(
+                    tipo="PRODUTO_VENCENDO",
+                    prioridade="CRITICA" if dias <= 1 else "ALTA",
+                    titulo=f"📅 {produto.nome} - {lote_info} vence em {dias} dia(s)",
+                    mensagem=(
+                        f"Lote vence em {lote.data_validade.strftime('%d/%m/%Y')}\n"
+                        f"{lote_info}\n"
+                        f"Quantidade: {lote.quantidade} un\n"
+                        f"Produto: {produto.nome}\n"
+                        f"Categoria: {produto.categoria.nome if produto.categoria else 'Sem categoria'}"
+                    ),
+                    produto=produto,
+                    lote=lote,
+                    empresa_id=cls._empresa_id(produto),
+                )
             )
-            if created:
-                alertas_criados.append(alerta)
 
-        return alertas_criados
+        return cls.sincronizar("PRODUTO_VENCENDO", candidatos, escopo=escopo)
 
     @classmethod
-    def verificar_produtos_vencidos(cls):
+    def verificar_produtos_vencidos(cls, ids=None):
         """
         Verifica LOTES já vencidos
+        (ids: restringe aos lotes informados)
         Retorna: lista de alertas criados
         """
         from ..models import Lote
 
-        alertas_criados = []
+        candidatos = []
 
         hoje = timezone.localdate()
 
         # Busca lotes ativos que já venceram
-        lotes = Lote.objects.filter(
-            ativo=True, data_validade__isnull=False, data_validade__lt=hoje
-        ).select_related("produto")
+        lotes, escopo = cls._restringir(
+            Lote.objects.filter(
+                ativo=True, data_validade__isnull=False, data_validade__lt=hoje
+            ).select_related("produto"),
+            ids,
+            "lote_id",
+        )
 
         for lote in lotes:
             dias_vencido = (hoje - lote.data_validade).days
             produto = lote.produto
+            lote_info = cls._lote_info(lote)
 
-            lote_info = (
-                f"Lote {lote.numero_lote}" if lote.numero_lote else f"Lote #{lote.id}"
-            )
-
-            titulo = f"❌ {produto.nome} - {lote_info} VENCIDO há {dias_vencido} dia(s)"
-            mensagem = (
-                f"Lote venceu em {lote.data_validade.strftime('%d/%m/%Y')}\n"
-                f"{lote_info}\n"
-                f"Quantidade: {lote.quantidade} un\n"
-                f"Produto: {produto.nome}\n"
-                f"⚠️ REMOVER DO ESTOQUE IMEDIATAMENTE"
-            )
-
-            alerta, created = cls.criar_alerta(
-                tipo="PRODUTO_VENCIDO",
-                prioridade="CRITICA",
-                titulo=titulo,
-                mensagem=mensagem,
-                produto=produto,
-                lote=lote,
+            candidatos.append(
+                Alerta(
+                    tipo="PRODUTO_VENCIDO",
+                    prioridade="CRITICA",
+                    titulo=f"❌ {produto.nome} - {lote_info} VENCIDO há {dias_vencido} dia(s)",
+                    mensagem=(
+                        f"Lote venceu em {lote.data_validade.strftime('%d/%m/%Y')}\n"
+                        f"{lote_info}\n"
+                        f"Quantidade: {lote.quantidade} un\n"
+                        f"Produto: {produto.nome}\n"
+                        f"⚠️ REMOVER DO ESTOQUE IMEDIATAMENTE"
+                    ),
+                    produto=produto,
+                    lote=lote,
+                    empresa_id=cls._empresa_id(produto),
+                )
             )
-            if created:
-                alertas_criados.append(alerta)
 
-        return alertas_criados
+        return cls.sincronizar("PRODUTO_VENCIDO", candidatos, escopo=escopo)
 
     @classmethod
-    def verificar_estoque_baixo(cls):
+    def verificar_estoque_baixo(cls, ids=None):
         """
         Verifica produtos com estoque < 10
+        (ids: restringe aos produtos informados)
         Retorna: lista de alertas criados
         """
-        alertas_criados = []
-
-        produtos = Produto.objects.filter(ativo=True, estoque__lt=10, estoque__gt=0)
-        produtos_ids = list(produtos.values_list("id", flat=True))
-
-        # Resolve alertas antigos de estoque baixo para produtos que já normalizaram
-        Alerta.objects.filter(tipo="ESTOQUE_BAIXO", resolvido=False).exclude(
-            produto_id__in=produtos_ids
-        ).update(resolvido=True, resolvido_em=timezone.now())
-
-        for produto in produtos:
-            titulo = f"📦 {produto.nome} - Estoque Baixo ({produto.estoque})"
-            mensagem = (
-                f"Estoque atual: {produto.estoque} unidade(s)\n"
-                f"Preço: R$ {produto.preco:.2f}\n"
-                f"Categoria: {produto.categoria.nome if produto.categoria else 'Sem categoria'}"
-            )
-
-            prioridade = "ALTA" if produto.estoque <= 3 else "MEDIA"
+        produtos, escopo = cls._restringir(
+            Produto.objects.filter(ativo=True, estoque__lt=10, estoque__gt=0).select_related(
+                "categoria"
+            ),
+            ids,
+            "produto_id",
+        )
 
-            alerta, created = cls.criar_alerta(
+        candidatos = [
+            Alerta(
                 tipo="ESTOQUE_BAIXO",
-                prioridade=prioridade,
-                titulo=titulo,
-                mensagem=mensagem,
+                prioridade="ALTA" if produto.estoque <= 3 else "MEDIA",
+                titulo=f"📦 {produto.nome} - Estoque Baixo ({produto.estoque})",
+                mensagem=(
+                    f"Estoque atual: {produto.estoque} unidade(s)\n"
+                    f"Preço: R$ {produto.preco:.2f}\n"
+                    f"Categoria: {produto.categoria.nome if produto.categoria else 'Sem categoria'}"
+                ),
                 produto=produto,
+                empresa_id=produto.empresa_id,
             )
-            if created:
-                alertas_criados.append(alerta)
+            for produto in produtos
+        ]
 
-        return alertas_criados
+        # Produtos que normalizaram têm o alerta resolvido
+        return cls.sincronizar("ESTOQUE_BAIXO", candidatos, escopo=escopo)
 
     @classmethod
-    def verificar_estoque_zerado(cls):
+    def verificar_estoque_zerado(cls, ids=None):
         """
         Verifica produtos sem estoque
+        (ids: restringe aos produtos informados)
         Retorna: lista de alertas criados
         """
-        alertas_criados = []
-
-        produtos = Produto.objects.filter(ativo=True, estoque=0)
-        produtos_ids = list(produtos.values_list("id", flat=True))
-
-        Alerta.objects.filter(tipo="ESTOQUE_ZERADO", resolvido=False).exclude(
-            produto_id__in=produtos_ids
-        ).update(resolvido=True, resolvido_em=timezone.now())
-
-        for produto in produtos:
-            titulo = f"🚫 {produto.nome} - SEM ESTOQUE"
-            mensagem = (
-                f"Produto sem estoque disponível!\n"
-                f"Preço: R$ {produto.preco:.2f}\n"
-                f"Categoria: {produto.categoria.nome if produto.categoria else 'Sem categoria'}"
-            )
+        produtos, escopo = cls._restringir(
+            Produto.objects.filter(ativo=True, estoque=0).select_related("categoria"),
+            ids,
+            "produto_id",
+        )
 
-            alerta, created = cls.criar_alerta(
+        candidatos = [
+            Alerta(
                 tipo="ESTOQUE_ZERADO",
                 prioridade="ALTA",
-                titulo=titulo,
-                mensagem=mensagem,
+                titulo=f"🚫 {produto.nome} - SEM ESTOQUE",
+                mensagem=(
+                    f"Produto sem estoque disponível!\n"
+                    f"Preço: R$ {produto.preco:.2f}\n"
+                    f"Categoria: {produto.categoria.nome if produto.categoria else 'Sem categoria'}"
+                ),
                 produto=produto,
+                empresa_id=produto.empresa_id,
             )
-            if created:
-                alertas_criados.append(alerta)
+            for produto in produtos
+        ]
 
-        return alertas_criados
+        return cls.sincronizar("ESTOQUE_ZERADO", candidatos, escopo=escopo)
 
     @classmethod
-    def verificar_contas_vencidas(cls):
+    def verificar_contas_vencidas(cls, ids=None):
         """
         Verifica vendas fiado vencidas há mais de 7 dias
+        (ids: restringe às vendas informadas)
         Retorna: lista de alertas criados
         """
-        alertas_criados = []
+        candidatos = []
 
         hoje = timezone.localdate()
         limite = hoje - timedelta(days=7)
 
-        vendas = Venda.objects.filter(
-            status="FINALIZADA",
-            status_pagamento="PENDENTE",
-            forma_pagamento="FIADO",
-            data_vencimento__isnull=False,
-            data_vencimento__lt=limite,
-        ).select_related("cliente")
+        vendas, escopo = cls._restringir(
+            Venda.objects.filter(
+                status="FINALIZADA",
+                status_pagamento="PENDENTE",
+                forma_pagamento="FIADO",
+                data_vencimento__isnull=False,
+                data_vencimento__lt=limite,
+            ).select_related("cliente"),
+            ids,
+            "venda_id",
+        )
 
         for venda in vendas:
             dias_atraso = (hoje - venda.data_vencimento).days
@@ -367,32 +405,38 @@ class AlertService:
             else:
                 prioridade = "MEDIA"
 
-            alerta, created = cls.criar_alerta(
-                tipo="CONTA_VENCIDA",
-                prioridade=prioridade,
-                titulo=titulo,
-                mensagem=mensagem,
-                venda=venda,
-                cliente=venda.cliente,
+            candidatos.append(
+                Alerta(
+                    tipo="CONTA_VENCIDA",
+                    prioridade=prioridade,
+                    titulo=titulo,
+                    mensagem=mensagem,
+                    venda=venda,
+                    cliente=venda.cliente,
+                    empresa_id=cls._empresa_id(venda, venda.cliente),
+                )
             )
-            if created:
-                alertas_criados.append(alerta)
 
-        return alertas_criados
+        # Contas recebidas ou canceladas têm o alerta resolvido
+        return cls.sincronizar("CONTA_VENCIDA", candidatos, escopo=escopo)
 
     @classmethod
-    def verificar_diferenca_caixa(cls):
+    def verificar_diferenca_caixa(cls, ids=None):
         """
         Verifica caixas fechados com diferença > R$ 50
-        (Apenas últimos 7 dias)
+        (Apenas últimos 7 dias; ids: restringe aos caixas informados)
         Retorna: lista de alertas criados
         """
-        alertas_criados = []
+        candidatos = []
 
         limite_data = timezone.now() - timedelta(days=7)
 
-        caixas = Caixa.objects.filter(
-            status="FECHADO", data_fechamento__gte=limite_data, diferenca__isnull=False
+        caixas, escopo = cls._restringir(
+            Caixa.objects.filter(
+                status="FECHADO", data_fechamento__gte=limite_data, diferenca__isnull=False
+            ),
+            ids,
+            "caixa_id",
         )
 
         for caixa in caixas:
@@ -412,17 +456,108 @@ class AlertService:
                 # Diferença grande = prioridade alta
                 prioridade = "CRITICA" if diferenca_abs > 100 else "ALTA"
 
-                alerta, created = cls.criar_alerta(
-                    tipo="DIFERENCA_CAIXA",
-                    prioridade=prioridade,
-                    titulo=titulo,
-                    mensagem=mensagem,
-                    caixa=caixa,
+                candidatos.append(
+                    Alerta(
+                        tipo="DIFERENCA_CAIXA",
+                        prioridade=prioridade,
+                        titulo=titulo,
+                        mensagem=mensagem,
+                        caixa=caixa,
+                        empresa_id=caixa.empresa_id,
+                    )
                 )
-                if created:
-                    alertas_criados.append(alerta)
 
-        return alertas_criados
+        # A janela é de 7 dias: caixas mais antigos mantêm o alerta até a conferência manual
+        return cls.sincronizar(
+            "DIFERENCA_CAIXA", candidatos, resolver_ausentes=False, escopo=escopo
+        )
+
+    # ========== AVALIAÇÃO POR EVENTO ==========
+
+    # Alvo agendado -> verificações que dependem dele
+    VERIFICACOES_POR_ALVO = {
+        "produtos": ("verificar_estoque_baixo", "verificar_estoque_zerado"),
+        "lotes": ("verificar_produtos_vencendo", "verificar_produtos_vencidos"),
+        "clientes": ("verificar_limite_credito",),
+        "vendas": ("verificar_contas_vencidas",),
+        "caixas": ("verificar_diferenca_caixa",),
+    }
+
+    @classmethod
+    def agendar(cls, **alvos):
+        """
+        Agenda a reavaliação dos alertas dos alvos alterados. Chamadas na
+        mesma transação se acumulam e vão para a fila de uma vez após o
+        commit; a avaliação fica para o worker (avaliar_pendentes).
+
+        Args:
+            **alvos: produtos=, lotes=, clientes=, vendas=, caixas= (iteráveis de ids)
+        """
+        pendentes = getattr(_pendentes, "alvos", None)
+        if pendentes is None:
+            pendentes = _pendentes.alvos = {alvo: set() for alvo in cls.VERIFICACOES_POR_ALVO}
+        for alvo, ids in alvos.items():
+            pendentes[alvo].update(pk for pk in ids if pk)
+        # Um callback por chamada: o primeiro a rodar consome todos os alvos
+        # (se a transação for desfeita, os alvos ficam para o próximo commit)
+        transaction.on_commit(cls.enfileirar_pendentes)
+
+    @staticmethod
+    def enfileirar_pendentes():
+        """
+        Grava na fila os alvos agendados (um único INSERT; alvos já na fila
+        são ignorados).
+
+        Returns:
+            int: Alvos gravados
+        """
+        pendentes = getattr(_pendentes, "alvos", None)
+        _pendentes.alvos = None
+        if not pendentes:
+            return 0
+
+        registros = [
+            ReavaliacaoAlerta(alvo=alvo, objeto_id=pk)
+            for alvo, ids in pendentes.items()
+            for pk in ids
+        ]
+        if registros:
+            ReavaliacaoAlerta.objects.bulk_create(registros, ignore_conflicts=True)
+        return len(registros)
+
+    @classmethod
+    def avaliar_pendentes(cls, limite=LIMITE_REAVALIACAO):
+        """
+        Retira um lote de alvos da fila e reavalia os alertas deles.
+
+        Args:
+            limite: Máximo de alvos retirados nesta passada
+
+        Returns:
+            dict: {"alvos": retirados da fila, "criados": alertas criados}
+        """
+        with transaction.atomic():
+            reservados = list(
+                ReavaliacaoAlerta.objects.select_for_update(skip_locked=True).values_list(
+                    "pk", "alvo", "objeto_id"
+                )[:limite]
+            )
+            ReavaliacaoAlerta.objects.filter(pk__in=[pk for pk, _, _ in reservados]).delete()
+
+        por_alvo = {}
+        for _, alvo, objeto_id in reservados:
+            por_alvo.setdefault(alvo, set()).add(objeto_id)
+
+        total_criados = 0
+        for alvo, ids in por_alvo.items():
+            for verificacao in cls.VERIFICACOES_POR_ALVO[alvo]:
+                try:
+                    with transaction.atomic():
+                        total_criados += len(getattr(cls, verificacao)(ids=ids))
+                except Exception:  # noqa: BLE001
+                    # Alerta é auxiliar: a varredura periódica corrige depois
+                    logger.exception(f"Falha ao reavaliar alertas ({verificacao}) de {alvo}")
+        return {"alvos": len(reservados), "criados": total_criados}
 
     @classmethod
     def verificar_todos(cls):
@@ -445,17 +580,75 @@ class AlertService:
         return {"total_criados": total_criados, "detalhes": resultado}
 
     @staticmethod
-    def obter_resumo():
+    def obter_resumo(empresa_id=None):
         """
-        Retorna resumo de alertas não resolvidos
+        Resumo dos alertas não resolvidos, calculado com uma única agregação
+        condicional e guardado no cache até a próxima escrita de alertas.
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: Totais pendentes, não lidos e por prioridade
         """
-        alertas_pendentes = Alerta.objects.filter(resolvido=False)
-
-        return {
-            "total_pendentes": alertas_pendentes.count(),
-            "nao_lidos": alertas_pendentes.filter(lido=False).count(),
-            "criticos": alertas_pendentes.filter(prioridade="CRITICA").count(),
-            "altos": alertas_pendentes.filter(prioridade="ALTA").count(),
-            "medios": alertas_pendentes.filter(prioridade="MEDIA").count(),
-            "baixos": alertas_pendentes.filter(prioridade="BAIXA").count(),
-        }
+
+        def calcular():
+            alertas_pendentes = Alerta.objects.filter(resolvido=False)
+            if empresa_id:
+                alertas_pendentes = alertas_pendentes.filter(empresa_id=empresa_id)
+            return alertas_pendentes.aggregate(
+                total_pendentes=Count("id"),
+                nao_lidos=Count("id", filter=Q(lido=False)),
+                criticos=Count("id", filter=Q(prioridade="CRITICA")),
+                altos=Count("id", filter=Q(prioridade="ALTA")),
+                medios=Count("id", filter=Q(prioridade="MEDIA")),
+                baixos=Count("id", filter=Q(prioridade="BAIXA")),
+            )
+
+        return CacheService.obter(
+            "alertas_resumo",
+            ["alertas"],
+            calcular,
+            AlertService.TIMEOUT_RESUMO,
+            empresa_id=empresa_id,
+            ttl_maximo=AlertService.TTL_MAXIMO_RESUMO,
+        )
+
+    @staticmethod
+    def listar_por_prioridade(limite=LIMITE_POR_PRIORIDADE, pagina=1, empresa_id=None):
+        """
+        Página de alertas não resolvidos de cada prioridade, com uma query:
+        ROW_NUMBER() por prioridade (mais recentes primeiro) recorta a mesma
+        janela em todos os grupos.
+
+        Args:
+            limite: Alertas por prioridade (até LIMITE_MAXIMO_POR_PRIORIDADE)
+            pagina: Página dentro de cada prioridade (1 = mais recentes)
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: {prioridade: [Alerta, ...]} para todas as prioridades
+        """
+        limite = max(1, min(limite, AlertService.LIMITE_MAXIMO_POR_PRIORIDADE))
+        inicio = (max(pagina, 1) - 1) * limite
+
+        alertas = Alerta.objects.filter(resolvido=False)
+        if empresa_id:
+            alertas = alertas.filter(empresa_id=empresa_id)
+        alertas = (
+            alertas.select_related("cliente", "produto", "venda", "caixa", "lote")
+            .annotate(
+                posicao=Window(
+                    RowNumber(),
+                    partition_by=[F("prioridade")],
+                    order_by=[F("created_at").desc(), F("id").desc()],
+                )
+            )
+            .filter(posicao__gt=inicio, posicao__lte=inicio + limite)
+            .order_by("prioridade", "posicao")
+        )
+
+        grupos = {prioridade: [] for prioridade in AlertService.PRIORIDADES}
+        for alerta in alertas:
+            grupos.setdefault(alerta.prioridade, []).append(alerta)
+        return grupos
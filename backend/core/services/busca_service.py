@@ -0,0 +1,249 @@
+"""
+Serviço de busca textual do catálogo (produtos, clientes e fornecedores).
+
+A busca ignora acentos ("acucar" encontra "açúcar"), ordena os resultados
+por relevância e coloca primeiro os que começam pelo código digitado
+(código de barras, CPF, CNPJ, telefone).
+
+- PostgreSQL: `f_unaccent()` (wrapper IMMUTABLE de unaccent) com índices GIN
+  de trigramas (pg_trgm), criados na migração 0030. Filtra por ILIKE e
+  word_similarity e ordena pela similaridade.
+- SQLite (desenvolvimento e testes): tabelas virtuais FTS5 com o tokenizer
+  unicode61 (remove_diacritics), mantidas por triggers e ordenadas por bm25.
+  São (re)criadas no post_migrate, porque o SQLite descarta os triggers
+  quando o schema editor reconstrói a tabela.
+- Outros bancos: icontains simples.
+"""
+
+import logging
+import re
+
+from django.db import connections
+from django.db.models import (
+    BooleanField,
+    Case,
+    F,
+    FloatField,
+    Func,
+    IntegerField,
+    Q,
+    TextField,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
+
+from ..models import Cliente, Fornecedor, Produto
+
+logger = logging.getLogger(__name__)
+
+
+class _SemAcento(Func):
+    """f_unaccent(texto) - definida na migração 0030 (PostgreSQL)"""
+
+    function = "f_unaccent"
+    output_field = TextField()
+
+
+class _ContemSemAcento(Func):
+    """f_unaccent(campo) ILIKE f_unaccent(padrão) - usa o índice GIN de trigramas"""
+
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        campo, campo_params = compiler.compile(self.source_expressions[0])
+        padrao, padrao_params = compiler.compile(self.source_expressions[1])
+        return (
+            f"f_unaccent({campo}) ILIKE f_unaccent({padrao})",
+            [*campo_params, *padrao_params],
+        )
+
+
+class _SimilarSemAcento(Func):
+    """f_unaccent(termo) <% f_unaccent(campo) - word_similarity acima do limiar"""
+
+    output_field = BooleanField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        campo, campo_params = compiler.compile(self.source_expressions[0])
+        termo, termo_params = compiler.compile(self.source_expressions[1])
+        return (
+            f"f_unaccent({termo}) <%% f_unaccent({campo})",
+            [*termo_params, *campo_params],
+        )
+
+
+class BuscaService:
+    """Serviço de busca sem acentos, ranqueada, com prioridade por código"""
+
+    # modelo -> campos de texto (busca sem acento) e campos de código (prefixo)
+    CONFIG = {
+        Produto: {"texto": ["nome", "marca"], "codigos": ["codigo_barras"]},
+        Cliente: {"texto": ["nome"], "codigos": ["cpf", "telefone"]},
+        Fornecedor: {"texto": ["nome", "nome_fantasia"], "codigos": ["cnpj"]},
+    }
+
+    @staticmethod
+    def tabela_fts(model):
+        """Nome da tabela virtual FTS5 do modelo (SQLite)"""
+        return f"{model._meta.db_table}_busca"
+
+    @staticmethod
+    def _escapar_like(termo):
+        return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+    @staticmethod
+    def _consulta_fts(termo):
+        """Converte o termo em consulta FTS5: todos os tokens, por prefixo"""
+        tokens = re.findall(r"\w+", termo)
+        return " ".join(f'"{token}"*' for token in tokens)
+
+    @staticmethod
+    def filtrar(queryset, termo):
+        """
+        Filtra e ordena o queryset pelo termo de busca.
+
+        Anota `busca_prefixo` (1 se algum código começa pelo termo) e
+        `busca_relevancia` (maior = mais relevante) e ordena por eles,
+        seguidos da ordenação padrão do modelo.
+
+        Args:
+            queryset: QuerySet de Produto, Cliente ou Fornecedor
+            termo: Texto digitado pelo usuário
+
+        Returns:
+            QuerySet filtrado e ordenado
+        """
+        termo = (termo or "").strip()
+        if not termo:
+            return queryset
+
+        model = queryset.model
+        config = BuscaService.CONFIG[model]
+        vendor = connections[queryset.db].vendor
+
+        prefixo = Q()
+        for campo in config["codigos"]:
+            prefixo |= Q(**{f"{campo}__startswith": termo})
+
+        if vendor == "postgresql":
+            filtro, relevancia = BuscaService._filtro_postgresql(config, termo)
+        elif vendor == "sqlite":
+            filtro, relevancia = BuscaService._filtro_sqlite(model, config, termo)
+        else:
+            filtro = Q()
+            for campo in config["texto"]:
+                filtro |= Q(**{f"{campo}__icontains": termo})
+            relevancia = Value(0.0, output_field=FloatField())
+
+        ordenacao = list(model._meta.ordering or ["pk"])
+        return (
+            queryset.filter(filtro | prefixo)
+            .annotate(
+                busca_prefixo=Case(
+                    When(prefixo, then=Value(1)),
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                busca_relevancia=relevancia,
+            )
+            .order_by("-busca_prefixo", "-busca_relevancia", *ordenacao)
+        )
+
+    @staticmethod
+    def _filtro_postgresql(config, termo):
+        padrao = Value(f"%{BuscaService._escapar_like(termo)}%")
+        filtro = Q()
+        similaridades = []
+        for campo in config["texto"]:
+            filtro |= Q(_ContemSemAcento(F(campo), padrao))
+            filtro |= Q(_SimilarSemAcento(F(campo), Value(termo)))
+            similaridades.append(
+                Func(
+                    _SemAcento(Value(termo)),
+                    _SemAcento(F(campo)),
+                    function="word_similarity",
+                    output_field=FloatField(),
+                )
+            )
+        relevancia = (
+            Greatest(*similaridades) if len(similaridades) > 1 else similaridades[0]
+        )
+        return filtro, relevancia
+
+    @staticmethod
+    def _filtro_sqlite(model, config, termo):
+        # icontains mantém a busca por trecho no meio da palavra; o FTS5
+        # acrescenta a busca sem acento e o ranqueamento
+        filtro = Q()
+        for campo in config["texto"]:
+            filtro |= Q(**{f"{campo}__icontains": termo})
+
+        consulta = BuscaService._consulta_fts(termo)
+        if not consulta:
+            return filtro, Value(0.0, output_field=FloatField())
+
+        fts = BuscaService.tabela_fts(model)
+        tabela = model._meta.db_table
+        filtro |= Q(pk__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", [consulta]))
+        relevancia = RawSQL(
+            f'COALESCE((SELECT -bm25({fts}) FROM {fts} WHERE {fts} MATCH %s '
+            f'AND rowid = "{tabela}"."id"), 0)',
+            [consulta],
+            output_field=FloatField(),
+        )
+        return filtro, relevancia
+
+    @staticmethod
+    def instalar_fts_sqlite(connection):
+        """
+        Cria (se ausentes) as tabelas FTS5 e os triggers de sincronização
+        no SQLite e reconstrói o índice quando os triggers tiverem sumido.
+
+        Args:
+            connection: Conexão do banco (ignorada se não for SQLite)
+        """
+        if connection.vendor != "sqlite":
+            return
+
+        with connection.cursor() as cursor:
+            for model, config in BuscaService.CONFIG.items():
+                tabela = model._meta.db_table
+                fts = BuscaService.tabela_fts(model)
+                campos = config["texto"]
+                colunas = ", ".join(campos)
+                novos = ", ".join(f"new.{campo}" for campo in campos)
+                antigos = ", ".join(f"old.{campo}" for campo in campos)
+
+                cursor.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                    [f"{fts}_%"],
+                )
+                triggers_existentes = cursor.fetchone()[0]
+
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{colunas}, content='{tabela}', content_rowid='id', "
+                    f"tokenize='unicode61 remove_diacritics 2')"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabela} BEGIN "
+                    f"INSERT INTO {fts}(rowid, {colunas}) VALUES (new.id, {novos}); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabela} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {colunas}) "
+                    f"VALUES ('delete', old.id, {antigos}); END"
+                )
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {colunas} "
+                    f"ON {tabela} BEGIN "
+                    f"INSERT INTO {fts}({fts}, rowid, {colunas}) "
+                    f"VALUES ('delete', old.id, {antigos}); "
+                    f"INSERT INTO {fts}(rowid, {colunas}) VALUES (new.id, {novos}); END"
+                )
+
+                if triggers_existentes < 3:
+                    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                    logger.info(f"Índice de busca {fts} reconstruído")
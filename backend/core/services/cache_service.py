@@ -0,0 +1,190 @@
+"""
+Cache com invalidação por tags versionadas.
+
+Cada leitura em cache declara as tags de que depende ("estoque", "vendas",
+"clientes", "alertas") e a chave é montada com a versão atual dessas tags. Escritas
+incrementam a versão da tag (signals e serviços) e as chaves antigas
+deixam de ser lidas e expiram sozinhas: a invalidação é O(1) e completa.
+
+Versões por escopo:
+- empresa X: incrementada em escritas da empresa X;
+- "todas": incrementada em qualquer escrita com empresa conhecida (leituras
+  sem empresa agregam todas);
+- global: incrementada em escritas sem empresa conhecida (ex.: UPDATE de
+  estoque por IDs) e lida por todos os escopos.
+
+Proteção contra estouro de recálculo (obter): cada valor tem validade suave
+(timeout) e dura (ttl_maximo). Vencida a suave - ou antes, por sorteio
+proporcional ao tempo de cálculo (expiração antecipada probabilística) -
+só quem obtém a trava recalcula; os demais continuam recebendo o valor
+anterior até a validade dura.
+"""
+
+import logging
+import math
+import random
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class CacheService:
+    """Serviço de cache com chaves versionadas por tag e por empresa"""
+
+    TAGS = ("estoque", "vendas", "clientes", "alertas")
+    TRAVA_TIMEOUT = 30  # segundos: limite de um recálculo
+    ESPERA_MAXIMA = 2.0  # segundos aguardando o recálculo de outro worker
+    ESPERA_INTERVALO = 0.05
+    BETA = 1.0  # > 1 antecipa mais o recálculo
+
+    @staticmethod
+    def _chave_versao(tag, escopo):
+        return f"tag:{tag}:{escopo}"
+
+    @staticmethod
+    def _escopos_leitura(empresa_id):
+        return [empresa_id or "todas", "global"]
+
+    @staticmethod
+    def versoes(tags, empresa_id=None):
+        """
+        Lê (uma ida ao cache) as versões das tags no escopo da empresa.
+
+        Versões ausentes são criadas a partir do relógio: uma versão perdida
+        por expulsão do cache nunca volta a um valor já usado.
+
+        Args:
+            tags: Tags de que a leitura depende
+            empresa_id: Empresa da leitura (None = todas)
+
+        Returns:
+            list: Versões na ordem de tags x escopos
+        """
+        chaves = [
+            CacheService._chave_versao(tag, escopo)
+            for tag in tags
+            for escopo in CacheService._escopos_leitura(empresa_id)
+        ]
+        atuais = cache.get_many(chaves)
+        versoes = []
+        for chave in chaves:
+            versao = atuais.get(chave)
+            if versao is None:
+                cache.add(chave, time.time_ns(), None)
+                versao = cache.get(chave)
+            versoes.append(versao)
+        return versoes
+
+    @staticmethod
+    def chave(nome, tags, empresa_id=None, *partes):
+        """
+        Monta a chave de cache com as versões atuais das tags.
+
+        Args:
+            nome: Nome da leitura (ex.: "produtos_baixo_estoque")
+            tags: Tags de que a leitura depende
+            empresa_id: Empresa da leitura (None = todas)
+            *partes: Parâmetros adicionais da leitura (datas, janelas)
+
+        Returns:
+            str: Chave da leitura na versão atual
+        """
+        versoes = ".".join(str(versao) for versao in CacheService.versoes(tags, empresa_id))
+        sufixo = "".join(f":{parte}" for parte in partes)
+        return f"{nome}:{empresa_id or 'todas'}:{versoes}{sufixo}"
+
+    @staticmethod
+    def _precisa_recalcular(entrada, agora):
+        """Validade suave vencida ou sorteada para recálculo antecipado"""
+        # XFetch: agora - delta * beta * ln(U) >= expira, com U em (0, 1]
+        antecipacao = -entrada["delta"] * CacheService.BETA * math.log(1.0 - random.random())
+        return agora + antecipacao >= entrada["expira"]
+
+    @staticmethod
+    def _calcular_e_armazenar(cache_key, calcular, timeout, ttl_maximo):
+        inicio = time.monotonic()
+        valor = calcular()
+        entrada = {
+            "valor": valor,
+            "expira": time.time() + timeout,
+            "delta": time.monotonic() - inicio,
+        }
+        cache.set(cache_key, entrada, ttl_maximo)
+        return valor
+
+    @staticmethod
+    def obter(nome, tags, calcular, timeout, empresa_id=None, partes=(), ttl_maximo=None):
+        """
+        Retorna o valor da leitura em cache ou calcula e armazena, com um
+        único recálculo por vez (trava no cache).
+
+        Args:
+            nome: Nome da leitura
+            tags: Tags de que a leitura depende
+            calcular: Função sem argumentos que produz o valor
+            timeout: Validade suave em segundos (recálculo em segundo plano)
+            empresa_id: Empresa da leitura (None = todas)
+            partes: Parâmetros adicionais da leitura
+            ttl_maximo: Validade dura em segundos (padrão: 2x timeout); até
+                ela o valor anterior é servido enquanto outro worker recalcula
+
+        Returns:
+            Valor em cache ou recém-calculado
+        """
+        ttl_maximo = max(ttl_maximo or 2 * timeout, timeout)
+        cache_key = CacheService.chave(nome, tags, empresa_id, *partes)
+        chave_trava = f"{cache_key}:trava"
+
+        entrada = cache.get(cache_key)
+        if entrada is not None and not CacheService._precisa_recalcular(entrada, time.time()):
+            return entrada["valor"]
+
+        if not cache.add(chave_trava, 1, CacheService.TRAVA_TIMEOUT):
+            if entrada is not None:
+                # Outro worker já está recalculando: serve o valor anterior
+                return entrada["valor"]
+            # Sem valor anterior: aguarda o recálculo em andamento
+            limite = time.monotonic() + CacheService.ESPERA_MAXIMA
+            while time.monotonic() < limite:
+                time.sleep(CacheService.ESPERA_INTERVALO)
+                entrada = cache.get(cache_key)
+                if entrada is not None:
+                    return entrada["valor"]
+            logger.warning(f"Cache {cache_key}: recálculo concorrente não concluído, calculando")
+            return CacheService._calcular_e_armazenar(cache_key, calcular, timeout, ttl_maximo)
+
+        try:
+            return CacheService._calcular_e_armazenar(cache_key, calcular, timeout, ttl_maximo)
+        finally:
+            cache.delete(chave_trava)
+
+    @staticmethod
+    def _incrementar(tags, empresa_id):
+        escopos = [empresa_id, "todas"] if empresa_id else ["global"]
+        for tag in tags:
+            for escopo in escopos:
+                chave = CacheService._chave_versao(tag, escopo)
+                try:
+                    cache.incr(chave)
+                except ValueError:
+                    cache.set(chave, time.time_ns(), None)
+
+    @staticmethod
+    def invalidar(*tags, empresa_id=None):
+        """
+        Invalida as leituras que dependem das tags.
+
+        Incrementa agora e, dentro de uma transação, de novo após o commit:
+        uma leitura que tenha recalculado com dados ainda não confirmados
+        não sobrevive ao commit.
+
+        Args:
+            *tags: Tags alteradas
+            empresa_id: Empresa da escrita (None = desconhecida, invalida todas)
+        """
+        CacheService._incrementar(tags, empresa_id)
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(lambda: CacheService._incrementar(tags, empresa_id))
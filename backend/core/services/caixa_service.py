@@ -0,0 +1,158 @@
+"""
+Serviço dos contadores do caixa aberto.
+
+O caixa aberto guarda os totais por forma de pagamento e as somas de
+sangrias/suprimentos, atualizados com F() na mesma transação em que vendas,
+cancelamentos e movimentações são gravados. A prévia do fechamento passa a
+ser uma leitura pela chave primária; o fechamento confere os contadores
+contra o agregado das vendas e corrige eventuais divergências.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db.models import F, Q, Sum
+
+from ..models import Caixa, Venda
+
+logger = logging.getLogger(__name__)
+
+
+class CaixaService:
+    """Serviço para manter e conferir os contadores do caixa aberto"""
+
+    CAMPOS_POR_FORMA = {
+        "DINHEIRO": "total_dinheiro",
+        "DEBITO": "total_debito",
+        "CREDITO": "total_credito",
+        "PIX": "total_pix",
+        "FIADO": "total_fiado",
+    }
+
+    CAMPOS_CONTADORES = [
+        *CAMPOS_POR_FORMA.values(),
+        "total_vendas",
+        "total_sangrias",
+        "total_suprimentos",
+    ]
+
+    @staticmethod
+    def aplicar_vendas(deltas, momento, empresa_id=None):
+        """
+        Soma variações de vendas ao caixa aberto da empresa com um único UPDATE.
+
+        Args:
+            deltas: dict {forma_pagamento: delta} (negativo em cancelamentos)
+            momento: Data/hora da venda; só conta no caixa aberto antes dela
+            empresa_id: Empresa da venda (None = caixas sem empresa)
+
+        Returns:
+            int: Número de caixas atualizados (0 se não houver caixa aberto)
+        """
+        valores = {}
+        total = Decimal("0")
+        for forma_pagamento, delta in deltas.items():
+            campo = CaixaService.CAMPOS_POR_FORMA.get(forma_pagamento)
+            if not campo or not delta:
+                continue
+            delta = Decimal(str(delta))
+            valores[campo] = F(campo) + delta
+            total += delta
+        if not valores:
+            return 0
+
+        return Caixa.objects.filter(
+            status="ABERTO", data_abertura__lte=momento, empresa_id=empresa_id
+        ).update(total_vendas=F("total_vendas") + total, **valores)
+
+    @staticmethod
+    def aplicar_movimentacao(caixa_id, tipo, valor):
+        """
+        Soma uma sangria/suprimento (ou o estorno, com valor negativo)
+        aos contadores do caixa, se ele ainda estiver aberto.
+
+        Args:
+            caixa_id: ID do caixa
+            tipo: "SANGRIA" ou "SUPRIMENTO"
+            valor: Valor da movimentação
+
+        Returns:
+            int: Número de caixas atualizados
+        """
+        campo = "total_sangrias" if tipo == "SANGRIA" else "total_suprimentos"
+        return Caixa.objects.filter(pk=caixa_id, status="ABERTO").update(
+            **{campo: F(campo) + Decimal(str(valor))}
+        )
+
+    @staticmethod
+    def calcular_totais(caixa):
+        """
+        Calcula os totais a partir das vendas da empresa do caixa e das
+        movimentações (agregado bruto).
+
+        Args:
+            caixa: Caixa aberto
+
+        Returns:
+            dict: {campo: Decimal} para cada campo de CAMPOS_CONTADORES
+        """
+        totais = {campo: Decimal("0") for campo in CaixaService.CAMPOS_CONTADORES}
+
+        for forma_pagamento, total in (
+            Venda.objects.filter(
+                created_at__gte=caixa.data_abertura,
+                status="FINALIZADA",
+                empresa=caixa.empresa,
+            )
+            .values("forma_pagamento")
+            .annotate(soma=Sum("total"))
+            .values_list("forma_pagamento", "soma")
+        ):
+            campo = CaixaService.CAMPOS_POR_FORMA.get(forma_pagamento)
+            if campo:
+                totais[campo] += total or Decimal("0")
+                totais["total_vendas"] += total or Decimal("0")
+
+        movimentacoes = caixa.movimentacoes.aggregate(
+            sangrias=Sum("valor", filter=Q(tipo="SANGRIA")),
+            suprimentos=Sum("valor", filter=Q(tipo="SUPRIMENTO")),
+        )
+        totais["total_sangrias"] = movimentacoes["sangrias"] or Decimal("0")
+        totais["total_suprimentos"] = movimentacoes["suprimentos"] or Decimal("0")
+        return totais
+
+    @staticmethod
+    def conferir(caixa):
+        """
+        Confere os contadores do caixa contra o agregado bruto e corrige a
+        instância em memória quando houver divergência.
+
+        Args:
+            caixa: Caixa aberto (de preferência bloqueado com select_for_update)
+
+        Returns:
+            dict: {campo: (valor_contador, valor_real)} dos campos divergentes
+        """
+        divergencias = {}
+        for campo, valor_real in CaixaService.calcular_totais(caixa).items():
+            valor_contador = getattr(caixa, campo)
+            if valor_contador != valor_real:
+                divergencias[campo] = (valor_contador, valor_real)
+                setattr(caixa, campo, valor_real)
+
+        if divergencias:
+            logger.warning(
+                f"Caixa {caixa.id}: contadores divergentes corrigidos no fechamento: "
+                f"{divergencias}"
+            )
+        return divergencias
+
+    @staticmethod
+    def valor_esperado(caixa):
+        """Valor físico esperado: inicial + dinheiro + suprimentos - sangrias"""
+        return (
+            caixa.valor_inicial
+            + (caixa.total_dinheiro or Decimal("0"))
+            + (caixa.total_suprimentos or Decimal("0"))
+            - (caixa.total_sangrias or Decimal("0"))
+        )
@@ -0,0 +1,147 @@
+"""
+Serviço do índice de códigos de barras do PDV.
+
+O leitor do PDV precisa de uma busca exata por código de barras a cada
+bipe. O índice guarda, no cache e por empresa, uma entrada
+código → ID do produto; a leitura do produto é então feita pela chave
+primária. Sem entrada no cache, a busca cai para um filtro exato em
+codigo_barras (indexado) e repõe a entrada.
+
+O índice é aquecido pelo comando `aquecer_codigos_barras` e mantido pelos
+signals de save/delete de Produto. Entradas que ficaram obsoletas (código
+trocado por update em massa, produto desativado) são descartadas na
+própria leitura, pois o produto encontrado é sempre conferido.
+"""
+
+import logging
+
+from django.core.cache import cache
+
+from ..models import Produto
+
+logger = logging.getLogger(__name__)
+
+
+class IndiceCodigoBarrasService:
+    """Serviço para manter e consultar o índice código de barras → produto"""
+
+    CACHE_TIMEOUT = 60 * 60 * 24  # 24 horas
+    LOTE_AQUECIMENTO = 1000
+
+    @staticmethod
+    def cache_key(empresa_id, codigo):
+        """Chave de cache por (empresa, código)"""
+        return f"produto_ean_{empresa_id or 'todas'}_{codigo}"
+
+    @staticmethod
+    def _chaves_produto(produto, codigo=None):
+        """Chaves do produto no escopo da empresa e no escopo global"""
+        codigo = codigo or produto.codigo_barras
+        chaves = [IndiceCodigoBarrasService.cache_key(None, codigo)]
+        if produto.empresa_id:
+            chaves.append(IndiceCodigoBarrasService.cache_key(produto.empresa_id, codigo))
+        return chaves
+
+    @staticmethod
+    def registrar(produto):
+        """
+        Grava (ou remove, se inativo/sem código) as entradas do produto.
+
+        Args:
+            produto: Instância de Produto recém-salva
+        """
+        if not produto.codigo_barras:
+            return
+        chaves = IndiceCodigoBarrasService._chaves_produto(produto)
+        if produto.ativo:
+            cache.set_many(
+                {chave: produto.pk for chave in chaves},
+                IndiceCodigoBarrasService.CACHE_TIMEOUT,
+            )
+        else:
+            cache.delete_many(chaves)
+
+    @staticmethod
+    def remover(produto):
+        """
+        Remove as entradas do produto do índice.
+
+        Args:
+            produto: Instância de Produto excluída
+        """
+        if produto.codigo_barras:
+            cache.delete_many(IndiceCodigoBarrasService._chaves_produto(produto))
+
+    @staticmethod
+    def buscar(codigo, empresa_id=None, queryset=None):
+        """
+        Busca o produto ativo com o código de barras exato.
+
+        Args:
+            codigo: Código de barras lido
+            empresa_id: Restringe à empresa (None = todas)
+            queryset: Queryset base de Produto (ex.: com select_related)
+
+        Returns:
+            Produto ou None
+        """
+        codigo = (codigo or "").strip()
+        if not codigo:
+            return None
+
+        if queryset is None:
+            queryset = Produto.objects.all()
+        if empresa_id:
+            queryset = queryset.filter(empresa_id=empresa_id)
+
+        cache_key = IndiceCodigoBarrasService.cache_key(empresa_id, codigo)
+        produto_id = cache.get(cache_key)
+        if produto_id is not None:
+            produto = queryset.filter(pk=produto_id).first()
+            if produto and produto.ativo and produto.codigo_barras == codigo:
+                return produto
+            # Entrada obsoleta: descarta e segue pelo banco
+            cache.delete(cache_key)
+
+        produto = queryset.filter(codigo_barras=codigo, ativo=True).order_by("id").first()
+        if produto:
+            cache.set(cache_key, produto.pk, IndiceCodigoBarrasService.CACHE_TIMEOUT)
+        return produto
+
+    @staticmethod
+    def aquecer(empresa_id=None):
+        """
+        Carrega no cache as entradas de todos os produtos ativos com código.
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            int: Número de produtos indexados
+        """
+        produtos = Produto.objects.filter(ativo=True).exclude(codigo_barras="")
+        if empresa_id:
+            produtos = produtos.filter(empresa_id=empresa_id)
+
+        total = 0
+        entradas = {}
+        # Ordem decrescente: em códigos repetidos prevalece o menor ID,
+        # como na busca pelo banco
+        for produto_id, codigo, produto_empresa_id in produtos.order_by("-id").values_list(
+            "id", "codigo_barras", "empresa_id"
+        ).iterator(chunk_size=IndiceCodigoBarrasService.LOTE_AQUECIMENTO):
+            entradas[IndiceCodigoBarrasService.cache_key(None, codigo)] = produto_id
+            if produto_empresa_id:
+                entradas[
+                    IndiceCodigoBarrasService.cache_key(produto_empresa_id, codigo)
+                ] = produto_id
+            total += 1
+            if len(entradas) >= IndiceCodigoBarrasService.LOTE_AQUECIMENTO:
+                cache.set_many(entradas, IndiceCodigoBarrasService.CACHE_TIMEOUT)
+                entradas = {}
+
+        if entradas:
+            cache.set_many(entradas, IndiceCodigoBarrasService.CACHE_TIMEOUT)
+
+        logger.info(f"Índice de códigos de barras aquecido: {total} produto(s)")
+        return total
@@ -0,0 +1,163 @@
+"""
+Resolução da empresa (fiscal.Empresa) de uma requisição.
+
+A empresa vem do cabeçalho X-Empresa-Id ou do parâmetro ?empresa_id= e é
+resolvida uma única vez por requisição. As leituras em cache usam o id
+resolvido para particionar as chaves por empresa.
+
+O EmpresaMiddleware expõe request.empresa (resolvida sob demanda): a
+empresa informada ou, sem cabeçalho, a empresa padrão (a primeira
+cadastrada). As linhas de Empresa ficam em cache na memória do processo
+por CACHE_TIMEOUT segundos e são descartadas a cada save/delete de Empresa
+(signals); outros processos as recarregam ao fim do timeout.
+"""
+
+import time
+import uuid
+
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+
+from fiscal.models import Empresa
+
+# {id | PADRAO: (Empresa | None, expira)} - memória do processo
+_cache = {}
+
+
+class EmpresaService:
+    """Serviço para identificar a empresa da requisição"""
+
+    ATRIBUTO_REQUISICAO = "_empresa_id_resolvida"
+    ATRIBUTO_EMPRESA = "_empresa_resolvida"
+    CACHE_TIMEOUT = 60  # segundos
+    PADRAO = "padrao"
+
+    @staticmethod
+    def id_da_requisicao(request):
+        """
+        Retorna o id da empresa da requisição (memorizado na requisição).
+
+        Args:
+            request: Request do DRF ou HttpRequest
+
+        Returns:
+            UUID | None: Id da empresa ou None quando não informada (todas)
+
+        Raises:
+            ValidationError: Se o id informado não for um UUID
+        """
+        # O Request do DRF delega atributos ao HttpRequest: memoriza no original
+        alvo = getattr(request, "_request", request)
+        if hasattr(alvo, EmpresaService.ATRIBUTO_REQUISICAO):
+            return getattr(alvo, EmpresaService.ATRIBUTO_REQUISICAO)
+
+        valor = request.headers.get("X-Empresa-Id") or request.GET.get("empresa_id")
+        empresa_id = None
+        if valor:
+            empresa_id = EmpresaService._uuid(valor)
+
+        setattr(alvo, EmpresaService.ATRIBUTO_REQUISICAO, empresa_id)
+        return empresa_id
+
+    @staticmethod
+    def _uuid(valor):
+        try:
+            return uuid.UUID(str(valor))
+        except ValueError:
+            raise ValidationError({"empresa_id": f"Empresa inválida: {valor}"})
+
+    @staticmethod
+    def _em_cache(chave, carregar):
+        """Lê do cache do processo ou carrega; só guarda leituras confirmadas"""
+        agora = time.monotonic()
+        entrada = _cache.get(chave)
+        if entrada is not None and entrada[1] > agora:
+            return entrada[0]
+
+        empresa = carregar()
+        # Dentro de uma transação a linha pode não ter sido confirmada (ou ser
+        # desfeita): não vai para o cache compartilhado do processo
+        if not transaction.get_connection().in_atomic_block:
+            _cache[chave] = (empresa, agora + EmpresaService.CACHE_TIMEOUT)
+        return empresa
+
+    @staticmethod
+    def obter(empresa_id):
+        """
+        Retorna a empresa pelo id (cache do processo).
+
+        Args:
+            empresa_id: Id (UUID ou texto) da empresa
+
+        Returns:
+            Empresa: Empresa encontrada
+
+        Raises:
+            ValidationError: Se o id for inválido ou a empresa não existir
+        """
+        empresa_id = EmpresaService._uuid(empresa_id)
+        empresa = EmpresaService._em_cache(
+            empresa_id, lambda: Empresa.objects.filter(pk=empresa_id).first()
+        )
+        if empresa is None:
+            raise ValidationError({"empresa_id": f"Empresa não encontrada: {empresa_id}"})
+        return empresa
+
+    @staticmethod
+    def padrao():
+        """
+        Retorna a empresa padrão (a primeira cadastrada) ou None.
+
+        Returns:
+            Empresa | None: Empresa padrão
+        """
+        return EmpresaService._em_cache(
+            EmpresaService.PADRAO, lambda: Empresa.objects.order_by("created_at").first()
+        )
+
+    @staticmethod
+    def da_requisicao(request):
+        """
+        Retorna a empresa da requisição: a informada em X-Empresa-Id /
+        ?empresa_id= ou a padrão (memorizada na requisição).
+
+        Args:
+            request: Request do DRF ou HttpRequest
+
+        Returns:
+            Empresa | None: Empresa da requisição (None sem empresas cadastradas)
+
+        Raises:
+            ValidationError: Se o id informado for inválido ou não existir
+        """
+        alvo = getattr(request, "_request", request)
+        if hasattr(alvo, EmpresaService.ATRIBUTO_EMPRESA):
+            return getattr(alvo, EmpresaService.ATRIBUTO_EMPRESA)
+
+        empresa_id = EmpresaService.id_da_requisicao(request)
+        empresa = EmpresaService.obter(empresa_id) if empresa_id else EmpresaService.padrao()
+
+        setattr(alvo, EmpresaService.ATRIBUTO_EMPRESA, empresa)
+        return empresa
+
+    @staticmethod
+    def id_efetivo(request):
+        """
+        Id da empresa da requisição (a informada ou a padrão), para gravar
+        em vendas, caixas e demais registros criados pela requisição.
+
+        Args:
+            request: Request do DRF ou HttpRequest
+
+        Returns:
+            UUID | None: Id da empresa (None sem empresas cadastradas)
+        """
+        empresa = EmpresaService.da_requisicao(request)
+        return empresa.pk if empresa else None
+
+    @staticmethod
+    def limpar_cache():
+        """Descarta as empresas em cache no processo (agora e após o commit)"""
+        _cache.clear()
+        if transaction.get_connection().in_atomic_block:
+            transaction.on_commit(_cache.clear)
@@ -0,0 +1,184 @@
+"""
+Serviço único para mutações de Produto.estoque.
+
+Todas as alterações de estoque são feitas no banco com expressões F(),
+em um único UPDATE por lote de produtos, evitando o padrão
+ler-calcular-salvar que perde atualizações quando dois PDVs vendem o
+mesmo produto ao mesmo tempo.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from ..models import Produto
+from .alert_service import AlertService
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class EstoqueInsuficienteError(ValueError):
+    """
+    Um ou mais produtos não passaram na condição estoque >= quantidade.
+
+    Attributes:
+        falhas: dict {produto_id: estoque disponível no momento da falha}
+    """
+
+    def __init__(self, falhas):
+        self.falhas = falhas
+        detalhes = ", ".join(
+            f"produto {produto_id} (disponível: {disponivel})"
+            for produto_id, disponivel in falhas.items()
+        )
+        super().__init__(f"Estoque insuficiente para {detalhes}")
+
+
+class EstoqueService:
+    """Serviço para baixar, repor e ajustar estoque de forma atômica"""
+
+    @staticmethod
+    def _normalizar(quantidades):
+        """
+        Soma as quantidades por produto, descartando valores nulos.
+
+        Args:
+            quantidades: dict {produto_id: quantidade} ou iterável de tuplas
+
+        Returns:
+            dict: {produto_id: Decimal}
+        """
+        if isinstance(quantidades, dict):
+            quantidades = quantidades.items()
+
+        normalizadas = {}
+        for produto_id, quantidade in quantidades:
+            normalizadas[produto_id] = normalizadas.get(
+                produto_id, Decimal("0")
+            ) + Decimal(str(quantidade))
+        return {
+            produto_id: quantidade
+            for produto_id, quantidade in normalizadas.items()
+            if quantidade != 0
+        }
+
+    @staticmethod
+    def _por_produto(quantidades):
+        """Monta CASE id WHEN ... THEN quantidade END para um UPDATE em lote"""
+        return Case(
+            *[
+                When(pk=produto_id, then=Value(quantidade))
+                for produto_id, quantidade in quantidades.items()
+            ],
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    @staticmethod
+    def baixar(quantidades, empresa_id=None):
+        """
+        Baixa estoque de vários produtos com um único UPDATE condicional:
+        UPDATE ... SET estoque = estoque - n WHERE id IN (...) AND estoque >= n
+
+        Se alguma linha não passar na condição, nada é alterado e a exceção
+        informa quais produtos falharam, sem exigir um SELECT prévio.
+
+        Args:
+            quantidades: dict {produto_id: quantidade} ou iterável de tuplas
+                (produto_id, quantidade). Produtos repetidos são somados.
+            empresa_id: Empresa dos produtos (None = desconhecida), usada para
+                invalidar só o cache da empresa
+
+        Returns:
+            int: Número de produtos atualizados
+
+        Raises:
+            EstoqueInsuficienteError: Se algum produto não tiver estoque suficiente
+        """
+        quantidades = EstoqueService._normalizar(quantidades)
+        if not quantidades:
+            return 0
+
+        quantidade_por_produto = EstoqueService._por_produto(quantidades)
+
+        try:
+            with transaction.atomic():
+                atualizados = Produto.objects.filter(
+                    pk__in=quantidades.keys(),
+                    estoque__gte=quantidade_por_produto,
+                ).update(
+                    estoque=F("estoque") - quantidade_por_produto,
+                    updated_at=timezone.now(),
+                )
+                if atualizados != len(quantidades):
+                    # Desfaz as linhas que passaram para manter tudo-ou-nada
+                    raise EstoqueInsuficienteError({})
+        except EstoqueInsuficienteError:
+            # Só no caminho de falha: identifica quais produtos bloquearam
+            disponiveis = dict(
+                Produto.objects.filter(pk__in=quantidades.keys()).values_list(
+                    "id", "estoque"
+                )
+            )
+            falhas = {
+                produto_id: disponiveis.get(produto_id, Decimal("0"))
+                for produto_id, quantidade in quantidades.items()
+                if disponiveis.get(produto_id, Decimal("0")) < quantidade
+            }
+            logger.warning(f"Baixa de estoque rejeitada: {falhas}")
+            raise EstoqueInsuficienteError(falhas)
+
+        CacheService.invalidar("estoque", empresa_id=empresa_id)
+        AlertService.agendar(produtos=quantidades.keys())
+        return atualizados
+
+    @staticmethod
+    def ajustar(deltas, limitar_em_zero=False, empresa_id=None):
+        """
+        Aplica variações de estoque (positivas ou negativas) sem condição,
+        com um único UPDATE: SET estoque = estoque + delta.
+
+        Usado para entradas, devoluções, ajustes de inventário e para manter
+        Produto.estoque em sincronia com os lotes.
+
+        Args:
+            deltas: dict {produto_id: delta} ou iterável de tuplas
+            limitar_em_zero: Se True, o estoque resultante nunca fica negativo
+            empresa_id: Empresa dos produtos (None = desconhecida)
+
+        Returns:
+            int: Número de produtos atualizados
+        """
+        deltas = EstoqueService._normalizar(deltas)
+        if not deltas:
+            return 0
+
+        novo_estoque = F("estoque") + EstoqueService._por_produto(deltas)
+        if limitar_em_zero:
+            novo_estoque = Greatest(novo_estoque, Value(Decimal("0")))
+
+        atualizados = Produto.objects.filter(pk__in=deltas.keys()).update(
+            estoque=novo_estoque,
+            updated_at=timezone.now(),
+        )
+        CacheService.invalidar("estoque", empresa_id=empresa_id)
+        AlertService.agendar(produtos=deltas.keys())
+        return atualizados
+
+    @staticmethod
+    def repor(quantidades, empresa_id=None):
+        """
+        Devolve quantidades ao estoque (entrada, cancelamento).
+
+        Args:
+            quantidades: dict {produto_id: quantidade} ou iterável de tuplas
+            empresa_id: Empresa dos produtos (None = desconhecida)
+
+        Returns:
+            int: Número de produtos atualizados
+        """
+        return EstoqueService.ajustar(quantidades, empresa_id=empresa_id)
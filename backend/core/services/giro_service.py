@@ -0,0 +1,195 @@
+"""
+Serviço de análise de giro de estoque.
+
+Calcula no servidor, com uma única query agrupada de Produto juntando
+ItemVenda/Venda, as unidades vendidas na janela, a velocidade de venda,
+os dias de cobertura, o giro e o valor em estoque de cada produto, além
+do consolidado por categoria.
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import Produto
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class GiroEstoqueService:
+    """Serviço para calcular o giro de estoque por produto e por categoria"""
+
+    DIAS_PADRAO = 30
+    DIAS_MAXIMO = 365
+    CACHE_TIMEOUT = 300  # 5 minutos
+    DIAS_PARADO = 60
+
+    @staticmethod
+    def classificar(dias_sem_vender, velocidade):
+        """
+        Classifica o produto pelo tempo sem venda e pela velocidade.
+
+        Args:
+            dias_sem_vender: Dias desde a última venda (None = nunca vendido)
+            velocidade: Unidades vendidas por dia na janela
+
+        Returns:
+            str: NUNCA VENDIDO, PARADO, SEM VENDAS, GIRO LENTO, GIRO MÉDIO ou GIRO RÁPIDO
+        """
+        if dias_sem_vender is None:
+            return "NUNCA VENDIDO"
+        if dias_sem_vender > GiroEstoqueService.DIAS_PARADO:
+            return "PARADO"
+        if velocidade == 0:
+            return "SEM VENDAS"
+        if velocidade < 0.5:
+            return "GIRO LENTO"
+        if velocidade < 2:
+            return "GIRO MÉDIO"
+        return "GIRO RÁPIDO"
+
+    @staticmethod
+    def calcular(dias=DIAS_PADRAO, empresa_id=None):
+        """
+        Calcula o giro de estoque dos produtos ativos.
+
+        Args:
+            dias: Janela de análise em dias
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: {"dias", "produtos": [...], "categorias": [...]}
+        """
+        agora = timezone.now()
+        limite = agora - timedelta(days=dias)
+
+        produtos = Produto.objects.filter(ativo=True)
+        if empresa_id:
+            produtos = produtos.filter(empresa_id=empresa_id)
+
+        vendas_finalizadas = Q(itemvenda__venda__status="FINALIZADA")
+        linhas = (
+            produtos.values(
+                "id", "nome", "estoque", "preco", "preco_custo", "categoria__nome"
+            )
+            .annotate(
+                vendido=Coalesce(
+                    Sum(
+                        "itemvenda__quantidade",
+                        filter=vendas_finalizadas
+                        & Q(itemvenda__venda__created_at__gte=limite),
+                    ),
+                    Value(Decimal("0")),
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ),
+                ultima_venda=Max(
+                    "itemvenda__venda__created_at", filter=vendas_finalizadas
+                ),
+            )
+            .order_by()
+        )
+
+        resultado_produtos = []
+        por_categoria = {}
+        for linha in linhas:
+            estoque = linha["estoque"] or Decimal("0")
+            vendido = linha["vendido"] or Decimal("0")
+            velocidade = float(vendido) / dias
+            dias_sem_vender = (
+                (agora - linha["ultima_venda"]).days if linha["ultima_venda"] else None
+            )
+            # Valor a custo quando o custo estiver cadastrado
+            preco_base = linha["preco_custo"] or linha["preco"] or Decimal("0")
+            valor_estoque = estoque * preco_base
+            categoria = linha["categoria__nome"] or "Sem categoria"
+
+            resultado_produtos.append(
+                {
+                    "id": linha["id"],
+                    "nome": linha["nome"],
+                    "categoria": categoria,
+                    "estoque": float(estoque),
+                    "preco": float(linha["preco"]),
+                    "vendido": float(vendido),
+                    "velocidade": round(velocidade, 4),
+                    "dias_cobertura": (
+                        round(float(estoque) / velocidade, 1) if velocidade > 0 else None
+                    ),
+                    "giro": round(float(vendido / estoque), 4) if estoque > 0 else None,
+                    "valor_estoque": float(valor_estoque),
+                    "ultima_venda": linha["ultima_venda"],
+                    "dias_sem_vender": dias_sem_vender,
+                    "classificacao": GiroEstoqueService.classificar(
+                        dias_sem_vender, velocidade
+                    ),
+                }
+            )
+
+            grupo = por_categoria.setdefault(
+                categoria,
+                {
+                    "categoria": categoria,
+                    "produtos": 0,
+                    "estoque": Decimal("0"),
+                    "vendido": Decimal("0"),
+                    "valor_estoque": Decimal("0"),
+                },
+            )
+            grupo["produtos"] += 1
+            grupo["estoque"] += estoque
+            grupo["vendido"] += vendido
+            grupo["valor_estoque"] += valor_estoque
+
+        resultado_produtos.sort(key=lambda item: (-item["velocidade"], item["nome"]))
+
+        categorias = []
+        for grupo in sorted(por_categoria.values(), key=lambda g: g["categoria"]):
+            velocidade = float(grupo["vendido"]) / dias
+            categorias.append(
+                {
+                    "categoria": grupo["categoria"],
+                    "produtos": grupo["produtos"],
+                    "estoque": float(grupo["estoque"]),
+                    "vendido": float(grupo["vendido"]),
+                    "velocidade": round(velocidade, 4),
+                    "dias_cobertura": (
+                        round(float(grupo["estoque"]) / velocidade, 1)
+                        if velocidade > 0
+                        else None
+                    ),
+                    "giro": (
+                        round(float(grupo["vendido"] / grupo["estoque"]), 4)
+                        if grupo["estoque"] > 0
+                        else None
+                    ),
+                    "valor_estoque": float(grupo["valor_estoque"]),
+                }
+            )
+
+        return {"dias": dias, "produtos": resultado_produtos, "categorias": categorias}
+
+    @staticmethod
+    def obter(dias=DIAS_PADRAO, empresa_id=None):
+        """
+        Retorna o giro de estoque do cache ou calcula e armazena.
+
+        Args:
+            dias: Janela de análise em dias
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: Mesmo formato de calcular()
+        """
+        return CacheService.obter(
+            "produtos_giro",
+            ["estoque", "vendas"],
+            lambda: GiroEstoqueService.calcular(dias, empresa_id),
+            GiroEstoqueService.CACHE_TIMEOUT,
+            empresa_id=empresa_id,
+            partes=(dias,),
+        )
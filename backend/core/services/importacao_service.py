@@ -0,0 +1,368 @@
+"""
+Serviço de importação em massa de produtos a partir de CSV.
+
+O arquivo é lido em streaming e processado em lotes: cada lote busca os
+produtos existentes com uma única query `codigo_barras__in`, resolve
+categorias e fornecedores por um mapa em memória (criando os que faltam
+com bulk_create) e grava com bulk_create/bulk_update. No modo dry-run
+nada é gravado e o relatório traz as diferenças que seriam aplicadas.
+
+Colunas reconhecidas (cabeçalho, sem diferenciar maiúsculas/acentos):
+nome, codigo_barras, marca, preco, preco_custo, estoque, categoria,
+fornecedor e ativo. Células vazias não alteram produtos existentes.
+"""
+
+import csv
+import io
+import itertools
+import logging
+import unicodedata
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import Categoria, Fornecedor, Produto
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class ErroImportacao(ValueError):
+    """Arquivo de importação inválido (codificação, cabeçalho)"""
+
+
+class ImportacaoProdutosService:
+    """Serviço para importar produtos de CSV com gravação em lote"""
+
+    TAMANHO_LOTE = 500
+    MAX_ALTERACOES_RELATORIO = 200
+
+    # Cabeçalho normalizado -> campo
+    COLUNAS = {
+        "nome": "nome",
+        "produto": "nome",
+        "descricao": "nome",
+        "codigo_barras": "codigo_barras",
+        "codigo de barras": "codigo_barras",
+        "codigo": "codigo_barras",
+        "ean": "codigo_barras",
+        "gtin": "codigo_barras",
+        "marca": "marca",
+        "preco": "preco",
+        "preco_venda": "preco",
+        "preco de venda": "preco",
+        "preco_custo": "preco_custo",
+        "preco de custo": "preco_custo",
+        "custo": "preco_custo",
+        "estoque": "estoque",
+        "quantidade": "estoque",
+        "categoria": "categoria",
+        "fornecedor": "fornecedor",
+        "ativo": "ativo",
+    }
+    CAMPOS_DECIMAIS = ("preco", "preco_custo", "estoque")
+    TAMANHOS = {"nome": 200, "codigo_barras": 50, "marca": 120}
+    VERDADEIROS = {"1", "s", "sim", "true", "ativo"}
+    FALSOS = {"0", "n", "nao", "false", "inativo"}
+
+    @staticmethod
+    def _normalizar(texto):
+        """Minúsculas, sem acentos e sem espaços nas pontas"""
+        texto = unicodedata.normalize("NFKD", (texto or "").strip().lower())
+        return "".join(c for c in texto if not unicodedata.combining(c))
+
+    @staticmethod
+    def ler_csv(arquivo):
+        """
+        Abre o CSV em streaming, detectando ";" ou "," como separador.
+
+        Args:
+            arquivo: Arquivo binário (upload ou open(..., "rb"))
+
+        Returns:
+            Iterador de (numero_linha, {campo: valor})
+
+        Raises:
+            ErroImportacao: Se faltar cabeçalho ou as colunas nome/codigo_barras
+        """
+        texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+        try:
+            primeira = texto.readline()
+        except UnicodeDecodeError:
+            raise ErroImportacao("O arquivo deve estar em UTF-8")
+        if not primeira.strip():
+            raise ErroImportacao("Arquivo vazio ou sem cabeçalho")
+
+        separador = ";" if primeira.count(";") > primeira.count(",") else ","
+        leitor = csv.reader(itertools.chain([primeira], texto), delimiter=separador)
+        cabecalho = [
+            ImportacaoProdutosService.COLUNAS.get(ImportacaoProdutosService._normalizar(coluna))
+            for coluna in next(leitor)
+        ]
+        if "nome" not in cabecalho and "codigo_barras" not in cabecalho:
+            raise ErroImportacao("O cabeçalho deve ter a coluna 'nome' ou 'codigo_barras'")
+
+        def linhas():
+            try:
+                for numero, valores in enumerate(leitor, start=2):
+                    if not any(valor.strip() for valor in valores):
+                        continue
+                    yield numero, {
+                        campo: valor.strip()
+                        for campo, valor in zip(cabecalho, valores)
+                        if campo and valor.strip()
+                    }
+            except UnicodeDecodeError:
+                raise ErroImportacao("O arquivo deve estar em UTF-8")
+
+        return linhas()
+
+    @staticmethod
+    def _converter(dados):
+        """
+        Converte os valores de uma linha (decimais com vírgula, booleanos).
+
+        Raises:
+            ValueError: Com a mensagem do primeiro valor inválido
+        """
+        convertidos = dict(dados)
+        for campo, tamanho in ImportacaoProdutosService.TAMANHOS.items():
+            if len(convertidos.get(campo, "")) > tamanho:
+                raise ValueError(f"{campo} excede {tamanho} caracteres")
+
+        for campo in ImportacaoProdutosService.CAMPOS_DECIMAIS:
+            if campo not in convertidos:
+                continue
+            valor = convertidos[campo].replace("R$", "").strip()
+            if "," in valor:
+                valor = valor.replace(".", "").replace(",", ".")
+            try:
+                convertidos[campo] = Decimal(valor).quantize(Decimal("0.01"))
+            except InvalidOperation:
+                raise ValueError(f"{campo} inválido: {dados[campo]}")
+            if convertidos[campo] < 0:
+                raise ValueError(f"{campo} não pode ser negativo")
+
+        if "ativo" in convertidos:
+            valor = ImportacaoProdutosService._normalizar(convertidos["ativo"])
+            if valor in ImportacaoProdutosService.VERDADEIROS:
+                convertidos["ativo"] = True
+            elif valor in ImportacaoProdutosService.FALSOS:
+                convertidos["ativo"] = False
+            else:
+                raise ValueError(f"ativo inválido: {dados['ativo']}")
+        return convertidos
+
+    @staticmethod
+    def _mapa_por_nome(model, empresa_id):
+        registros = model.objects.all()
+        if empresa_id:
+            registros = registros.filter(empresa_id=empresa_id)
+        mapa = {}
+        for registro in registros.order_by("-id"):
+            mapa[ImportacaoProdutosService._normalizar(registro.nome)] = registro
+        return mapa
+
+    @staticmethod
+    def _resolver_nomes(model, campo, chave_relatorio, lote, contexto):
+        """Cria (ou, em dry-run, apenas registra) categorias/fornecedores ausentes"""
+        mapa = contexto[campo]
+        novos = {}
+        for _numero, dados in lote:
+            nome = dados.get(campo)
+            chave = ImportacaoProdutosService._normalizar(nome)
+            if nome and chave not in mapa and chave not in novos:
+                tamanho = model._meta.get_field("nome").max_length
+                novos[chave] = model(nome=nome[:tamanho], empresa_id=contexto["empresa_id"])
+        if not novos:
+            return
+
+        if not contexto["dry_run"]:
+            model.objects.bulk_create(novos.values())
+        mapa.update(novos)
+        contexto["relatorio"][chave_relatorio].extend(
+            registro.nome for registro in novos.values()
+        )
+
+    @staticmethod
+    def _valor_relatorio(campo, valor):
+        if campo in ("categoria", "fornecedor"):
+            return valor.nome if valor else None
+        if isinstance(valor, Decimal):
+            return str(valor)
+        return valor
+
+    @staticmethod
+    def _processar_lote(lote, contexto):
+        relatorio = contexto["relatorio"]
+        vistos = contexto["vistos"]
+
+        ImportacaoProdutosService._resolver_nomes(
+            Categoria, "categoria", "categorias_novas", lote, contexto
+        )
+        ImportacaoProdutosService._resolver_nomes(
+            Fornecedor, "fornecedor", "fornecedores_novos", lote, contexto
+        )
+
+        # Uma query por lote para os produtos já cadastrados
+        codigos = {
+            dados["codigo_barras"] for _numero, dados in lote if dados.get("codigo_barras")
+        } - vistos.keys()
+        existentes = {}
+        if codigos:
+            produtos = Produto.objects.select_related("categoria", "fornecedor").filter(
+                codigo_barras__in=codigos
+            )
+            if contexto["empresa_id"]:
+                produtos = produtos.filter(empresa_id=contexto["empresa_id"])
+            # Em códigos repetidos prevalece o menor ID
+            for produto in produtos.order_by("-id"):
+                existentes[produto.codigo_barras] = produto
+
+        novos = []
+        alterados = {}
+        campos_alterados = set()
+        for numero, dados in lote:
+            try:
+                dados = ImportacaoProdutosService._converter(dados)
+            except ValueError as exc:
+                relatorio["erros"].append({"linha": numero, "erro": str(exc)})
+                continue
+
+            for campo in ("categoria", "fornecedor"):
+                if campo in dados:
+                    dados[campo] = contexto[campo][
+                        ImportacaoProdutosService._normalizar(dados[campo])
+                    ]
+
+            codigo = dados.get("codigo_barras")
+            produto = (vistos.get(codigo) or existentes.get(codigo)) if codigo else None
+
+            if produto is None:
+                if not dados.get("nome") or "preco" not in dados:
+                    relatorio["erros"].append(
+                        {"linha": numero, "erro": "Produto novo precisa de nome e preco"}
+                    )
+                    continue
+                produto = Produto(empresa_id=contexto["empresa_id"], **dados)
+                novos.append(produto)
+                relatorio["criados"] += 1
+            else:
+                if "estoque" in dados and produto.usa_lotes:
+                    # Estoque de produto com lotes é a soma dos lotes
+                    dados.pop("estoque")
+                    relatorio["avisos"].append(
+                        {"linha": numero, "aviso": "Estoque ignorado: produto controlado por lotes"}
+                    )
+
+                diferencas = {}
+                for campo, valor in dados.items():
+                    atual = getattr(produto, campo)
+                    if atual != valor:
+                        diferencas[campo] = {
+                            "de": ImportacaoProdutosService._valor_relatorio(campo, atual),
+                            "para": ImportacaoProdutosService._valor_relatorio(campo, valor),
+                        }
+                        setattr(produto, campo, valor)
+
+                if not diferencas:
+                    relatorio["inalterados"] += 1
+                elif produto.pk is None:
+                    # Produto criado por uma linha anterior do mesmo lote
+                    pass
+                else:
+                    alterados[produto.pk] = produto
+                    campos_alterados.update(diferencas)
+                    relatorio["atualizados"] += 1
+                    if len(relatorio["alteracoes"]) < ImportacaoProdutosService.MAX_ALTERACOES_RELATORIO:
+                        relatorio["alteracoes"].append(
+                            {
+                                "linha": numero,
+                                "id": produto.pk,
+                                "codigo_barras": codigo,
+                                "nome": produto.nome,
+                                "campos": diferencas,
+                            }
+                        )
+
+            if codigo:
+                vistos[codigo] = produto
+
+        if contexto["dry_run"]:
+            return
+
+        if novos:
+            Produto.objects.bulk_create(novos, batch_size=ImportacaoProdutosService.TAMANHO_LOTE)
+        if alterados:
+            # bulk_update não aplica auto_now: updated_at alimenta /sync e o snapshot
+            agora = timezone.now()
+            for produto in alterados.values():
+                produto.updated_at = agora
+            Produto.objects.bulk_update(
+                alterados.values(),
+                sorted(campos_alterados | {"updated_at"}),
+                batch_size=ImportacaoProdutosService.TAMANHO_LOTE,
+            )
+
+    @staticmethod
+    def importar(arquivo, empresa_id=None, dry_run=False, tamanho_lote=None):
+        """
+        Importa (ou simula a importação de) produtos de um CSV.
+
+        Linhas com erro são ignoradas e listadas no relatório; as demais
+        são gravadas numa única transação.
+
+        Args:
+            arquivo: Arquivo CSV binário
+            empresa_id: Empresa dos produtos (None = todas/sem empresa)
+            dry_run: Se True, apenas calcula o relatório
+            tamanho_lote: Linhas por lote (padrão TAMANHO_LOTE)
+
+        Returns:
+            dict: Relatório com contagens, erros, avisos e alterações
+
+        Raises:
+            ErroImportacao: Se o arquivo for inválido
+        """
+        tamanho_lote = tamanho_lote or ImportacaoProdutosService.TAMANHO_LOTE
+        linhas = ImportacaoProdutosService.ler_csv(arquivo)
+
+        relatorio = {
+            "dry_run": dry_run,
+            "linhas": 0,
+            "criados": 0,
+            "atualizados": 0,
+            "inalterados": 0,
+            "categorias_novas": [],
+            "fornecedores_novos": [],
+            "erros": [],
+            "avisos": [],
+            "alteracoes": [],
+        }
+        contexto = {
+            "empresa_id": empresa_id,
+            "dry_run": dry_run,
+            "relatorio": relatorio,
+            "vistos": {},
+            "categoria": ImportacaoProdutosService._mapa_por_nome(Categoria, empresa_id),
+            "fornecedor": ImportacaoProdutosService._mapa_por_nome(Fornecedor, empresa_id),
+        }
+
+        with transaction.atomic():
+            while True:
+                lote = list(itertools.islice(linhas, tamanho_lote))
+                if not lote:
+                    break
+                relatorio["linhas"] += len(lote)
+                ImportacaoProdutosService._processar_lote(lote, contexto)
+
+        if not dry_run and (relatorio["criados"] or relatorio["atualizados"]):
+            CacheService.invalidar("estoque", empresa_id=empresa_id)
+
+        logger.info(
+            f"Importação de produtos{' (dry-run)' if dry_run else ''}: "
+            f"{relatorio['linhas']} linha(s), {relatorio['criados']} criado(s), "
+            f"{relatorio['atualizados']} atualizado(s), {len(relatorio['erros'])} erro(s)"
+        )
+        return relatorio
@@ -5,7 +5,11 @@ Serviço para gerenciar lotes e baixa de estoque com FEFO
 
 from decimal import Decimal
 from django.db import transaction
+from django.db.models import Count, Prefetch, Q, Sum
+from django.utils import timezone
 from ..models import Lote, Produto
+from .alert_service import AlertService
+from .estoque_service import EstoqueService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +18,19 @@ logger = logging.getLogger(__name__)
 class LoteService:
     """Serviço para gestão de lotes com estratégia FEFO"""
 
+    @staticmethod
+    def anotar_produtos(queryset):
+        """
+        Anota contagem e estoque dos lotes ativos e pré-carrega só os lotes
+        ativos, para que a serialização não faça queries por produto.
+        """
+        return queryset.prefetch_related(
+            Prefetch("lotes", queryset=Lote.objects.filter(ativo=True).select_related("fornecedor"))
+        ).annotate(
+            lotes_ativos_count=Count("lotes", filter=Q(lotes__ativo=True)),
+            lotes_ativos_estoque=Sum("lotes__quantidade", filter=Q(lotes__ativo=True)),
+        )
+
     @staticmethod
     def baixar_estoque_fefo(produto, quantidade_vendida):
         """
@@ -31,74 +48,134 @@ class LoteService:
         Raises:
             ValueError: Se não houver estoque suficiente
         """
-        quantidade_vendida = Decimal(str(quantidade_vendida))
-
-        # Busca lotes ativos do produto ordenados por FEFO
-        # (data_validade primeiro, depois data_entrada)
-        lotes_disponiveis = Lote.objects.filter(
-            produto=produto, ativo=True, quantidade__gt=0
-        ).order_by("data_validade", "data_entrada")
-
-        # Verifica se há estoque suficiente
-        estoque_total = sum(lote.quantidade for lote in lotes_disponiveis)
-        if estoque_total < quantidade_vendida:
-            raise ValueError(
-                f"Estoque insuficiente para {produto.nome}. "
-                f"Disponível: {estoque_total}, Solicitado: {quantidade_vendida}"
-            )
+        return LoteService.alocar_fefo([(produto, quantidade_vendida)])[0]
+
+    @staticmethod
+    def alocar_fefo(itens):
+        """
+        Baixa estoque de uma cesta inteira usando FEFO em operações de conjunto.
+
+        Trava todos os lotes candidatos de todos os produtos com um único
+        select_for_update, calcula a divisão FEFO em memória e persiste com
+        um bulk_update para lotes e um UPDATE com F() para o estoque dos
+        produtos.
 
-        quantidade_restante = quantidade_vendida
-        lotes_afetados = []
+        Args:
+            itens: Lista de tuplas (produto, quantidade). O mesmo produto pode
+                aparecer mais de uma vez; os lotes são consumidos em sequência.
+
+        Returns:
+            list: Uma lista de lotes afetados por item, na mesma ordem de `itens`
+            [[{'lote_id': X, 'quantidade': Y, 'numero_lote': 'ABC', 'data_validade': ...}], ...]
+
+        Raises:
+            ValueError: Se algum produto não tiver estoque suficiente nos lotes
+        """
+        if not itens:
+            return []
+
+        # Uma instância por produto, mesmo que o item se repita na cesta
+        produtos = {}
+        for produto, _ in itens:
+            produtos.setdefault(produto.id, produto)
+        itens = [
+            (produtos[produto.id], Decimal(str(quantidade)))
+            for produto, quantidade in itens
+        ]
 
         with transaction.atomic():
+            # Busca e trava os lotes ativos de todos os produtos ordenados por FEFO
+            # (data_validade primeiro, depois data_entrada)
+            lotes_por_produto = {produto_id: [] for produto_id in produtos}
+            lotes_disponiveis = (
+                Lote.objects.select_for_update()
+                .filter(produto_id__in=produtos.keys(), ativo=True, quantidade__gt=0)
+                .order_by("produto_id", "data_validade", "data_entrada", "id")
+            )
             for lote in lotes_disponiveis:
-                if quantidade_restante <= 0:
-                    break
-
-                # Quantidade a ser retirada deste lote
-                quantidade_deste_lote = min(lote.quantidade, quantidade_restante)
-
-                # Baixa do lote
-                lote.quantidade -= quantidade_deste_lote
-                lote.save(update_fields=["quantidade", "updated_at"])
-
-                # Desativa se zerou
-                if lote.quantidade == 0:
-                    lote.ativo = False
-                    lote.save(update_fields=["ativo", "updated_at"])
-
-                # Registra lote afetado
-                lotes_afetados.append(
-                    {
-                        "lote_id": lote.id,
-                        "numero_lote": lote.numero_lote or f"Lote #{lote.id}",
-                        "quantidade": float(quantidade_deste_lote),
-                        "data_validade": (
-                            lote.data_validade.isoformat()
-                            if lote.data_validade
-                            else None
-                        ),
-                    }
+                lotes_por_produto[lote.produto_id].append(lote)
+
+            # Verifica se há estoque suficiente para o total de cada produto
+            solicitado = {}
+            for produto, quantidade in itens:
+                solicitado[produto.id] = solicitado.get(produto.id, Decimal("0")) + quantidade
+            for produto_id, quantidade in solicitado.items():
+                estoque_total = sum(
+                    (lote.quantidade for lote in lotes_por_produto[produto_id]),
+                    Decimal("0"),
                 )
-
-                quantidade_restante -= quantidade_deste_lote
+                if estoque_total < quantidade:
+                    raise ValueError(
+                        f"Estoque insuficiente para {produtos[produto_id].nome}. "
+                        f"Disponível: {estoque_total}, Solicitado: {quantidade}"
+                    )
+
+            agora = timezone.now()
+            lotes_alterados = {}
+            alocacoes = []
+
+            for produto, quantidade in itens:
+                quantidade_restante = quantidade
+                lotes_afetados = []
+
+                for lote in lotes_por_produto[produto.id]:
+                    if quantidade_restante <= 0:
+                        break
+                    if lote.quantidade <= 0:
+                        continue
+
+                    # Quantidade a ser retirada deste lote
+                    quantidade_deste_lote = min(lote.quantidade, quantidade_restante)
+
+                    lote.quantidade -= quantidade_deste_lote
+                    # Desativa se zerou
+                    if lote.quantidade == 0:
+                        lote.ativo = False
+                    lote.updated_at = agora
+                    lotes_alterados[lote.id] = lote
+
+                    # Registra lote afetado
+                    lotes_afetados.append(
+                        {
+                            "lote_id": lote.id,
+                            "numero_lote": lote.numero_lote or f"Lote #{lote.id}",
+                            "quantidade": float(quantidade_deste_lote),
+                            "data_validade": (
+                                lote.data_validade.isoformat()
+                                if lote.data_validade
+                                else None
+                            ),
+                        }
+                    )
+
+                    quantidade_restante -= quantidade_deste_lote
+
+                alocacoes.append(lotes_afetados)
 
                 logger.info(
-                    f"FEFO: Lote {lote.id} do produto {produto.nome} "
-                    f"teve baixa de {quantidade_deste_lote} un. "
-                    f"Restante no lote: {lote.quantidade}"
+                    f"FEFO: Total baixado de {produto.nome}: {quantidade} un. "
+                    f"Lotes afetados: {len(lotes_afetados)}"
                 )
 
-            # Atualiza estoque total do produto
-            produto.estoque -= quantidade_vendida
-            produto.save(update_fields=["estoque", "updated_at"])
-
-            logger.info(
-                f"FEFO: Total baixado de {produto.nome}: {quantidade_vendida} un. "
-                f"Lotes afetados: {len(lotes_afetados)}"
+            Lote.objects.bulk_update(
+                lotes_alterados.values(), ["quantidade", "ativo", "updated_at"]
+            )
+            AlertService.agendar(lotes=lotes_alterados.keys())
+            # bulk_update não dispara signals: recalcula a flag dos produtos
+            # que tiveram lotes zerados
+            produtos_lotes_zerados = {
+                lote.produto_id for lote in lotes_alterados.values() if not lote.ativo
+            }
+            if produtos_lotes_zerados:
+                LoteService.atualizar_usa_lotes(produtos_lotes_zerados)
+            # Atualiza estoque total dos produtos no banco (sem ler-e-salvar)
+            empresas = {produto.empresa_id for produto in produtos.values()}
+            EstoqueService.ajustar(
+                {produto_id: -quantidade for produto_id, quantidade in solicitado.items()},
+                empresa_id=empresas.pop() if len(empresas) == 1 else None,
             )
 
-        return lotes_afetados
+        return alocacoes
 
     @staticmethod
     def verificar_estoque_disponivel(produto):
@@ -191,8 +268,7 @@ class LoteService:
             )
 
             # Atualiza estoque do produto
-            produto.estoque += quantidade
-            produto.save(update_fields=["estoque", "updated_at"])
+            EstoqueService.repor({produto.id: quantidade})
 
             logger.info(
                 f"Lote criado: {lote.id} para produto {produto.nome} "
@@ -204,7 +280,7 @@ class LoteService:
     @staticmethod
     def produto_usa_lotes(produto):
         """
-        Verifica se o produto usa sistema de lotes.
+        Verifica se o produto usa sistema de lotes, sem consultar o banco.
         Produtos SEM data_validade E sem lotes cadastrados não usam lotes.
 
         Args:
@@ -213,8 +289,8 @@ class LoteService:
         Returns:
             bool: True se usa lotes, False caso contrário
         """
-        # Se tem lotes ativos, usa lotes
-        if produto.lotes.filter(ativo=True).exists():
+        # Se tem lotes ativos, usa lotes (flag mantida pelos signals de Lote)
+        if produto.usa_lotes:
             return True
 
         # Se tem data_validade mas não tem lotes, deveria usar lotes
@@ -225,6 +301,41 @@ class LoteService:
         # Produto sem validade e sem lotes = não usa lotes
         return False
 
+    @staticmethod
+    def marcar_usa_lotes(produto_id):
+        """
+        Marca o produto como usuário de lotes (novo lote ativo).
+        Só escreve se a flag ainda estiver desligada.
+
+        Args:
+            produto_id: ID do produto
+        """
+        Produto.objects.filter(pk=produto_id, usa_lotes=False).update(usa_lotes=True)
+
+    @staticmethod
+    def atualizar_usa_lotes(produto_ids=None):
+        """
+        Recalcula Produto.usa_lotes com um único UPDATE usando EXISTS
+        sobre os lotes ativos.
+
+        Args:
+            produto_ids: IDs a recalcular (None = todos os produtos)
+
+        Returns:
+            int: Número de produtos recalculados
+        """
+        from django.db.models import Exists, OuterRef
+
+        produtos = Produto.objects.all()
+        if produto_ids is not None:
+            produtos = produtos.filter(pk__in=set(produto_ids))
+
+        return produtos.update(
+            usa_lotes=Exists(
+                Lote.objects.filter(produto_id=OuterRef("pk"), ativo=True)
+            )
+        )
+
     @staticmethod
     def devolver_estoque(produto, quantidade_devolver):
         """
@@ -258,8 +369,7 @@ class LoteService:
             )
 
             # Atualiza estoque do produto
-            produto.estoque += quantidade_devolver
-            produto.save(update_fields=["estoque", "updated_at"])
+            EstoqueService.repor({produto.id: quantidade_devolver})
 
             logger.info(
                 f"Estoque devolvido: Lote {lote.id} criado para produto {produto.nome} "
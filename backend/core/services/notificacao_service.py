@@ -0,0 +1,229 @@
+"""
+Serviço da fila de notificações de alertas por WhatsApp.
+
+Os alertas de prioridade alta entram na fila (NotificacaoAlerta) sem
+nenhuma chamada externa; o worker (manage.py enviar_notificacoes) reserva
+as linhas vencidas, agrupa por destinatário - vários alertas viram uma
+única mensagem-resumo -, envia com um único transporte (sessão HTTP
+reutilizada) e concorrência limitada, e reagenda as falhas com backoff
+exponencial até MAX_TENTATIVAS.
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from fiscal.models import Empresa
+
+from ..models import Alerta, NotificacaoAlerta
+from ..notifications.whatsapp import WhatsappNotifier, build_transport
+
+logger = logging.getLogger(__name__)
+
+
+class NotificacaoService:
+    """Serviço para enfileirar e enviar em lote as notificações de alertas"""
+
+    PRIORIDADES_NOTIFICADAS = {"ALTA", "CRITICA"}
+    MAX_TENTATIVAS = 5
+    BACKOFF_BASE = 60  # segundos; dobra a cada falha
+    BACKOFF_MAXIMO = 60 * 60
+    RESERVA = 5 * 60  # segundos em que as linhas ficam reservadas ao worker
+    LIMITE_LOTE = 200
+    CONCORRENCIA = 4
+    MAX_LINHAS_RESUMO = 10
+
+    @staticmethod
+    def habilitado():
+        return WhatsappNotifier.settings.is_configured
+
+    @staticmethod
+    def _destinatarios(alertas):
+        """Número formatado por alerta: telefone da empresa ou o padrão"""
+        empresa_ids = {alerta.empresa_id for alerta in alertas if alerta.empresa_id}
+        telefones = (
+            dict(
+                Empresa.objects.filter(pk__in=empresa_ids).values_list("id", "telefone_contato")
+            )
+            if empresa_ids
+            else {}
+        )
+        padrao = WhatsappNotifier.settings.default_to_number
+        return {
+            alerta.pk: WhatsappNotifier._format_number(telefones.get(alerta.empresa_id) or padrao)
+            for alerta in alertas
+        }
+
+    @staticmethod
+    def enfileirar(alertas):
+        """
+        Coloca na fila os alertas de prioridade alta ainda não notificados.
+
+        Args:
+            alertas: Alertas salvos (criados ou alterados)
+
+        Returns:
+            int: Notificações enfileiradas
+        """
+        if not NotificacaoService.habilitado():
+            return 0
+        alertas = [
+            alerta
+            for alerta in alertas
+            if alerta.prioridade in NotificacaoService.PRIORIDADES_NOTIFICADAS
+            and not alerta.notificado
+        ]
+        if not alertas:
+            return 0
+
+        na_fila = set(
+            NotificacaoAlerta.objects.filter(
+                alerta_id__in=[alerta.pk for alerta in alertas], status="PENDENTE"
+            ).values_list("alerta_id", flat=True)
+        )
+        destinatarios = NotificacaoService._destinatarios(alertas)
+        novas = []
+        for alerta in alertas:
+            if alerta.pk in na_fila:
+                continue
+            if not destinatarios[alerta.pk]:
+                logger.warning(f"Alerta {alerta.pk} sem telefone de destino válido")
+                continue
+            novas.append(
+                NotificacaoAlerta(alerta=alerta, destinatario=destinatarios[alerta.pk])
+            )
+        NotificacaoAlerta.objects.bulk_create(novas)
+        return len(novas)
+
+    @staticmethod
+    def montar_mensagem(alertas):
+        """
+        Mensagem de um destinatário: o alerta completo ou um resumo por tipo.
+
+        Args:
+            alertas: Alertas do destinatário
+
+        Returns:
+            str: Corpo da mensagem
+        """
+        if len(alertas) == 1:
+            return WhatsappNotifier._montar_mensagem(alertas[0])
+
+        por_tipo = defaultdict(list)
+        for alerta in alertas:
+            por_tipo[alerta.get_tipo_display()].append(alerta)
+
+        linhas = [f"*🔔 {len(alertas)} alertas*"]
+        for tipo, alertas_tipo in por_tipo.items():
+            linhas.append(f"\n*{tipo}* ({len(alertas_tipo)})")
+            for alerta in alertas_tipo[: NotificacaoService.MAX_LINHAS_RESUMO]:
+                linhas.append(f"• {alerta.titulo}")
+            restantes = len(alertas_tipo) - NotificacaoService.MAX_LINHAS_RESUMO
+            if restantes > 0:
+                linhas.append(f"• ... e mais {restantes}")
+        return "\n".join(linhas)
+
+    @staticmethod
+    def _reservar(limite, agora):
+        """Reserva as linhas vencidas para este worker (skip_locked no PostgreSQL)"""
+        with transaction.atomic():
+            ids = list(
+                NotificacaoAlerta.objects.select_for_update(skip_locked=True)
+                .filter(status="PENDENTE", proxima_tentativa__lte=agora)
+                .order_by("proxima_tentativa")
+                .values_list("id", flat=True)[:limite]
+            )
+            NotificacaoAlerta.objects.filter(pk__in=ids).update(
+                proxima_tentativa=agora + timedelta(seconds=NotificacaoService.RESERVA)
+            )
+        return ids
+
+    @staticmethod
+    def _backoff(tentativas):
+        return min(
+            NotificacaoService.BACKOFF_BASE * 2 ** (tentativas - 1),
+            NotificacaoService.BACKOFF_MAXIMO,
+        )
+
+    @staticmethod
+    def processar(limite=LIMITE_LOTE, transporte=None, concorrencia=CONCORRENCIA):
+        """
+        Envia um lote da fila.
+
+        Args:
+            limite: Máximo de notificações reservadas nesta passada
+            transporte: Transporte com send(numero, corpo); padrão: o configurado
+            concorrencia: Envios simultâneos
+
+        Returns:
+            dict: {"mensagens", "enviadas", "falhas", "descartadas"}
+        """
+        resultado = {"mensagens": 0, "enviadas": 0, "falhas": 0, "descartadas": 0}
+        agora = timezone.now()
+        ids = NotificacaoService._reservar(limite, agora)
+        if not ids:
+            return resultado
+
+        por_destinatario = defaultdict(list)
+        for notificacao in NotificacaoAlerta.objects.filter(pk__in=ids).select_related("alerta"):
+            por_destinatario[notificacao.destinatario].append(notificacao)
+
+        transporte = transporte or build_transport()
+        with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+            envios = {
+                destinatario: executor.submit(
+                    transporte.send,
+                    destinatario,
+                    NotificacaoService.montar_mensagem(
+                        [notificacao.alerta for notificacao in notificacoes]
+                    ),
+                )
+                for destinatario, notificacoes in por_destinatario.items()
+            }
+
+        agora = timezone.now()
+        alterados = []
+        alertas_notificados = []
+        for destinatario, envio in envios.items():
+            erro = envio.exception()
+            for notificacao in por_destinatario[destinatario]:
+                notificacao.tentativas += 1
+                if erro is None:
+                    notificacao.status = "ENVIADA"
+                    notificacao.enviada_em = agora
+                    alertas_notificados.append(notificacao.alerta_id)
+                elif notificacao.tentativas >= NotificacaoService.MAX_TENTATIVAS:
+                    notificacao.status = "FALHA"
+                    notificacao.ultimo_erro = str(erro)
+                else:
+                    notificacao.proxima_tentativa = agora + timedelta(
+                        seconds=NotificacaoService._backoff(notificacao.tentativas)
+                    )
+                    notificacao.ultimo_erro = str(erro)
+                alterados.append(notificacao)
+
+            if erro is None:
+                resultado["mensagens"] += 1
+                resultado["enviadas"] += len(por_destinatario[destinatario])
+            else:
+                logger.warning(f"Falha ao enviar WhatsApp para {destinatario}: {erro}")
+                resultado["falhas"] += len(por_destinatario[destinatario])
+
+        with transaction.atomic():
+            NotificacaoAlerta.objects.bulk_update(
+                alterados,
+                ["status", "tentativas", "proxima_tentativa", "ultimo_erro", "enviada_em"],
+            )
+            if alertas_notificados:
+                Alerta.objects.filter(pk__in=alertas_notificados).update(notificado=True)
+
+        resultado["descartadas"] = sum(1 for n in alterados if n.status == "FALHA")
+        logger.info(
+            f"Fila de notificações: {resultado['mensagens']} mensagem(ns) para "
+            f"{resultado['enviadas']} alerta(s), {resultado['falhas']} falha(s)"
+        )
+        return resultado
@@ -0,0 +1,330 @@
+"""
+Serviço das leituras em cache do painel: dashboard, produtos com estoque
+baixo, produtos mais lucrativos e clientes com dívidas.
+
+Cada leitura é calculada para uma empresa (ou para todas) e guardada em
+chaves versionadas pelas tags de cache daquela empresa (CacheService):
+escritas de uma empresa só invalidam as leituras dela. aquecer() carrega
+as leituras de uma empresa de uma vez (deploy/startup).
+
+Cada leitura tem validade suave (TIMEOUT_*) e dura (TTL_MAXIMO_*): na
+virada da suave um único worker recalcula e os demais recebem o valor
+anterior (CacheService.obter).
+"""
+
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from ..models import Caixa, Cliente, ItemVenda, Lote, Produto, Venda
+from ..serializers import ClienteSerializer, ProdutoSerializer
+from .cache_service import CacheService
+from .caixa_service import CaixaService
+from .giro_service import GiroEstoqueService
+from .lote_service import LoteService
+from .resumo_service import ResumoDiarioService
+
+logger = logging.getLogger(__name__)
+
+
+class PainelService:
+    """Serviço das leituras em cache do painel, particionadas por empresa"""
+
+    TIMEOUT_DASHBOARD = 120  # 2 minutos
+    TTL_MAXIMO_DASHBOARD = 600
+    TIMEOUT_BAIXO_ESTOQUE = 300  # 5 minutos
+    TTL_MAXIMO_BAIXO_ESTOQUE = 900
+    TIMEOUT_MAIS_LUCRATIVOS = 900  # 15 minutos
+    TTL_MAXIMO_MAIS_LUCRATIVOS = 3600
+    TIMEOUT_CLIENTES_COM_DIVIDAS = 300  # 5 minutos
+    TTL_MAXIMO_CLIENTES_COM_DIVIDAS = 900
+    LIMITE_ESTOQUE_BAIXO = 10
+
+    @staticmethod
+    def _por_empresa(queryset, empresa_id, campo="empresa_id"):
+        if empresa_id:
+            return queryset.filter(**{campo: empresa_id})
+        return queryset
+
+    # ========== LEITURAS ==========
+
+    @staticmethod
+    def clientes_com_dividas(empresa_id=None):
+        """
+        Clientes ativos com saldo em aberto e a quantidade de vendas pendentes.
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            list: Clientes serializados (ClienteSerializer)
+        """
+
+        def calcular():
+            clientes = (
+                PainelService._por_empresa(
+                    Cliente.objects.filter(saldo_em_aberto__gt=0, ativo=True), empresa_id
+                )
+                .annotate(
+                    total_divida=F("saldo_em_aberto"),
+                    qtd_vendas_pendentes=Count(
+                        "vendas",
+                        filter=Q(
+                            vendas__status_pagamento="PENDENTE",
+                            vendas__status="FINALIZADA",
+                        ),
+                    ),
+                )
+                .order_by("nome")
+            )
+            return ClienteSerializer(clientes, many=True).data
+
+        return CacheService.obter(
+            "clientes_com_dividas",
+            ["clientes"],
+            calcular,
+            PainelService.TIMEOUT_CLIENTES_COM_DIVIDAS,
+            empresa_id=empresa_id,
+            ttl_maximo=PainelService.TTL_MAXIMO_CLIENTES_COM_DIVIDAS,
+        )
+
+    @staticmethod
+    def produtos_baixo_estoque(empresa_id=None):
+        """
+        Produtos ativos com estoque abaixo do limite.
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            list: Produtos serializados (ProdutoSerializer)
+        """
+
+        def calcular():
+            produtos = LoteService.anotar_produtos(
+                PainelService._por_empresa(
+                    Produto.objects.select_related("categoria", "fornecedor").filter(
+                        estoque__lt=PainelService.LIMITE_ESTOQUE_BAIXO, ativo=True
+                    ),
+                    empresa_id,
+                )
+            )
+            return ProdutoSerializer(
+                produtos, many=True, context={"hoje": timezone.localdate()}
+            ).data
+
+        return CacheService.obter(
+            "produtos_baixo_estoque",
+            ["estoque"],
+            calcular,
+            PainelService.TIMEOUT_BAIXO_ESTOQUE,
+            empresa_id=empresa_id,
+            ttl_maximo=PainelService.TTL_MAXIMO_BAIXO_ESTOQUE,
+        )
+
+    @staticmethod
+    def produtos_mais_lucrativos(empresa_id=None):
+        """
+        Lucro agregado por produto nas vendas finalizadas.
+
+        Args:
+            empresa_id: Restringe às vendas da empresa (None = todas)
+
+        Returns:
+            list: [{"nome_produto", "preco_venda", "preco_custo", "total_vendido",
+            "receita_total", "custo_total", "lucro_total"}] por lucro decrescente
+        """
+
+        def calcular():
+            produtos_lucro = (
+                PainelService._por_empresa(
+                    ItemVenda.objects.filter(
+                        venda__status="FINALIZADA",
+                        produto__preco_custo__gt=0,  # Considera apenas produtos com custo definido
+                    ),
+                    empresa_id,
+                    campo="venda__empresa_id",
+                )
+                .values("produto__nome", "produto__preco", "produto__preco_custo")
+                .annotate(
+                    total_vendido=Sum("quantidade"),
+                    receita_total=Sum(F("quantidade") * F("preco_unitario")),
+                    custo_total=Sum(F("quantidade") * F("produto__preco_custo")),
+                    lucro_total=Sum(
+                        F("quantidade") * (F("preco_unitario") - F("produto__preco_custo"))
+                    ),
+                )
+                .order_by("-lucro_total")
+            )
+            return [
+                {
+                    "nome_produto": item["produto__nome"],
+                    "preco_venda": float(item["produto__preco"]),
+                    "preco_custo": float(item["produto__preco_custo"]),
+                    "total_vendido": float(item["total_vendido"]),
+                    "receita_total": float(item["receita_total"]),
+                    "custo_total": float(item["custo_total"]),
+                    "lucro_total": float(item["lucro_total"]),
+                }
+                for item in produtos_lucro
+            ]
+
+        return CacheService.obter(
+            "produtos_mais_lucrativos",
+            ["estoque", "vendas"],
+            calcular,
+            PainelService.TIMEOUT_MAIS_LUCRATIVOS,
+            empresa_id=empresa_id,
+            ttl_maximo=PainelService.TTL_MAXIMO_MAIS_LUCRATIVOS,
+        )
+
+    @staticmethod
+    def dashboard(empresa_id=None):
+        """
+        Estatísticas do dashboard do dia (chave também por data).
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: vendas, lucro, estoque baixo, validade, pagamentos,
+            contas a receber e caixa aberto
+        """
+        hoje = timezone.localdate()
+        return CacheService.obter(
+            "dashboard",
+            ["vendas", "estoque", "clientes"],
+            lambda: PainelService._calcular_dashboard(hoje, empresa_id),
+            PainelService.TIMEOUT_DASHBOARD,
+            empresa_id=empresa_id,
+            partes=(hoje.isoformat(),),
+            ttl_maximo=PainelService.TTL_MAXIMO_DASHBOARD,
+        )
+
+    @staticmethod
+    def aquecer(empresa_id=None):
+        """
+        Carrega no cache as leituras mais acessadas da empresa.
+
+        Args:
+            empresa_id: Empresa a aquecer (None = visão de todas)
+
+        Returns:
+            list: Nomes das leituras carregadas
+        """
+        leituras = {
+            "dashboard": PainelService.dashboard,
+            "produtos_baixo_estoque": PainelService.produtos_baixo_estoque,
+            "produtos_mais_lucrativos": PainelService.produtos_mais_lucrativos,
+            "clientes_com_dividas": PainelService.clientes_com_dividas,
+            "produtos_giro": lambda empresa: GiroEstoqueService.obter(empresa_id=empresa),
+        }
+        for leitura in leituras.values():
+            leitura(empresa_id)
+        logger.info(
+            f"Cache aquecido (empresa {empresa_id or 'todas'}): {', '.join(leituras)}"
+        )
+        return list(leituras)
+
+    # ========== CÁLCULOS DO DASHBOARD ==========
+
+    @staticmethod
+    def _calcular_dashboard(hoje, empresa_id):
+        # Usa transaction.atomic() para manter conexão aberta e melhorar performance
+        with transaction.atomic():
+            # Vendas, lucro e formas de pagamento vêm do resumo diário (uma query)
+            resumo = ResumoDiarioService.resumo_do_dia(hoje, empresa=empresa_id)
+            validade = PainelService._calcular_produtos_validade(hoje, empresa_id)
+
+            return {
+                "vendas_hoje": {
+                    "total": float(resumo["total"]),
+                    "quantidade": resumo["quantidade"],
+                },
+                "lucro_hoje": float(resumo["lucro"]),
+                "estoque_baixo": PainelService._por_empresa(
+                    Produto.objects.filter(
+                        estoque__lt=PainelService.LIMITE_ESTOQUE_BAIXO, ativo=True
+                    ),
+                    empresa_id,
+                ).count(),
+                "produtos_vencidos": validade["vencidos"],
+                "produtos_vencendo": validade["vencendo"],
+                "vendas_por_pagamento": resumo["por_pagamento"],
+                "contas_receber": PainelService._calcular_contas_receber(hoje, empresa_id),
+                "caixa": PainelService._calcular_info_caixa(empresa_id),
+                "data": hoje.isoformat(),
+                "cached": False,
+            }
+
+    @staticmethod
+    def _calcular_produtos_validade(hoje, empresa_id):
+        """Retorna contadores de LOTES vencidos e vencendo"""
+        data_limite = hoje + timedelta(days=7)
+        lotes = PainelService._por_empresa(
+            Lote.objects.filter(ativo=True, data_validade__isnull=False), empresa_id
+        )
+
+        # Conta lotes distintos (evita contar o mesmo produto múltiplas vezes)
+        lotes_vencidos = (
+            lotes.filter(data_validade__lt=hoje).values("produto").distinct().count()
+        )
+        lotes_vencendo = (
+            lotes.filter(data_validade__gte=hoje, data_validade__lte=data_limite)
+            .values("produto")
+            .distinct()
+            .count()
+        )
+
+        return {"vencidos": lotes_vencidos, "vencendo": lotes_vencendo}
+
+    @staticmethod
+    def _calcular_contas_receber(hoje, empresa_id):
+        """Calcula informações de contas a receber"""
+        contas_pendentes = PainelService._por_empresa(
+            Venda.objects.filter(status="FINALIZADA", status_pagamento="PENDENTE"),
+            empresa_id,
+        )
+
+        contas_vencidas = contas_pendentes.filter(data_vencimento__lt=hoje)
+        contas_vencendo_hoje = contas_pendentes.filter(data_vencimento=hoje)
+
+        return {
+            "total": float(
+                contas_pendentes.aggregate(total=Sum("total"))["total"] or Decimal("0")
+            ),
+            "quantidade": contas_pendentes.count(),
+            "vencidas": {
+                "total": float(
+                    contas_vencidas.aggregate(total=Sum("total"))["total"]
+                    or Decimal("0")
+                ),
+                "quantidade": contas_vencidas.count(),
+            },
+            "vencendo_hoje": {"quantidade": contas_vencendo_hoje.count()},
+        }
+
+    @staticmethod
+    def _calcular_info_caixa(empresa_id):
+        """Retorna informações do caixa aberto (se houver)"""
+        caixa_aberto = PainelService._por_empresa(
+            Caixa.objects.filter(status="ABERTO"), empresa_id
+        ).first()
+        if not caixa_aberto:
+            return None
+
+        # Contadores mantidos pelas vendas e movimentações (sem agregar)
+        vendas_dinheiro = caixa_aberto.total_dinheiro or Decimal("0")
+        valor_atual = CaixaService.valor_esperado(caixa_aberto)
+
+        return {
+            "id": caixa_aberto.id,
+            "aberto_desde": caixa_aberto.data_abertura,
+            "valor_inicial": float(caixa_aberto.valor_inicial),
+            "valor_atual": float(valor_atual),
+            "vendas_dinheiro": float(vendas_dinheiro),
+        }
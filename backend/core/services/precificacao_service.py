@@ -0,0 +1,203 @@
+"""
+Serviço de reprecificação em massa de produtos.
+
+Seleciona produtos por categoria, fornecedor ou IDs e aplica uma regra:
+- percentual: preco * (1 + valor/100)
+- margem: preco_custo * (1 + valor/100) (só produtos com custo cadastrado)
+- arredondar: apenas o arredondamento para ,99
+
+Regras lineares rodam como um único UPDATE com F(); com arredondamento
+para ,99 os preços são calculados em Python e gravados com bulk_update em
+lotes. Em todos os casos updated_at é gravado (sincronização e snapshot do
+PDV) e a tag de cache "estoque" é invalidada uma única vez no fim.
+"""
+
+import logging
+from decimal import ROUND_CEILING, ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Value
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from ..models import Produto
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class PrecificacaoService:
+    """Serviço para reprecificar produtos em lote"""
+
+    REGRAS = ("percentual", "margem", "arredondar")
+    TAMANHO_LOTE = 500
+
+    @staticmethod
+    def selecionar(categoria_id=None, fornecedor_id=None, ids=None, empresa_id=None):
+        """
+        Monta o queryset dos produtos ativos selecionados.
+
+        Args:
+            categoria_id: Filtra pela categoria
+            fornecedor_id: Filtra pelo fornecedor
+            ids: Lista explícita de IDs
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            QuerySet de Produto
+        """
+        produtos = Produto.objects.filter(ativo=True)
+        if categoria_id:
+            produtos = produtos.filter(categoria_id=categoria_id)
+        if fornecedor_id:
+            produtos = produtos.filter(fornecedor_id=fornecedor_id)
+        if ids:
+            produtos = produtos.filter(pk__in=ids)
+        if empresa_id:
+            produtos = produtos.filter(empresa_id=empresa_id)
+        return produtos
+
+    @staticmethod
+    def arredondar_99(preco):
+        """Arredonda para cima até o próximo ,99 (10,20 -> 10,99; 11,00 -> 10,99)"""
+        return max(
+            preco.quantize(Decimal("1"), rounding=ROUND_CEILING) - Decimal("0.01"),
+            Decimal("0.99"),
+        )
+
+    @staticmethod
+    def calcular_preco(preco, preco_custo, regra, valor=None, arredondar_99=False):
+        """
+        Calcula o novo preço de um produto (mesma conta do UPDATE).
+
+        Args:
+            preco: Preço atual
+            preco_custo: Preço de custo
+            regra: "percentual", "margem" ou "arredondar"
+            valor: Percentual da regra
+            arredondar_99: Arredonda o resultado para ,99
+
+        Returns:
+            Decimal: Novo preço com 2 casas
+        """
+        fator = Decimal("1") + Decimal(str(valor or 0)) / Decimal("100")
+        if regra == "percentual":
+            novo = preco * fator
+        elif regra == "margem":
+            novo = preco_custo * fator
+        else:
+            novo = preco
+        novo = novo.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        if arredondar_99 or regra == "arredondar":
+            novo = PrecificacaoService.arredondar_99(novo)
+        return novo
+
+    @staticmethod
+    def _expressao(regra, valor):
+        """Expressão F() das regras lineares"""
+        fator = Value(
+            Decimal("1") + Decimal(str(valor)) / Decimal("100"),
+            output_field=DecimalField(max_digits=12, decimal_places=6),
+        )
+        base = F("preco") if regra == "percentual" else F("preco_custo")
+        return Round(base * fator, 2, output_field=DecimalField(max_digits=10, decimal_places=2))
+
+    @staticmethod
+    def reprecificar(produtos, regra, valor=None, arredondar_99=False, preview=False):
+        """
+        Aplica (ou simula) a regra de preço aos produtos selecionados.
+
+        Args:
+            produtos: QuerySet de Produto (ver selecionar())
+            regra: "percentual", "margem" ou "arredondar"
+            valor: Percentual da regra (obrigatório para percentual/margem)
+            arredondar_99: Arredonda os preços para ,99
+            preview: Se True, apenas devolve os produtos afetados
+
+        Returns:
+            dict: {"total", "ignorados", "preview", "produtos": [...] (só no preview)}
+
+        Raises:
+            ValueError: Se a regra ou o valor forem inválidos
+        """
+        if regra not in PrecificacaoService.REGRAS:
+            raise ValueError(f"Regra inválida: {regra}")
+        if regra != "arredondar":
+            if valor is None:
+                raise ValueError("Informe o percentual da regra")
+            if Decimal(str(valor)) <= Decimal("-100"):
+                raise ValueError("O percentual deve ser maior que -100")
+
+        ignorados = 0
+        if regra == "margem":
+            # Margem sobre o custo: produtos sem custo ficam de fora
+            ignorados = produtos.filter(preco_custo__lte=0).count()
+            produtos = produtos.filter(preco_custo__gt=0)
+
+        if preview:
+            linhas = []
+            for produto_id, nome, preco, preco_custo in produtos.order_by("nome").values_list(
+                "id", "nome", "preco", "preco_custo"
+            ):
+                novo = PrecificacaoService.calcular_preco(
+                    preco, preco_custo, regra, valor, arredondar_99
+                )
+                linhas.append(
+                    {
+                        "id": produto_id,
+                        "nome": nome,
+                        "preco_atual": str(preco),
+                        "preco_novo": str(novo),
+                        "preco_custo": str(preco_custo),
+                        "margem_nova": (
+                            float(round((novo - preco_custo) / preco_custo * 100, 2))
+                            if preco_custo > 0
+                            else None
+                        ),
+                    }
+                )
+            return {"total": len(linhas), "ignorados": ignorados, "preview": True, "produtos": linhas}
+
+        agora = timezone.now()
+        with transaction.atomic():
+            if regra != "arredondar" and not arredondar_99:
+                total = produtos.update(
+                    preco=PrecificacaoService._expressao(regra, valor), updated_at=agora
+                )
+            else:
+                total = PrecificacaoService._aplicar_em_lotes(
+                    produtos, regra, valor, arredondar_99, agora
+                )
+
+        # UPDATE em massa não dispara signals: invalida as leituras de estoque
+        CacheService.invalidar("estoque")
+        logger.info(
+            f"Reprecificação '{regra}' (valor={valor}, ,99={arredondar_99}): "
+            f"{total} produto(s) atualizado(s), {ignorados} ignorado(s)"
+        )
+        return {"total": total, "ignorados": ignorados, "preview": False}
+
+    @staticmethod
+    def _aplicar_em_lotes(produtos, regra, valor, arredondar_99, agora):
+        """Regras não lineares: calcula em Python e grava com bulk_update"""
+        total = 0
+        ultimo_id = 0
+        produtos = produtos.only("id", "preco", "preco_custo").order_by("id")
+        while True:
+            # Lotes por faixa de ID: não mantém cursor aberto durante a escrita
+            lote = list(produtos.filter(pk__gt=ultimo_id)[: PrecificacaoService.TAMANHO_LOTE])
+            if not lote:
+                return total
+            ultimo_id = lote[-1].pk
+
+            alterados = []
+            for produto in lote:
+                novo = PrecificacaoService.calcular_preco(
+                    produto.preco, produto.preco_custo, regra, valor, arredondar_99
+                )
+                if novo != produto.preco:
+                    produto.preco = novo
+                    produto.updated_at = agora
+                    alterados.append(produto)
+            if alterados:
+                total += Produto.objects.bulk_update(alterados, ["preco", "updated_at"])
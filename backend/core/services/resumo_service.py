@@ -0,0 +1,221 @@
+"""
+Serviço do resumo diário de vendas (VendaResumoDiario).
+
+Mantém uma linha por (empresa, data, forma de pagamento) com quantidade,
+total bruto, desconto, custo e lucro, atualizada com F() na mesma transação
+da finalização/cancelamento da venda. O custo e o lucro usam o custo gravado
+em cada item na venda, para que o estorno retire exatamente o que foi somado.
+O dashboard lê O(formas de pagamento) linhas do dia em vez de O(vendas).
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import ItemVenda, Venda, VendaResumoDiario
+
+logger = logging.getLogger(__name__)
+
+
+class ResumoDiarioService:
+    """Serviço para manter e consultar o resumo diário de vendas"""
+
+    @staticmethod
+    def _metricas_itens(itens):
+        """
+        Calcula total bruto, custo e lucro dos itens de uma venda com o
+        custo gravado no item (o do momento da venda). O lucro segue o
+        dashboard: só considera produtos com custo cadastrado.
+
+        Args:
+            itens: Lista de ItemVenda
+
+        Returns:
+            tuple: (total_bruto, custo, lucro)
+        """
+        total_bruto = custo = lucro = Decimal("0")
+        for item in itens:
+            total_bruto += item.subtotal
+            preco_custo = item.preco_custo or Decimal("0")
+            if preco_custo > 0:
+                custo += item.quantidade * preco_custo
+                lucro += item.quantidade * (item.preco_unitario - preco_custo)
+        return total_bruto, custo, lucro
+
+    @staticmethod
+    def _aplicar(venda, itens, sinal):
+        """Soma (sinal=1) ou subtrai (sinal=-1) a venda do resumo do dia"""
+        if itens is None:
+            itens = list(venda.itens.all())
+
+        total_bruto, custo, lucro = ResumoDiarioService._metricas_itens(itens)
+        chave = {
+            "empresa_id": venda.empresa_id,
+            "data": timezone.localdate(venda.created_at),
+            "forma_pagamento": venda.forma_pagamento,
+        }
+        valores = {
+            "quantidade": F("quantidade") + sinal,
+            "total_bruto": F("total_bruto") + sinal * total_bruto,
+            "desconto": F("desconto") + sinal * (venda.desconto or Decimal("0")),
+            "custo": F("custo") + sinal * custo,
+            "lucro": F("lucro") + sinal * lucro,
+            "updated_at": timezone.now(),
+        }
+
+        with transaction.atomic():
+            if VendaResumoDiario.objects.filter(**chave).update(**valores):
+                return
+            try:
+                with transaction.atomic():
+                    VendaResumoDiario.objects.create(
+                        **chave,
+                        quantidade=sinal,
+                        total_bruto=sinal * total_bruto,
+                        desconto=sinal * (venda.desconto or Decimal("0")),
+                        custo=sinal * custo,
+                        lucro=sinal * lucro,
+                    )
+            except IntegrityError:
+                # Outra transação criou a linha do dia ao mesmo tempo
+                VendaResumoDiario.objects.filter(**chave).update(**valores)
+
+    @staticmethod
+    def registrar_venda(venda, itens=None):
+        """
+        Soma uma venda finalizada ao resumo do dia.
+
+        Args:
+            venda: Venda FINALIZADA
+            itens: Itens da venda já carregados (evita nova query)
+        """
+        ResumoDiarioService._aplicar(venda, itens, 1)
+
+    @staticmethod
+    def estornar_venda(venda, itens=None):
+        """
+        Retira uma venda cancelada do resumo do dia em que foi feita.
+
+        Args:
+            venda: Venda que estava FINALIZADA
+            itens: Itens da venda já carregados (evita nova query)
+        """
+        ResumoDiarioService._aplicar(venda, itens, -1)
+
+    @staticmethod
+    def recalcular(data_inicio=None, data_fim=None):
+        """
+        Reconstrói o resumo a partir das vendas com duas queries agrupadas.
+
+        Args:
+            data_inicio: Primeiro dia a recalcular (None = desde o início)
+            data_fim: Último dia a recalcular (None = até hoje)
+
+        Returns:
+            int: Número de linhas de resumo gravadas
+        """
+        vendas = Venda.objects.filter(status="FINALIZADA")
+        itens = ItemVenda.objects.filter(venda__status="FINALIZADA")
+        resumos = VendaResumoDiario.objects.all()
+        if data_inicio:
+            vendas = vendas.filter(created_at__date__gte=data_inicio)
+            itens = itens.filter(venda__created_at__date__gte=data_inicio)
+            resumos = resumos.filter(data__gte=data_inicio)
+        if data_fim:
+            vendas = vendas.filter(created_at__date__lte=data_fim)
+            itens = itens.filter(venda__created_at__date__lte=data_fim)
+            resumos = resumos.filter(data__lte=data_fim)
+
+        linhas = {}
+        for linha in (
+            vendas.annotate(dia=TruncDate("created_at"))
+            .values("empresa_id", "dia", "forma_pagamento")
+            .annotate(qtd=Count("id"), soma_desconto=Sum("desconto"))
+        ):
+            chave = (linha["empresa_id"], linha["dia"], linha["forma_pagamento"])
+            linhas[chave] = VendaResumoDiario(
+                empresa_id=chave[0],
+                data=chave[1],
+                forma_pagamento=chave[2],
+                quantidade=linha["qtd"],
+                desconto=linha["soma_desconto"] or Decimal("0"),
+            )
+
+        for linha in (
+            itens.annotate(dia=TruncDate("venda__created_at"))
+            .values("venda__empresa_id", "dia", "venda__forma_pagamento")
+            .annotate(
+                soma_bruto=Sum("subtotal"),
+                soma_custo=Sum(
+                    F("quantidade") * F("preco_custo"), filter=Q(preco_custo__gt=0)
+                ),
+                soma_lucro=Sum(
+                    F("quantidade") * (F("preco_unitario") - F("preco_custo")),
+                    filter=Q(preco_custo__gt=0),
+                ),
+            )
+        ):
+            resumo = linhas.get(
+                (linha["venda__empresa_id"], linha["dia"], linha["venda__forma_pagamento"])
+            )
+            if resumo is None:
+                continue
+            resumo.total_bruto = linha["soma_bruto"] or Decimal("0")
+            resumo.custo = linha["soma_custo"] or Decimal("0")
+            resumo.lucro = linha["soma_lucro"] or Decimal("0")
+
+        with transaction.atomic():
+            resumos.delete()
+            VendaResumoDiario.objects.bulk_create(linhas.values(), batch_size=500)
+
+        logger.info(f"Resumo diário recalculado: {len(linhas)} linha(s)")
+        return len(linhas)
+
+    @staticmethod
+    def resumo_do_dia(data, empresa=None):
+        """
+        Retorna totais do dia e a divisão por forma de pagamento.
+
+        Args:
+            data: date
+            empresa: Restringe à empresa (opcional)
+
+        Returns:
+            dict: {"quantidade", "total", "lucro", "por_pagamento": [...]}
+        """
+        resumos = VendaResumoDiario.objects.filter(data=data, quantidade__gt=0)
+        if empresa is not None:
+            resumos = resumos.filter(empresa=empresa)
+
+        linhas = (
+            resumos.values("forma_pagamento")
+            .annotate(
+                qtd=Sum("quantidade"),
+                soma_total=Sum(F("total_bruto") - F("desconto")),
+                soma_lucro=Sum("lucro"),
+            )
+            .order_by("forma_pagamento")
+        )
+
+        resumo = {
+            "quantidade": 0,
+            "total": Decimal("0"),
+            "lucro": Decimal("0"),
+            "por_pagamento": [],
+        }
+        for linha in linhas:
+            resumo["quantidade"] += linha["qtd"]
+            resumo["total"] += linha["soma_total"]
+            resumo["lucro"] += linha["soma_lucro"]
+            resumo["por_pagamento"].append(
+                {
+                    "forma_pagamento": linha["forma_pagamento"],
+                    "total": linha["soma_total"],
+                    "quantidade": linha["qtd"],
+                }
+            )
+        return resumo
@@ -0,0 +1,119 @@
+"""
+Serviço do saldo devedor (fiado) por cliente.
+
+Cliente.saldo_em_aberto é um razão incremental: cada venda FINALIZADA com
+pagamento PENDENTE soma seu total ao saldo do cliente. O saldo é ajustado
+com F() quando a venda muda de situação (finalização, recebimento,
+cancelamento, exclusão), e pode ser reconstruído com uma query agrupada.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from ..models import Cliente, Venda
+from .alert_service import AlertService
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+
+class SaldoClienteService:
+    """Serviço para manter e reconciliar o saldo devedor dos clientes"""
+
+    @staticmethod
+    def aplicar(deltas, empresa_id=None):
+        """
+        Soma variações ao saldo em aberto com um único UPDATE.
+
+        Args:
+            deltas: dict {cliente_id: delta} (positivo aumenta a dívida)
+            empresa_id: Empresa da venda (None = desconhecida)
+
+        Returns:
+            int: Número de clientes atualizados
+        """
+        deltas = {
+            cliente_id: Decimal(str(delta))
+            for cliente_id, delta in deltas.items()
+            if cliente_id and delta
+        }
+        if not deltas:
+            return 0
+
+        delta_por_cliente = Case(
+            *[
+                When(pk=cliente_id, then=Value(delta))
+                for cliente_id, delta in deltas.items()
+            ],
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        )
+        atualizados = Cliente.objects.filter(pk__in=deltas.keys()).update(
+            saldo_em_aberto=F("saldo_em_aberto") + delta_por_cliente,
+            updated_at=timezone.now(),
+        )
+        CacheService.invalidar("clientes", empresa_id=empresa_id)
+        AlertService.agendar(clientes=deltas.keys())
+        return atualizados
+
+    @staticmethod
+    def calcular_saldos(cliente_ids=None):
+        """
+        Calcula o saldo devedor real a partir das vendas (uma query agrupada).
+
+        Args:
+            cliente_ids: Restringe aos clientes informados (None = todos)
+
+        Returns:
+            dict: {cliente_id: Decimal} apenas para clientes com dívida
+        """
+        vendas = Venda.objects.filter(
+            cliente__isnull=False, status="FINALIZADA", status_pagamento="PENDENTE"
+        )
+        if cliente_ids is not None:
+            vendas = vendas.filter(cliente_id__in=cliente_ids)
+
+        return dict(
+            vendas.values("cliente_id")
+            .annotate(total=Sum("total"))
+            .values_list("cliente_id", "total")
+        )
+
+    @staticmethod
+    def reconciliar(aplicar=True):
+        """
+        Reconstrói Cliente.saldo_em_aberto de todos os clientes.
+
+        Args:
+            aplicar: Se False, apenas retorna as divergências (dry-run)
+
+        Returns:
+            dict: {cliente_id: (saldo_registrado, saldo_real)} dos clientes divergentes
+        """
+        saldos_reais = SaldoClienteService.calcular_saldos()
+
+        divergencias = {}
+        clientes_corrigidos = []
+        agora = timezone.now()
+        for cliente in Cliente.objects.only("id", "saldo_em_aberto"):
+            saldo_real = saldos_reais.get(cliente.id) or Decimal("0.00")
+            if cliente.saldo_em_aberto != saldo_real:
+                divergencias[cliente.id] = (cliente.saldo_em_aberto, saldo_real)
+                cliente.saldo_em_aberto = saldo_real
+                cliente.updated_at = agora
+                clientes_corrigidos.append(cliente)
+
+        if aplicar and clientes_corrigidos:
+            Cliente.objects.bulk_update(
+                clientes_corrigidos, ["saldo_em_aberto", "updated_at"], batch_size=500
+            )
+            CacheService.invalidar("clientes")
+            AlertService.agendar(clientes=[cliente.id for cliente in clientes_corrigidos])
+            logger.warning(
+                f"Saldo devedor reconciliado para {len(clientes_corrigidos)} cliente(s)"
+            )
+
+        return divergencias
@@ -0,0 +1,123 @@
+"""
+Serviço de sincronização incremental do catálogo para os PDVs offline.
+
+Cada chamada devolve apenas os registros com updated_at posterior ao token
+recebido, as lápides (registros desativados ou excluídos) e um novo token.
+As consultas usam os índices (empresa, updated_at) dos modelos do catálogo.
+"""
+
+import logging
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..models import Categoria, Cliente, Fornecedor, Produto, RegistroExclusao
+
+logger = logging.getLogger(__name__)
+
+
+class TokenSincronizacaoInvalido(ValueError):
+    """Token de sincronização (?since=) em formato inválido"""
+
+
+class SincronizacaoService:
+    """Serviço para calcular deltas do catálogo desde um token"""
+
+    MODELOS = {
+        "produto": Produto,
+        "cliente": Cliente,
+        "categoria": Categoria,
+        "fornecedor": Fornecedor,
+    }
+
+    # Janela de segurança: transações que gravaram updated_at pouco antes do
+    # token, mas ainda não tinham feito commit na leitura anterior
+    MARGEM = timedelta(seconds=5)
+
+    @staticmethod
+    def gerar_token(momento):
+        """Serializa o instante da leitura como token opaco (UTC)"""
+        return momento.astimezone(dt_timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+    @staticmethod
+    def ler_token(token):
+        """
+        Converte o token recebido em datetime.
+
+        Raises:
+            TokenSincronizacaoInvalido: Se o token não for reconhecido
+        """
+        momento = parse_datetime(token) if token else None
+        if momento is None or timezone.is_naive(momento):
+            raise TokenSincronizacaoInvalido(f"Token de sincronização inválido: {token}")
+        return momento
+
+    @staticmethod
+    def delta(modelo, since=None, empresa_id=None):
+        """
+        Calcula o delta de um modelo do catálogo.
+
+        Sem token, devolve o catálogo ativo completo. Com token, devolve os
+        registros ativos alterados desde então e, em "removidos", os IDs
+        desativados ou excluídos (o cliente deve aplicar "removidos" antes
+        de "alterados").
+
+        Args:
+            modelo: "produto", "cliente", "categoria" ou "fornecedor"
+            since: Token devolvido pela sincronização anterior (opcional)
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: {"token", "completo", "alterados": QuerySet, "removidos": [ids]}
+
+        Raises:
+            TokenSincronizacaoInvalido: Se o token não for reconhecido
+        """
+        model = SincronizacaoService.MODELOS[modelo]
+        agora = timezone.now()
+
+        registros = model.objects.all()
+        if empresa_id:
+            registros = registros.filter(empresa_id=empresa_id)
+
+        if not since:
+            return {
+                "token": SincronizacaoService.gerar_token(agora),
+                "completo": True,
+                "alterados": registros.filter(ativo=True),
+                "removidos": [],
+            }
+
+        desde = SincronizacaoService.ler_token(since) - SincronizacaoService.MARGEM
+        registros = registros.filter(updated_at__gte=desde)
+
+        exclusoes = RegistroExclusao.objects.filter(
+            modelo=modelo, excluido_em__gte=desde
+        )
+        if empresa_id:
+            exclusoes = exclusoes.filter(empresa_id=empresa_id)
+
+        removidos = set(
+            registros.filter(ativo=False).values_list("id", flat=True)
+        ) | set(exclusoes.values_list("objeto_id", flat=True))
+
+        return {
+            "token": SincronizacaoService.gerar_token(agora),
+            "completo": False,
+            "alterados": registros.filter(ativo=True),
+            "removidos": sorted(removidos),
+        }
+
+    @staticmethod
+    def registrar_exclusao(modelo, instance):
+        """
+        Grava a lápide de um registro excluído do catálogo.
+
+        Args:
+            modelo: Chave em MODELOS
+            instance: Instância excluída
+        """
+        RegistroExclusao.objects.create(
+            modelo=modelo, objeto_id=instance.pk, empresa_id=instance.empresa_id
+        )
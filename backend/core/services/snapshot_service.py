@@ -0,0 +1,126 @@
+"""
+Serviço do snapshot compacto do catálogo para a carga inicial dos PDVs.
+
+O snapshot traz só os campos que o PDV usa, em formato colunar (uma lista
+por campo), montado direto de values_list() e guardado já compactado com
+gzip. A chave de cache inclui a versão do catálogo da empresa (contagem e
+maior updated_at dos produtos, lidos pelo índice (empresa, updated_at)),
+então qualquer alteração de produto - inclusive as baixas de estoque com
+UPDATE, que também gravam updated_at - gera um snapshot novo.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from ..models import Produto
+from .sincronizacao_service import SincronizacaoService
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCatalogoService:
+    """Serviço para montar e cachear o snapshot colunar dos produtos"""
+
+    CAMPOS = ("id", "nome", "preco", "codigo_barras", "estoque", "ativo", "categoria_id")
+    CAMPOS_DECIMAIS = ("preco", "estoque")
+    CACHE_TIMEOUT = 60 * 60  # 1 hora (a versão já invalida a chave)
+
+    @staticmethod
+    def _produtos(empresa_id):
+        produtos = Produto.objects.all()
+        if empresa_id:
+            produtos = produtos.filter(empresa_id=empresa_id)
+        return produtos
+
+    @staticmethod
+    def versao(empresa_id=None):
+        """
+        Versão do catálogo da empresa: muda a cada inclusão, alteração ou
+        exclusão de produto.
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            str: "<total>-<maior updated_at em microssegundos>"
+        """
+        dados = SnapshotCatalogoService._produtos(empresa_id).aggregate(
+            total=Count("id"), ultima=Max("updated_at")
+        )
+        ultima = int(dados["ultima"].timestamp() * 1_000_000) if dados["ultima"] else 0
+        return f"{dados['total']}-{ultima}"
+
+    @staticmethod
+    def cache_key(empresa_id, versao):
+        """Chave de cache por (empresa, versão do catálogo)"""
+        return f"produtos_snapshot_{empresa_id or 'todas'}_{versao}"
+
+    @staticmethod
+    def montar(empresa_id=None):
+        """
+        Monta o snapshot colunar compactado.
+
+        O payload (JSON) tem "token" (compatível com /sync/produtos/?since=),
+        "total", "campos" e "colunas" (uma lista de valores por campo).
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: {"etag": hash do JSON, "gzip": JSON compactado em base64}
+        """
+        campos = SnapshotCatalogoService.CAMPOS
+        # Token lido antes dos dados: o delta seguinte reaplica o que mudar agora
+        token = SincronizacaoService.gerar_token(timezone.now())
+        linhas = list(
+            SnapshotCatalogoService._produtos(empresa_id).order_by("id").values_list(*campos)
+        )
+
+        colunas = [list(coluna) for coluna in zip(*linhas)] or [[] for _ in campos]
+        for campo in SnapshotCatalogoService.CAMPOS_DECIMAIS:
+            indice = campos.index(campo)
+            colunas[indice] = [float(valor) for valor in colunas[indice]]
+
+        corpo = json.dumps(
+            {"token": token, "total": len(linhas), "campos": list(campos), "colunas": colunas},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        ).encode("utf-8")
+        # mtime=0: mesmo conteúdo, mesmos bytes
+        compactado = gzip.compress(corpo, compresslevel=9, mtime=0)
+
+        logger.info(
+            f"Snapshot do catálogo montado (empresa {empresa_id or 'todas'}): "
+            f"{len(linhas)} produto(s), {len(corpo)} bytes, {len(compactado)} bytes gzip"
+        )
+        return {
+            "etag": hashlib.sha256(corpo).hexdigest()[:32],
+            # base64: o cache em Redis usa o serializer JSON
+            "gzip": base64.b64encode(compactado).decode("ascii"),
+        }
+
+    @staticmethod
+    def obter(empresa_id=None):
+        """
+        Retorna o snapshot da versão atual do catálogo (cache ou montagem).
+
+        Args:
+            empresa_id: Restringe à empresa (None = todas)
+
+        Returns:
+            dict: {"etag": str, "gzip": bytes}
+        """
+        versao = SnapshotCatalogoService.versao(empresa_id)
+        cache_key = SnapshotCatalogoService.cache_key(empresa_id, versao)
+        snapshot = cache.get(cache_key)
+        if snapshot is None:
+            snapshot = SnapshotCatalogoService.montar(empresa_id)
+            cache.set(cache_key, snapshot, SnapshotCatalogoService.CACHE_TIMEOUT)
+        return {"etag": snapshot["etag"], "gzip": base64.b64decode(snapshot["gzip"])}
@@ -0,0 +1,209 @@
+"""
+Serviço de checkout em lote para vendas do PDV.
+
+Carrega os produtos uma única vez, grava os itens com bulk_create e
+persiste o cabeçalho da venda em um único INSERT, mantendo o número de
+queries constante independente da quantidade de itens.
+"""
+
+import logging
+from decimal import Decimal
+
+from django.db import transaction
+
+from ..models import Produto, Venda, ItemVenda, VendaIdempotencia
+from .resumo_service import ResumoDiarioService
+
+logger = logging.getLogger(__name__)
+
+
+class VendaService:
+    """Serviço para registrar vendas com número constante de queries"""
+
+    @staticmethod
+    def carregar_produtos(produto_ids):
+        """
+        Busca todos os produtos da venda em uma única query.
+
+        Args:
+            produto_ids: Iterável de IDs de produto
+
+        Returns:
+            dict: {produto_id: Produto}
+        """
+        return Produto.objects.in_bulk(set(produto_ids))
+
+    @staticmethod
+    def agrupar_quantidades(itens):
+        """
+        Soma as quantidades por produto (o mesmo produto pode aparecer
+        em mais de uma linha do carrinho).
+
+        Args:
+            itens: Lista de tuplas (produto_id, quantidade)
+
+        Returns:
+            dict: {produto_id: Decimal}
+        """
+        quantidades = {}
+        for produto_id, quantidade in itens:
+            quantidades[produto_id] = quantidades.get(produto_id, Decimal("0")) + quantidade
+        return quantidades
+
+    @staticmethod
+    def vendas_por_chave(chaves):
+        """
+        Busca vendas já sincronizadas pelas chaves de idempotência em uma
+        única query sobre o índice único de VendaIdempotencia.
+
+        Args:
+            chaves: Iterável de chaves de idempotência
+
+        Returns:
+            dict: {chave: {"venda_id": X, "numero": "..."}}
+        """
+        return {
+            chave: {"venda_id": venda_id, "numero": numero}
+            for chave, venda_id, numero in VendaIdempotencia.objects.filter(
+                chave__in=list(chaves)
+            ).values_list("chave", "venda_id", "venda__numero")
+        }
+
+    @staticmethod
+    def registrar_venda(
+        itens,
+        produtos,
+        forma_pagamento,
+        cliente_id=None,
+        data_vencimento=None,
+        desconto=Decimal("0"),
+        observacoes="",
+        empresa_id=None,
+    ):
+        """
+        Cria a venda já finalizada, com itens e baixa de estoque.
+
+        Args:
+            itens: Lista de tuplas (produto_id, quantidade) já validadas
+            produtos: dict {produto_id: Produto} carregado por carregar_produtos()
+            forma_pagamento: Forma de pagamento (Venda.FORMA_PAGAMENTO_CHOICES)
+            cliente_id: Cliente (obrigatório para FIADO)
+            data_vencimento: Vencimento (vendas FIADO)
+            desconto: Desconto aplicado sobre o total
+            observacoes: Observações livres
+            empresa_id: Empresa da venda (a da requisição)
+
+        Returns:
+            Venda: Venda criada com status FINALIZADA
+
+        Raises:
+            ValueError: Se FIADO sem cliente ou estoque insuficiente
+        """
+        if forma_pagamento == "FIADO" and not cliente_id:
+            raise ValueError("Cliente é obrigatório para vendas fiado")
+
+        desconto = Decimal(str(desconto or 0))
+
+        itens_venda = []
+        for produto_id, quantidade in itens:
+            produto = produtos[produto_id]
+            itens_venda.append(
+                ItemVenda(
+                    produto=produto,
+                    quantidade=quantidade,
+                    preco_unitario=produto.preco,
+                    subtotal=quantidade * produto.preco,
+                    preco_custo=produto.preco_custo,
+                )
+            )
+
+        total = sum((item.subtotal for item in itens_venda), Decimal("0")) - desconto
+
+        venda = Venda(
+            forma_pagamento=forma_pagamento,
+            desconto=desconto,
+            observacoes=observacoes or "",
+            total=total,
+            status="FINALIZADA",
+            empresa_id=empresa_id,
+        )
+        if forma_pagamento == "FIADO":
+            venda.cliente_id = cliente_id
+            venda.status_pagamento = "PENDENTE"
+            venda.data_vencimento = data_vencimento
+        else:
+            venda.status_pagamento = "PAGO"
+
+        with transaction.atomic():
+            venda.save()
+
+            for item in itens_venda:
+                item.venda = venda
+            ItemVenda.objects.bulk_create(itens_venda)
+
+            VendaService.baixar_estoque_itens(venda, itens_venda)
+
+            ResumoDiarioService.registrar_venda(venda, itens_venda)
+
+        return venda
+
+    @staticmethod
+    def baixar_estoque_itens(venda, itens_venda):
+        """
+        Baixa o estoque dos itens de uma venda.
+        Produtos com lotes passam juntos pelo motor FEFO em lote; os demais
+        têm o estoque baixado em um único UPDATE condicional.
+
+        Args:
+            venda: Venda sendo finalizada (usada para log)
+            itens_venda: Lista de ItemVenda com produto carregado
+
+        Returns:
+            list: Lotes afetados por item, na mesma ordem de itens_venda
+            (lista vazia para produtos sem lotes)
+
+        Raises:
+            ValueError: Se não houver estoque suficiente
+        """
+        from .estoque_service import EstoqueInsuficienteError, EstoqueService
+        from .lote_service import LoteService
+
+        produtos_sem_lotes = {}
+        quantidades_sem_lotes = {}
+        itens_fefo = []
+        for posicao, item in enumerate(itens_venda):
+            produto = item.produto
+
+            if LoteService.produto_usa_lotes(produto):
+                itens_fefo.append((posicao, item))
+            else:
+                # Produto sem lotes: baixa direta do estoque
+                produtos_sem_lotes[produto.id] = produto
+                quantidades_sem_lotes[produto.id] = (
+                    quantidades_sem_lotes.get(produto.id, Decimal("0")) + item.quantidade
+                )
+
+        if quantidades_sem_lotes:
+            # Um único UPDATE condicional (estoque >= quantidade) para todos
+            try:
+                EstoqueService.baixar(quantidades_sem_lotes, empresa_id=venda.empresa_id)
+            except EstoqueInsuficienteError as e:
+                produto_id, disponivel = next(iter(e.falhas.items()))
+                raise ValueError(
+                    f"Estoque insuficiente para {produtos_sem_lotes[produto_id].nome}. "
+                    f"Disponível: {disponivel}, Solicitado: {quantidades_sem_lotes[produto_id]}"
+                ) from e
+
+        alocacoes = [[] for _ in itens_venda]
+        if itens_fefo:
+            # Usa FEFO para baixar dos lotes (uma única passada para a cesta)
+            lotes_por_item = LoteService.alocar_fefo(
+                [(item.produto, item.quantidade) for _, item in itens_fefo]
+            )
+            for (posicao, item), lotes_afetados in zip(itens_fefo, lotes_por_item):
+                alocacoes[posicao] = lotes_afetados
+                logger.info(
+                    f"Venda {venda.numero}: FEFO aplicado em {item.produto.nome}. Lotes: {lotes_afetados}"
+                )
+
+        return alocacoes
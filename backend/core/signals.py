@@ -1,10 +1,27 @@
 """
-Signals para manter consistência entre Lotes e Produtos
+Signals para manter consistência entre Lotes e Produtos,
+do saldo devedor dos clientes, dos contadores do caixa aberto,
+das lápides da sincronização do catálogo, do índice de códigos de barras
+das tabelas de busca textual (SQLite), das versões das tags de cache
+e da reavaliação dos alertas afetados
 """
 
-from django.db.models.signals import post_delete, pre_save
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Lote
+from fiscal.models import Empresa
+from .models import Alerta, Caixa, Categoria, Cliente, Fornecedor, Lote, MovimentacaoCaixa, Produto, Venda
+from .services.alert_service import AlertService
+from .services.busca_service import BuscaService
+from .services.cache_service import CacheService
+from .services.caixa_service import CaixaService
+from .services.codigo_barras_service import IndiceCodigoBarrasService
+from .services.empresa_service import EmpresaService
+from .services.estoque_service import EstoqueService
+from .services.lote_service import LoteService
+from .services.resumo_service import ResumoDiarioService
+from .services.saldo_service import SaldoClienteService
+from .services.sincronizacao_service import SincronizacaoService
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,20 +32,45 @@ def atualizar_estoque_ao_deletar_lote(sender, instance, **kwargs):
     """
     Quando um lote é deletado, atualiza o estoque do produto.
     """
-    produto = instance.produto
     quantidade_removida = instance.quantidade
 
-    # Atualiza estoque do produto
-    produto.estoque -= quantidade_removida
-    if produto.estoque < 0:
-        produto.estoque = 0
-    produto.save(update_fields=["estoque"])
+    # Atualiza estoque do produto (nunca abaixo de zero)
+    EstoqueService.ajustar(
+        {instance.produto_id: -quantidade_removida},
+        limitar_em_zero=True,
+        empresa_id=instance.empresa_id,
+    )
 
     logger.info(
-        f"Lote {instance.id} deletado. Estoque de {produto.nome} "
-        f"reduzido em {quantidade_removida} un. Novo estoque: {produto.estoque}"
+        f"Lote {instance.id} deletado. Estoque do produto {instance.produto_id} "
+        f"reduzido em {quantidade_removida} un."
     )
 
+    # Produto pode ter deixado de usar lotes
+    LoteService.atualizar_usa_lotes([instance.produto_id])
+
+
+@receiver(post_save, sender=Lote)
+def atualizar_usa_lotes_ao_salvar_lote(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Mantém Produto.usa_lotes em dia quando um lote é criado, ativado,
+    desativado ou transferido de produto.
+    """
+    if created:
+        if instance.ativo:
+            LoteService.marcar_usa_lotes(instance.produto_id)
+        return
+
+    if update_fields is not None and not {"ativo", "produto"} & set(update_fields):
+        return
+
+    produto_ids = [instance.produto_id]
+    produto_anterior_id = getattr(instance, "_produto_anterior_id", None)
+    if produto_anterior_id:
+        produto_ids.append(produto_anterior_id)
+        del instance._produto_anterior_id
+    LoteService.atualizar_usa_lotes(produto_ids)
+
 
 @receiver(pre_save, sender=Lote)
 def atualizar_estoque_ao_editar_lote(sender, instance, **kwargs):
@@ -47,15 +89,20 @@ def atualizar_estoque_ao_editar_lote(sender, instance, **kwargs):
                 return
 
             if produto_original.id != produto_atual.id:
+                # post_save recalcula usa_lotes também no produto original
+                instance._produto_anterior_id = produto_original.id
+
                 # Remove quantidade antiga do produto original
-                produto_original.estoque -= lote_antigo.quantidade
-                if produto_original.estoque < 0:
-                    produto_original.estoque = 0
-                produto_original.save(update_fields=["estoque"])
+                EstoqueService.ajustar(
+                    {produto_original.id: -lote_antigo.quantidade},
+                    limitar_em_zero=True,
+                    empresa_id=instance.empresa_id,
+                )
 
                 # Adiciona quantidade atual ao novo produto
-                produto_atual.estoque += instance.quantidade
-                produto_atual.save(update_fields=["estoque"])
+                EstoqueService.repor(
+                    {produto_atual.id: instance.quantidade}, empresa_id=instance.empresa_id
+                )
 
                 logger.info(
                     "Lote %s transferido do produto '%s' para '%s'. Estoques atualizados.",
@@ -66,12 +113,188 @@ def atualizar_estoque_ao_editar_lote(sender, instance, **kwargs):
             else:
                 diferenca = instance.quantidade - lote_antigo.quantidade
                 if diferenca != 0:
-                    produto_atual.estoque += diferenca
-                    produto_atual.save(update_fields=["estoque"])
+                    EstoqueService.ajustar(
+                        {produto_atual.id: diferenca}, empresa_id=instance.empresa_id
+                    )
 
                     logger.info(
                         f"Lote {instance.id} editado. Estoque de {produto_atual.nome} "
-                        f"ajustado em {diferenca:+.2f} un. Novo estoque: {produto_atual.estoque}"
+                        f"ajustado em {diferenca:+.2f} un."
                     )
         except Lote.DoesNotExist:
             pass
+
+
+@receiver(pre_delete, sender=Venda)
+def estornar_resumo_ao_deletar_venda(sender, instance, **kwargs):
+    """
+    Quando uma venda finalizada é deletada, retira a venda do resumo diário.
+    Roda no pre_delete: no post_delete os itens já foram apagados em cascata.
+    """
+    if instance.status == "FINALIZADA":
+        ResumoDiarioService.estornar_venda(instance)
+
+
+@receiver(post_delete, sender=Venda)
+def atualizar_saldo_ao_deletar_venda(sender, instance, **kwargs):
+    """
+    Quando uma venda fiado pendente é deletada, abate o valor do saldo
+    em aberto do cliente.
+    """
+    cliente_id, valor = getattr(
+        instance, "_saldo_registrado", instance._contribuicao_saldo()
+    )
+    if cliente_id:
+        SaldoClienteService.aplicar({cliente_id: -valor}, empresa_id=instance.empresa_id)
+
+
+@receiver(post_delete, sender=Venda)
+def atualizar_caixa_ao_deletar_venda(sender, instance, **kwargs):
+    """
+    Quando uma venda finalizada é deletada, retira o valor dos contadores
+    do caixa aberto.
+    """
+    forma_pagamento, valor = getattr(
+        instance, "_caixa_registrado", instance._contribuicao_caixa()
+    )
+    if forma_pagamento:
+        CaixaService.aplicar_vendas(
+            {forma_pagamento: -valor}, instance.created_at, empresa_id=instance.empresa_id
+        )
+
+
+@receiver(pre_save, sender=MovimentacaoCaixa)
+def registrar_movimentacao_anterior(sender, instance, **kwargs):
+    """
+    Guarda caixa, tipo e valor gravados da movimentação editada, para o
+    post_save aplicar apenas a diferença.
+    """
+    if instance.pk:
+        instance._movimentacao_anterior = (
+            MovimentacaoCaixa.objects.filter(pk=instance.pk)
+            .values_list("caixa_id", "tipo", "valor")
+            .first()
+        )
+
+
+@receiver(post_save, sender=MovimentacaoCaixa)
+def atualizar_caixa_ao_salvar_movimentacao(sender, instance, created, **kwargs):
+    """
+    Soma sangrias e suprimentos aos contadores do caixa aberto; na edição,
+    estorna o valor anterior e soma o atual.
+    """
+    anterior = getattr(instance, "_movimentacao_anterior", None)
+    atual = (instance.caixa_id, instance.tipo, instance.valor)
+    if anterior == atual:
+        return
+
+    if anterior:
+        caixa_id, tipo, valor = anterior
+        CaixaService.aplicar_movimentacao(caixa_id, tipo, -valor)
+    CaixaService.aplicar_movimentacao(*atual)
+    instance._movimentacao_anterior = atual
+
+
+@receiver(post_delete, sender=MovimentacaoCaixa)
+def atualizar_caixa_ao_deletar_movimentacao(sender, instance, **kwargs):
+    """
+    Quando uma movimentação é deletada, retira o valor dos contadores do caixa.
+    """
+    CaixaService.aplicar_movimentacao(instance.caixa_id, instance.tipo, -instance.valor)
+
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_delete, sender=Fornecedor)
+def registrar_exclusao_catalogo(sender, instance, **kwargs):
+    """
+    Grava a lápide do registro excluído para a sincronização incremental
+    dos PDVs (/sync/...).
+    """
+    SincronizacaoService.registrar_exclusao(sender._meta.model_name, instance)
+
+
+@receiver(post_save, sender=Produto)
+def atualizar_indice_codigo_barras(sender, instance, **kwargs):
+    """
+    Mantém a entrada do produto no índice de códigos de barras do PDV.
+    """
+    IndiceCodigoBarrasService.registrar(instance)
+
+
+@receiver(post_delete, sender=Produto)
+def remover_do_indice_codigo_barras(sender, instance, **kwargs):
+    """
+    Remove o produto excluído do índice de códigos de barras do PDV.
+    """
+    IndiceCodigoBarrasService.remover(instance)
+
+
+@receiver(post_migrate)
+def instalar_busca_textual(sender, using="default", **kwargs):
+    """
+    Garante as tabelas FTS5 e os triggers da busca textual no SQLite após
+    cada migrate (reconstruções de tabela descartam os triggers).
+    """
+    if sender.name == "core":
+        BuscaService.instalar_fts_sqlite(connections[using])
+
+
+TAGS_CACHE_POR_MODELO = {
+    Produto: ("estoque",),
+    Lote: ("estoque",),
+    Venda: ("vendas", "estoque", "clientes"),
+    Cliente: ("clientes",),
+    Alerta: ("alertas",),
+}
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=Lote)
+@receiver(post_save, sender=Venda)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Alerta)
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=Lote)
+@receiver(post_delete, sender=Venda)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Alerta)
+def invalidar_tags_de_cache(sender, instance, **kwargs):
+    """
+    Incrementa as tags de cache do modelo alterado no escopo da empresa
+    do registro: as leituras em cache que dependem delas são recalculadas.
+    """
+    CacheService.invalidar(
+        *TAGS_CACHE_POR_MODELO[sender], empresa_id=getattr(instance, "empresa_id", None)
+    )
+
+
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+def limpar_cache_de_empresas(sender, instance, **kwargs):
+    """Descarta as empresas em cache no processo (request.empresa)"""
+    EmpresaService.limpar_cache()
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=Lote)
+@receiver(post_save, sender=Venda)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Caixa)
+def agendar_reavaliacao_de_alertas(sender, instance, **kwargs):
+    """
+    Agenda, para depois do commit, a reavaliação dos alertas do registro
+    alterado (estoque, validade de lote, conta vencida, limite de crédito,
+    diferença no fechamento do caixa).
+    """
+    if sender is Produto:
+        AlertService.agendar(produtos=[instance.pk])
+    elif sender is Lote:
+        AlertService.agendar(lotes=[instance.pk])
+    elif sender is Venda:
+        AlertService.agendar(vendas=[instance.pk], clientes=[instance.cliente_id])
+    elif sender is Cliente:
+        AlertService.agendar(clientes=[instance.pk])
+    elif instance.status == "FECHADO":
+        AlertService.agendar(caixas=[instance.pk])
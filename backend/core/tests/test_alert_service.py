@@ -1,11 +1,23 @@
 from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
 
-from core.models import Cliente, Produto, Venda, Lote, Alerta
+from core.models import Cliente, Produto, ReavaliacaoAlerta, Venda, Lote, Alerta
+from core.services import alert_service
 from core.services.alert_service import AlertService
+from core.services.estoque_service import EstoqueService
+from core.services.venda_service import VendaService
 
 
 class AlertServiceTestCase(TestCase):
@@ -60,3 +72,256 @@ class AlertServiceTestCase(TestCase):
         self.assertEqual(len(alertas), 1)
         self.assertEqual(alertas[0].produto, self.produto)
         self.assertEqual(Alerta.objects.count(), 1)
+
+
+class AlertServiceConjuntoTestCase(TestCase):
+    """Verificações por conjunto: queries constantes e só as diferenças gravadas"""
+
+    def _criar_produtos(self, quantidade, estoque):
+        Produto.objects.bulk_create(
+            [
+                Produto(nome=f"Produto {i}", preco=Decimal("5.00"), estoque=Decimal(estoque))
+                for i in range(quantidade)
+            ]
+        )
+
+    def test_queries_nao_crescem_com_o_numero_de_produtos(self):
+        self._criar_produtos(3, "5")
+        with CaptureQueriesContext(connection) as poucos:
+            AlertService.verificar_estoque_baixo()
+
+        Alerta.objects.all().delete()
+        self._criar_produtos(60, "5")
+        with CaptureQueriesContext(connection) as muitos:
+            alertas = AlertService.verificar_estoque_baixo()
+
+        self.assertEqual(len(alertas), 63)
+        self.assertEqual(len(muitos), len(poucos))
+
+    def test_segunda_verificacao_sem_mudancas_nao_grava(self):
+        self._criar_produtos(5, "5")
+        AlertService.verificar_estoque_baixo()
+
+        # SELECT dos produtos + SELECT dos alertas abertos
+        with self.assertNumQueries(2):
+            alertas = AlertService.verificar_estoque_baixo()
+
+        self.assertEqual(alertas, [])
+        self.assertEqual(Alerta.objects.filter(tipo="ESTOQUE_BAIXO").count(), 5)
+
+    def test_atualiza_alterados_e_resolve_ausentes(self):
+        baixo = Produto.objects.create(nome="Baixo", preco=Decimal("5.00"), estoque=Decimal("5"))
+        normalizado = Produto.objects.create(
+            nome="Normalizado", preco=Decimal("5.00"), estoque=Decimal("5")
+        )
+        AlertService.verificar_estoque_baixo()
+
+        Produto.objects.filter(pk=baixo.pk).update(estoque=Decimal("2"))
+        Produto.objects.filter(pk=normalizado.pk).update(estoque=Decimal("50"))
+        AlertService.verificar_estoque_baixo()
+
+        alerta_baixo = Alerta.objects.get(tipo="ESTOQUE_BAIXO", produto=baixo)
+        self.assertEqual(alerta_baixo.prioridade, "ALTA")
+        self.assertFalse(alerta_baixo.resolvido)
+        alerta_normalizado = Alerta.objects.get(tipo="ESTOQUE_BAIXO", produto=normalizado)
+        self.assertTrue(alerta_normalizado.resolvido)
+        self.assertIsNotNone(alerta_normalizado.resolvido_em)
+
+    def test_duplicatas_do_mesmo_alvo_sao_resolvidas(self):
+        produto = Produto.objects.create(nome="Baixo", preco=Decimal("5.00"), estoque=Decimal("5"))
+        for _ in range(2):
+            Alerta.objects.create(
+                tipo="ESTOQUE_BAIXO", prioridade="MEDIA", titulo="x", mensagem="x", produto=produto
+            )
+
+        AlertService.verificar_estoque_baixo()
+
+        self.assertEqual(
+            Alerta.objects.filter(tipo="ESTOQUE_BAIXO", resolvido=False).count(), 1
+        )
+
+    def test_sincronizar_atualiza_existente(self):
+        produto = Produto.objects.create(nome="Baixo", preco=Decimal("5.00"), estoque=Decimal("5"))
+
+        def candidato(prioridade, titulo):
+            return Alerta(
+                tipo="ESTOQUE_BAIXO", prioridade=prioridade, titulo=titulo, mensagem="Mensagem",
+                produto=produto,
+            )
+
+        AlertService.sincronizar("ESTOQUE_BAIXO", [candidato("MEDIA", "Título")])
+        criados = AlertService.sincronizar("ESTOQUE_BAIXO", [candidato("ALTA", "Título novo")])
+
+        self.assertEqual(criados, [])
+        alerta = Alerta.objects.get(produto=produto)
+        self.assertEqual(alerta.prioridade, "ALTA")
+        self.assertEqual(alerta.titulo, "Título novo")
+
+
+class AlertServiceEventoTestCase(TestCase):
+    """Fila de alvos afetados gravada após o commit e reavaliada pelo worker"""
+
+    def setUp(self):
+        self.produto = Produto.objects.create(
+            nome="Produto Teste", preco=Decimal("10.00"), estoque=Decimal("20.00")
+        )
+        self.outro = Produto.objects.create(
+            nome="Outro", preco=Decimal("10.00"), estoque=Decimal("20.00")
+        )
+        # TestCase não executa on_commit: descarta os alvos agendados no setUp
+        alert_service._pendentes.alvos = None
+
+    def test_baixa_de_estoque_cria_alerta_so_do_produto_afetado(self):
+        # Alerta aberto de outro produto (já normalizado) não é tocado
+        alerta_outro = Alerta.objects.create(
+            tipo="ESTOQUE_BAIXO", prioridade="MEDIA", titulo="x", mensagem="x", produto=self.outro
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            EstoqueService.baixar({self.produto.id: Decimal("15")})
+        AlertService.avaliar_pendentes()
+
+        alerta = Alerta.objects.get(tipo="ESTOQUE_BAIXO", produto=self.produto)
+        self.assertFalse(alerta.resolvido)
+        alerta_outro.refresh_from_db()
+        self.assertFalse(alerta_outro.resolvido)
+
+    def test_eventos_da_transacao_sao_avaliados_uma_vez(self):
+        with mock.patch.object(
+            AlertService, "verificar_estoque_baixo", return_value=[]
+        ) as verificar:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    EstoqueService.baixar({self.produto.id: Decimal("1")})
+                    EstoqueService.ajustar({self.outro.id: Decimal("-1")})
+
+            # Os alvos só entram na fila: a avaliação fica para o worker
+            verificar.assert_not_called()
+            self.assertEqual(ReavaliacaoAlerta.objects.count(), 2)
+            AlertService.avaliar_pendentes()
+
+        verificar.assert_called_once()
+        self.assertEqual(
+            set(verificar.call_args.kwargs["ids"]), {self.produto.id, self.outro.id}
+        )
+
+    def test_venda_so_enfileira_os_alvos(self):
+        produtos = VendaService.carregar_produtos([self.produto.id])
+
+        # Venda, caixa, item, estoque e resumo diário (com savepoints) + um
+        # único INSERT na fila: nenhuma verificação de alerta no checkout
+        with self.assertNumQueries(15):
+            with self.captureOnCommitCallbacks(execute=True):
+                venda = VendaService.registrar_venda(
+                    [(self.produto.id, Decimal("15"))], produtos, "DINHEIRO"
+                )
+
+        self.assertFalse(Alerta.objects.exists())
+        self.assertEqual(
+            set(ReavaliacaoAlerta.objects.values_list("alvo", "objeto_id")),
+            {("produtos", self.produto.id), ("vendas", venda.id)},
+        )
+
+        call_command("check_alerts", "--pendentes", stdout=StringIO())
+
+        self.assertTrue(Alerta.objects.filter(tipo="ESTOQUE_BAIXO", produto=self.produto).exists())
+        self.assertFalse(ReavaliacaoAlerta.objects.exists())
+
+    def test_lote_criado_vencendo_gera_alerta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            lote = Lote.objects.create(
+                produto=self.produto,
+                quantidade=Decimal("3.00"),
+                data_validade=timezone.localdate() + timedelta(days=2),
+            )
+        AlertService.avaliar_pendentes()
+
+        self.assertTrue(Alerta.objects.filter(tipo="PRODUTO_VENCENDO", lote=lote).exists())
+
+    def test_estoque_normalizado_resolve_o_alerta(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            EstoqueService.baixar({self.produto.id: Decimal("15")})
+        AlertService.avaliar_pendentes()
+        with self.captureOnCommitCallbacks(execute=True):
+            EstoqueService.repor({self.produto.id: Decimal("15")})
+        AlertService.avaliar_pendentes()
+
+        self.assertTrue(
+            Alerta.objects.get(tipo="ESTOQUE_BAIXO", produto=self.produto).resolvido
+        )
+
+
+class AlertaResumoTestCase(APITestCase):
+    """Resumo em cache por versão da tag "alertas" e grupos paginados"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        for indice in range(3):
+            Alerta.objects.create(
+                tipo="ESTOQUE_BAIXO", prioridade="ALTA", titulo=f"Alta {indice}", mensagem=""
+            )
+        Alerta.objects.create(
+            tipo="CONTA_VENCIDA", prioridade="CRITICA", titulo="Crítica", mensagem="", lido=True
+        )
+
+    def test_resumo_em_uma_query_e_depois_do_cache(self):
+        with self.assertNumQueries(1):
+            resumo = AlertService.obter_resumo()
+        self.assertEqual(
+            resumo,
+            {
+                "total_pendentes": 4,
+                "nao_lidos": 3,
+                "criticos": 1,
+                "altos": 3,
+                "medios": 0,
+                "baixos": 0,
+            },
+        )
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/alertas/resumo/")
+        self.assertEqual(response.data["total_pendentes"], 4)
+
+    def test_escrita_de_alerta_invalida_o_resumo(self):
+        AlertService.obter_resumo()
+
+        Alerta.objects.filter(prioridade="ALTA").first().resolver()
+        self.assertEqual(AlertService.obter_resumo()["altos"], 2)
+
+        self.client.post("/api/alertas/marcar_todos_lidos/")
+        self.assertEqual(AlertService.obter_resumo()["nao_lidos"], 0)
+
+    def test_sincronizar_invalida_o_resumo(self):
+        AlertService.obter_resumo()
+        produto = Produto.objects.create(nome="Arroz", preco=Decimal("5.00"), estoque=Decimal("0"))
+        Alerta.objects.filter(produto=produto).delete()
+        AlertService.obter_resumo()
+
+        AlertService.sincronizar(
+            "ESTOQUE_ZERADO",
+            [Alerta(tipo="ESTOQUE_ZERADO", prioridade="CRITICA", titulo="Zerado", mensagem="", produto=produto)],
+            escopo={"produto_id__in": [produto.id]},
+        )
+
+        self.assertEqual(AlertService.obter_resumo()["criticos"], 2)
+
+    def test_por_prioridade_paginado_em_uma_query(self):
+        with self.assertNumQueries(1):
+            grupos = AlertService.listar_por_prioridade(limite=2)
+        self.assertEqual([alerta.titulo for alerta in grupos["ALTA"]], ["Alta 2", "Alta 1"])
+        self.assertEqual(len(grupos["CRITICA"]), 1)
+        self.assertEqual(grupos["MEDIA"], [])
+
+        response = self.client.get("/api/alertas/por_prioridade/", {"limite": 2, "pagina": 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([alerta["titulo"] for alerta in response.data["ALTA"]], ["Alta 0"])
+        self.assertEqual(response.data["CRITICA"], [])
+        self.assertEqual(set(response.data), {"CRITICA", "ALTA", "MEDIA", "BAIXA"})
+
+    def test_por_prioridade_parametro_invalido(self):
+        response = self.client.get("/api/alertas/por_prioridade/", {"limite": "x"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
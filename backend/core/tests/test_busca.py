@@ -0,0 +1,64 @@
+"""
+Testes para a busca textual sem acentos de produtos, clientes e fornecedores
+"""
+
+from decimal import Decimal
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+from core.models import Cliente, Fornecedor, Produto
+
+
+class BuscaTextualTestCase(APITestCase):
+    """Busca ?search= ignora acentos, ranqueia e prioriza o código"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.acucar = Produto.objects.create(
+            nome="Açúcar Refinado", marca="União", preco=Decimal("5.00")
+        )
+        self.cafe = Produto.objects.create(
+            nome="Café com Açúcar", preco=Decimal("12.00")
+        )
+        self.arroz = Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.00"), codigo_barras="7891000100103"
+        )
+
+    def _ids(self, url, termo):
+        response = self.client.get(url, {"search": termo})
+        return [item["id"] for item in response.data["results"]]
+
+    def test_produtos_sem_acento_e_por_marca(self):
+        self.assertCountEqual(
+            self._ids("/api/produtos/", "acucar"), [self.acucar.id, self.cafe.id]
+        )
+        self.assertEqual(self._ids("/api/produtos/", "uniao"), [self.acucar.id])
+        # Trecho no meio da palavra continua funcionando
+        self.assertEqual(self._ids("/api/produtos/", "rroz"), [self.arroz.id])
+
+    def test_prefixo_do_codigo_de_barras_vem_primeiro(self):
+        outro = Produto.objects.create(nome="Produto 789", preco=Decimal("1.00"))
+
+        self.assertEqual(self._ids("/api/produtos/", "789"), [self.arroz.id, outro.id])
+
+    def test_indice_acompanha_alteracoes(self):
+        self.cafe.nome = "Café Solúvel"
+        self.cafe.save()
+        self.acucar.delete()
+
+        self.assertEqual(self._ids("/api/produtos/", "acucar"), [])
+        self.assertEqual(self._ids("/api/produtos/", "soluvel"), [self.cafe.id])
+
+    def test_clientes_e_fornecedores(self):
+        joao = Cliente.objects.create(nome="João Conceição", cpf="123.456.789-00")
+        Cliente.objects.create(nome="Maria")
+        fornecedor = Fornecedor.objects.create(
+            nome="Distribuidora Ltda", nome_fantasia="Pão de Açúcar", cnpj="12.345.678/0001-90"
+        )
+
+        self.assertEqual(self._ids("/api/clientes/", "joao conceicao"), [joao.id])
+        self.assertEqual(self._ids("/api/clientes/", "123.456"), [joao.id])
+        self.assertEqual(self._ids("/api/fornecedores/", "pao de acucar"), [fornecedor.id])
+        self.assertEqual(self._ids("/api/fornecedores/", "12.345"), [fornecedor.id])
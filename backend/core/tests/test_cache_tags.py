@@ -0,0 +1,249 @@
+"""
+Testes para a invalidação de cache por tags versionadas
+"""
+
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import Cliente, Produto
+from core.services.cache_service import CacheService
+from core.services.estoque_service import EstoqueService
+from core.services.saldo_service import SaldoClienteService
+from fiscal.models import Empresa
+
+
+class CacheTagsTestCase(APITestCase):
+    """Chaves montadas com as versões das tags e invalidadas por escrita"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.empresa_a = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        self.empresa_b = Empresa.objects.create(
+            razao_social="Empresa B Ltda", nome_fantasia="B", cnpj="22222222000122"
+        )
+
+    def test_baixa_de_estoque_invalida_produtos_baixo_estoque(self):
+        produto = Produto.objects.create(
+            nome="Feijão", preco=Decimal("8.00"), estoque=Decimal("12")
+        )
+
+        response = self.client.get("/api/produtos/baixo_estoque/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [])
+
+        # UPDATE com F() não dispara signals: o serviço incrementa a tag
+        EstoqueService.baixar({produto.id: Decimal("5")})
+
+        response = self.client.get("/api/produtos/baixo_estoque/")
+        self.assertEqual([item["id"] for item in response.data], [produto.id])
+
+    def test_saldo_do_cliente_invalida_clientes_com_dividas(self):
+        cliente = Cliente.objects.create(nome="Maria")
+
+        response = self.client.get("/api/clientes/com_dividas/")
+        self.assertEqual(response.data, [])
+
+        SaldoClienteService.aplicar({cliente.id: Decimal("30.00")})
+
+        response = self.client.get("/api/clientes/com_dividas/")
+        self.assertEqual([item["id"] for item in response.data], [cliente.id])
+
+    def test_escrita_da_empresa_nao_invalida_outras_empresas(self):
+        chave_a = CacheService.chave("leitura", ["estoque"], self.empresa_a.id)
+        chave_b = CacheService.chave("leitura", ["estoque"], self.empresa_b.id)
+        chave_todas = CacheService.chave("leitura", ["estoque"])
+
+        Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.00"), empresa=self.empresa_a
+        )
+
+        self.assertNotEqual(CacheService.chave("leitura", ["estoque"], self.empresa_a.id), chave_a)
+        self.assertNotEqual(CacheService.chave("leitura", ["estoque"]), chave_todas)
+        self.assertEqual(CacheService.chave("leitura", ["estoque"], self.empresa_b.id), chave_b)
+
+    def test_escrita_sem_empresa_invalida_todos_os_escopos(self):
+        chave_a = CacheService.chave("leitura", ["vendas"], self.empresa_a.id)
+        chave_b = CacheService.chave("leitura", ["vendas"], self.empresa_b.id)
+        chave_clientes = CacheService.chave("leitura", ["clientes"], self.empresa_a.id)
+
+        CacheService.invalidar("vendas")
+
+        self.assertNotEqual(CacheService.chave("leitura", ["vendas"], self.empresa_a.id), chave_a)
+        self.assertNotEqual(CacheService.chave("leitura", ["vendas"], self.empresa_b.id), chave_b)
+        self.assertEqual(
+            CacheService.chave("leitura", ["clientes"], self.empresa_a.id), chave_clientes
+        )
+
+    def test_invalidacao_se_repete_apos_o_commit(self):
+        CacheService.chave("leitura", ["estoque"])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            CacheService.invalidar("estoque")
+            chave_na_transacao = CacheService.chave("leitura", ["estoque"])
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(CacheService.chave("leitura", ["estoque"]), chave_na_transacao)
+
+    def test_obter_reaproveita_ate_a_proxima_escrita(self):
+        chamadas = []
+
+        def calcular():
+            chamadas.append(1)
+            return len(chamadas)
+
+        self.assertEqual(CacheService.obter("leitura", ["estoque"], calcular, 60), 1)
+        self.assertEqual(CacheService.obter("leitura", ["estoque"], calcular, 60), 1)
+
+        CacheService.invalidar("estoque")
+
+        self.assertEqual(CacheService.obter("leitura", ["estoque"], calcular, 60), 2)
+
+
+class CacheRecalculoTestCase(APITestCase):
+    """Validade suave/dura com um único recálculo por vez"""
+
+    def setUp(self):
+        cache.clear()
+        self.chamadas = []
+
+    def _calcular(self):
+        self.chamadas.append(1)
+        return len(self.chamadas)
+
+    def _obter(self):
+        return CacheService.obter("leitura", ["estoque"], self._calcular, 60, ttl_maximo=600)
+
+    def _vencer_validade_suave(self):
+        cache_key = CacheService.chave("leitura", ["estoque"])
+        entrada = cache.get(cache_key)
+        entrada["expira"] = time.time() - 1
+        cache.set(cache_key, entrada, 600)
+        return cache_key
+
+    def test_validade_suave_vencida_recalcula_com_trava(self):
+        self.assertEqual(self._obter(), 1)
+        cache_key = self._vencer_validade_suave()
+
+        self.assertEqual(self._obter(), 2)
+        self.assertIsNone(cache.get(f"{cache_key}:trava"))
+
+    def test_recalculo_em_andamento_serve_o_valor_anterior(self):
+        self.assertEqual(self._obter(), 1)
+        cache_key = self._vencer_validade_suave()
+        cache.add(f"{cache_key}:trava", 1, 30)
+
+        self.assertEqual(self._obter(), 1)
+        self.assertEqual(len(self.chamadas), 1)
+
+    def test_sem_valor_anterior_aguarda_e_calcula_se_a_trava_nao_liberar(self):
+        cache_key = CacheService.chave("leitura", ["estoque"])
+        cache.add(f"{cache_key}:trava", 1, 30)
+
+        with mock.patch.object(CacheService, "ESPERA_MAXIMA", 0.1):
+            self.assertEqual(self._obter(), 1)
+
+    def test_expiracao_antecipada_probabilistica(self):
+        self.assertEqual(self._obter(), 1)
+        cache_key = CacheService.chave("leitura", ["estoque"])
+        entrada = cache.get(cache_key)
+        entrada["delta"] = 5.0
+        entrada["expira"] = time.time() + 10
+        cache.set(cache_key, entrada, 600)
+
+        # Sorteio baixo: longe da validade, não antecipa
+        with mock.patch("core.services.cache_service.random.random", return_value=0.0):
+            self.assertEqual(self._obter(), 1)
+        # Sorteio alto: -ln(1 - 0.99) * 5s ≈ 23s > 10s restantes, antecipa
+        with mock.patch("core.services.cache_service.random.random", return_value=0.99):
+            self.assertEqual(self._obter(), 2)
+
+
+class CachePorEmpresaTestCase(APITestCase):
+    """Leituras em cache particionadas pela empresa da requisição"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.empresa_a = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        self.empresa_b = Empresa.objects.create(
+            razao_social="Empresa B Ltda", nome_fantasia="B", cnpj="22222222000122"
+        )
+        self.produto_a = Produto.objects.create(
+            nome="Feijão", preco=Decimal("8.00"), estoque=Decimal("5"), empresa=self.empresa_a
+        )
+        self.produto_b = Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.00"), estoque=Decimal("3"), empresa=self.empresa_b
+        )
+
+    def _baixo_estoque(self, empresa):
+        return self.client.get(
+            "/api/produtos/baixo_estoque/", HTTP_X_EMPRESA_ID=str(empresa.id)
+        )
+
+    def test_cada_empresa_ve_apenas_seus_dados(self):
+        self.assertEqual(
+            [item["id"] for item in self._baixo_estoque(self.empresa_a).data],
+            [self.produto_a.id],
+        )
+        self.assertEqual(
+            [item["id"] for item in self._baixo_estoque(self.empresa_b).data],
+            [self.produto_b.id],
+        )
+
+        response = self.client.get(
+            "/api/produtos/baixo_estoque/", {"empresa_id": self.empresa_b.id}
+        )
+        self.assertEqual([item["id"] for item in response.data], [self.produto_b.id])
+
+        # Sem empresa: visão de todas
+        response = self.client.get("/api/produtos/baixo_estoque/")
+        self.assertEqual(len(response.data), 2)
+
+    def test_escrita_da_empresa_so_invalida_a_propria_empresa(self):
+        self._baixo_estoque(self.empresa_a)
+        self._baixo_estoque(self.empresa_b)
+
+        EstoqueService.baixar({self.produto_a.id: Decimal("1")}, empresa_id=self.empresa_a.id)
+
+        with self.assertNumQueries(0):
+            self._baixo_estoque(self.empresa_b)
+
+        response = self._baixo_estoque(self.empresa_a)
+        self.assertEqual(response.data[0]["estoque"], "4.00")
+
+    def test_empresa_invalida_retorna_400(self):
+        response = self.client.get("/api/vendas/dashboard/", HTTP_X_EMPRESA_ID="abc")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comando_aquece_as_leituras_da_empresa(self):
+        out = StringIO()
+        call_command("aquecer_cache", "--empresa", str(self.empresa_a.id), stdout=out)
+
+        self.assertIn("5 leitura(s)", out.getvalue())
+        with self.assertNumQueries(0):
+            self._baixo_estoque(self.empresa_a)
+            self.client.get(
+                "/api/vendas/dashboard/", HTTP_X_EMPRESA_ID=str(self.empresa_a.id)
+            )
+            self.client.get(
+                "/api/clientes/com_dividas/", HTTP_X_EMPRESA_ID=str(self.empresa_a.id)
+            )
@@ -3,11 +3,14 @@ Testes para fechamento de caixa detalhado por forma de pagamento
 """
 
 from decimal import Decimal
+from importlib import import_module
+from django.apps import apps
 from django.contrib.auth.models import User
 from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
-from core.models import Caixa, Venda, Produto, Cliente
+from core.models import Caixa, MovimentacaoCaixa, Venda, Produto, Cliente
+from fiscal.models import Empresa
 
 
 class CaixaDetalhadoTestCase(APITestCase):
@@ -273,3 +276,152 @@ class CaixaDetalhadoTestCase(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertIn("error", response.data)
+
+
+class CaixaContadoresTestCase(APITestCase):
+    """Testes dos contadores mantidos no caixa aberto"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.login(username="testuser", password="testpass123")
+        self.produto = Produto.objects.create(
+            nome="Produto 1", preco=Decimal("10.00"), estoque=Decimal("100")
+        )
+        self.caixa = Caixa.objects.create(valor_inicial=Decimal("100.00"))
+
+    def test_venda_e_cancelamento_atualizam_contadores(self):
+        response = self.client.post(
+            "/api/vendas/",
+            {
+                "itens": [{"produto_id": self.produto.id, "quantidade": "3"}],
+                "forma_pagamento": "PIX",
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.caixa.refresh_from_db()
+        self.assertEqual(self.caixa.total_pix, Decimal("30.00"))
+        self.assertEqual(self.caixa.total_vendas, Decimal("30.00"))
+
+        response = self.client.post(f"/api/vendas/{response.data['id']}/cancelar/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.caixa.refresh_from_db()
+        self.assertEqual(self.caixa.total_pix, Decimal("0.00"))
+        self.assertEqual(self.caixa.total_vendas, Decimal("0.00"))
+
+    def test_preview_le_apenas_o_caixa(self):
+        Venda.objects.create(
+            forma_pagamento="DINHEIRO", status="FINALIZADA", total=Decimal("50.00")
+        )
+        response = self.client.post(
+            f"/api/caixa/{self.caixa.id}/movimentar/",
+            {"tipo": "SANGRIA", "valor": "20.00", "descricao": "Sangria"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # Sessão + usuário da autenticação + o caixa pela chave primária
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/caixa/{self.caixa.id}/preview/")
+
+        self.assertEqual(Decimal(response.data["total_sangrias"]), Decimal("20.00"))
+        self.assertEqual(
+            Decimal(response.data["valor_esperado_caixa"]), Decimal("130.00")
+        )
+
+    def test_fechamento_corrige_contadores_divergentes(self):
+        Venda.objects.create(
+            forma_pagamento="DINHEIRO", status="FINALIZADA", total=Decimal("50.00")
+        )
+        # Simula um contador desatualizado (ex.: venda alterada por UPDATE direto)
+        Caixa.objects.filter(pk=self.caixa.pk).update(total_dinheiro=Decimal("10.00"))
+
+        response = self.client.post(
+            f"/api/caixa/{self.caixa.id}/fechar/",
+            {"valor_final_informado": "150.00"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.caixa.refresh_from_db()
+        self.assertEqual(self.caixa.total_dinheiro, Decimal("50.00"))
+        self.assertEqual(self.caixa.valor_final_sistema, Decimal("150.00"))
+        self.assertEqual(self.caixa.diferenca, Decimal("0.00"))
+
+    def test_contadores_e_conferencia_por_empresa(self):
+        empresa_a = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        empresa_b = Empresa.objects.create(
+            razao_social="Empresa B Ltda", nome_fantasia="B", cnpj="22222222000122"
+        )
+        caixa_a = Caixa.objects.create(valor_inicial=Decimal("0.00"), empresa=empresa_a)
+        caixa_b = Caixa.objects.create(valor_inicial=Decimal("0.00"), empresa=empresa_b)
+
+        Venda.objects.create(
+            forma_pagamento="DINHEIRO",
+            status="FINALIZADA",
+            total=Decimal("10.00"),
+            empresa=empresa_a,
+        )
+
+        caixa_a.refresh_from_db()
+        caixa_b.refresh_from_db()
+        self.caixa.refresh_from_db()
+        self.assertEqual(caixa_a.total_dinheiro, Decimal("10.00"))
+        self.assertEqual(caixa_b.total_dinheiro, Decimal("0.00"))
+        self.assertEqual(caixa_b.total_vendas, Decimal("0.00"))
+        self.assertEqual(self.caixa.total_vendas, Decimal("0.00"))
+
+        # A conferência do fechamento soma só as vendas da empresa do caixa
+        response = self.client.post(
+            f"/api/caixa/{caixa_b.id}/fechar/",
+            {"valor_final_informado": "0.00"},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        caixa_b.refresh_from_db()
+        self.assertEqual(caixa_b.total_dinheiro, Decimal("0.00"))
+        self.assertEqual(caixa_b.diferenca, Decimal("0.00"))
+
+    def test_edicao_de_movimentacao_aplica_a_diferenca(self):
+        movimentacao = MovimentacaoCaixa.objects.create(
+            caixa=self.caixa, tipo="SANGRIA", valor=Decimal("20.00"), descricao="Sangria"
+        )
+
+        movimentacao.valor = Decimal("35.00")
+        movimentacao.save()
+        self.caixa.refresh_from_db()
+        self.assertEqual(self.caixa.total_sangrias, Decimal("35.00"))
+
+        movimentacao.tipo = "SUPRIMENTO"
+        movimentacao.save()
+        self.caixa.refresh_from_db()
+        self.assertEqual(self.caixa.total_sangrias, Decimal("0.00"))
+        self.assertEqual(self.caixa.total_suprimentos, Decimal("35.00"))
+
+    def test_migracao_preenche_contadores_com_vendas_da_empresa_do_caixa(self):
+        migracao = import_module("core.migrations.0027_caixa_contadores")
+        empresa = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        caixa_empresa = Caixa.objects.create(valor_inicial=Decimal("0.00"), empresa=empresa)
+        Venda.objects.create(
+            forma_pagamento="DINHEIRO", status="FINALIZADA", total=Decimal("10.00"), empresa=empresa
+        )
+        Venda.objects.create(
+            forma_pagamento="DINHEIRO", status="FINALIZADA", total=Decimal("4.00")
+        )
+        Caixa.objects.update(total_dinheiro=Decimal("0"), total_vendas=Decimal("0"))
+
+        migracao.preencher_contadores(apps, None)
+
+        caixa_empresa.refresh_from_db()
+        self.caixa.refresh_from_db()
+        self.assertEqual(caixa_empresa.total_dinheiro, Decimal("10.00"))
+        self.assertEqual(self.caixa.total_dinheiro, Decimal("4.00"))
@@ -0,0 +1,75 @@
+"""
+Testes para a busca exata por código de barras (/produtos/por-codigo/<ean>/)
+"""
+
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import Produto
+from core.services.codigo_barras_service import IndiceCodigoBarrasService
+
+
+class ProdutoPorCodigoTestCase(APITestCase):
+    """Índice código de barras → produto mantido em cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.produto = Produto.objects.create(
+            nome="Água", preco=Decimal("2.50"), estoque=Decimal("30"),
+            codigo_barras="7891234567890",
+        )
+
+    def test_leitura_pelo_indice_usa_apenas_a_chave_primaria(self):
+        self.assertEqual(
+            cache.get(IndiceCodigoBarrasService.cache_key(None, "7891234567890")),
+            self.produto.id,
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/produtos/por-codigo/7891234567890/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], self.produto.id)
+        self.assertEqual(response.data["estoque"], "30.00")
+
+    def test_fallback_no_banco_e_comando_de_aquecimento(self):
+        cache.clear()
+        response = self.client.get("/api/produtos/por-codigo/7891234567890/")
+        self.assertEqual(response.data["id"], self.produto.id)
+        self.assertIsNotNone(
+            cache.get(IndiceCodigoBarrasService.cache_key(None, "7891234567890"))
+        )
+
+        cache.clear()
+        call_command("aquecer_codigos_barras", stdout=StringIO())
+        with self.assertNumQueries(1):
+            self.client.get("/api/produtos/por-codigo/7891234567890/")
+
+    def test_signals_e_entradas_obsoletas(self):
+        self.produto.codigo_barras = "7890000000001"
+        self.produto.save()
+        self.assertEqual(
+            self.client.get("/api/produtos/por-codigo/7890000000001/").data["id"],
+            self.produto.id,
+        )
+        # Código antigo não resolve mais (entrada obsoleta descartada)
+        response = self.client.get("/api/produtos/por-codigo/7891234567890/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Update em massa não dispara signal: a conferência na leitura cobre
+        Produto.objects.filter(pk=self.produto.pk).update(ativo=False)
+        response = self.client.get("/api/produtos/por-codigo/7890000000001/")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.produto.delete()
+        self.assertIsNone(
+            cache.get(IndiceCodigoBarrasService.cache_key(None, "7890000000001"))
+        )
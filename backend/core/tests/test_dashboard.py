@@ -3,7 +3,9 @@ Testes para métodos do Dashboard - VendaViewSet
 """
 
 from decimal import Decimal
+from io import StringIO
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.utils import timezone
 from django.core.cache import cache
 from rest_framework.test import APITestCase
@@ -15,6 +17,8 @@ from core.models import (
     Caixa,
     MovimentacaoCaixa,
     Categoria,
+    ItemVenda,
+    VendaResumoDiario,
 )
 
 
@@ -172,6 +176,20 @@ class DashboardMethodsTestCase(APITestCase):
         # Valor atual = 100 (inicial) + 30 (venda) + 50 (suprimento) - 20 (sangria) = 160
         self.assertEqual(response.data["caixa"]["valor_atual"], 160.0)
 
+    def test_caixa_info_le_os_contadores_do_caixa(self):
+        """
+        Testa que o caixa do dashboard vem dos contadores, sem agregar vendas
+        """
+        caixa = Caixa.objects.create(valor_inicial=Decimal("100.00"))
+        Caixa.objects.filter(pk=caixa.pk).update(
+            total_dinheiro=Decimal("40.00"), total_sangrias=Decimal("15.00")
+        )
+
+        response = self.client.get("/api/vendas/dashboard/")
+
+        self.assertEqual(response.data["caixa"]["vendas_dinheiro"], 40.0)
+        self.assertEqual(response.data["caixa"]["valor_atual"], 125.0)
+
     def test_dashboard_usa_cache(self):
         """
         Testa que dashboard usa cache corretamente
@@ -196,3 +214,164 @@ class DashboardMethodsTestCase(APITestCase):
         self.assertIn("contas_receber", response.data)
         self.assertIn("vencendo_hoje", response.data["contas_receber"])
         self.assertIn("quantidade", response.data["contas_receber"]["vencendo_hoje"])
+
+
+class VendaResumoDiarioTestCase(APITestCase):
+    """Resumo diário incremental que alimenta o dashboard"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.produto = Produto.objects.create(
+            nome="Cerveja",
+            preco=Decimal("10.00"),
+            preco_custo=Decimal("6.00"),
+            estoque=Decimal("100"),
+        )
+
+    def _vender(self, quantidade, forma_pagamento="PIX", desconto="0"):
+        response = self.client.post(
+            "/api/vendas/",
+            {
+                "forma_pagamento": forma_pagamento,
+                "desconto": desconto,
+                "itens": [{"produto_id": self.produto.id, "quantidade": quantidade}],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response.data["id"]
+
+    def test_resumo_atualizado_na_venda_e_no_cancelamento(self):
+        self._vender(3, desconto="2.00")
+        venda_id = self._vender(2)
+        self._vender(1, forma_pagamento="DINHEIRO")
+
+        resumo = VendaResumoDiario.objects.get(
+            data=timezone.localdate(), forma_pagamento="PIX"
+        )
+        self.assertEqual(resumo.quantidade, 2)
+        self.assertEqual(resumo.total_bruto, Decimal("50.00"))
+        self.assertEqual(resumo.desconto, Decimal("2.00"))
+        self.assertEqual(resumo.lucro, Decimal("20.00"))
+
+        self.client.post(f"/api/vendas/{venda_id}/cancelar/")
+
+        resumo.refresh_from_db()
+        self.assertEqual(resumo.quantidade, 1)
+        self.assertEqual(resumo.total_bruto, Decimal("30.00"))
+        self.assertEqual(resumo.custo, Decimal("18.00"))
+
+        response = self.client.get("/api/vendas/dashboard/")
+        self.assertEqual(response.data["vendas_hoje"], {"total": 38.0, "quantidade": 2})
+        self.assertEqual(response.data["lucro_hoje"], 16.0)
+        self.assertEqual(
+            [p["forma_pagamento"] for p in response.data["vendas_por_pagamento"]],
+            ["DINHEIRO", "PIX"],
+        )
+
+    def test_estorno_usa_o_custo_da_venda(self):
+        venda_id = self._vender(2)
+        self._vender(1)
+
+        # Custo do produto muda depois da venda
+        self.produto.preco_custo = Decimal("9.00")
+        self.produto.save()
+        self.client.post(f"/api/vendas/{venda_id}/cancelar/")
+
+        resumo = VendaResumoDiario.objects.get()
+        self.assertEqual(resumo.custo, Decimal("6.00"))
+        self.assertEqual(resumo.lucro, Decimal("4.00"))
+
+        call_command("recalcular_resumo_diario", stdout=StringIO())
+        self.assertEqual(VendaResumoDiario.objects.get().lucro, Decimal("4.00"))
+
+    def test_comando_reconstroi_resumo(self):
+        self._vender(4)
+        VendaResumoDiario.objects.all().delete()
+
+        call_command("recalcular_resumo_diario", stdout=StringIO())
+
+        resumo = VendaResumoDiario.objects.get()
+        self.assertEqual(resumo.quantidade, 1)
+        self.assertEqual(resumo.total_bruto, Decimal("40.00"))
+        self.assertEqual(resumo.lucro, Decimal("16.00"))
+
+    def test_venda_deletada_sai_do_dashboard(self):
+        self._vender(3)
+        venda_id = self._vender(2)
+        self.client.get("/api/vendas/dashboard/")
+
+        response = self.client.delete(f"/api/vendas/{venda_id}/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        response = self.client.get("/api/vendas/dashboard/")
+        self.assertEqual(response.data["vendas_hoje"], {"total": 30.0, "quantidade": 1})
+        self.assertEqual(response.data["lucro_hoje"], 12.0)
+
+
+class GiroEstoqueTestCase(APITestCase):
+    """Giro de estoque calculado no servidor (/produtos/giro/)"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.categoria = Categoria.objects.create(nome="Bebidas")
+        self.cerveja = Produto.objects.create(
+            nome="Cerveja",
+            preco=Decimal("10.00"),
+            preco_custo=Decimal("6.00"),
+            estoque=Decimal("100"),
+            categoria=self.categoria,
+        )
+        self.parado = Produto.objects.create(
+            nome="Vinho", preco=Decimal("50.00"), estoque=Decimal("4")
+        )
+
+    def test_giro_conta_todas_as_vendas_da_janela(self):
+        # Mais vendas do que uma página da listagem de vendas
+        for i in range(60):
+            venda = Venda.objects.create(
+                numero=f"GIRO-{i}",
+                forma_pagamento="PIX",
+                status="FINALIZADA",
+                total=Decimal("10.00"),
+            )
+            ItemVenda.objects.create(
+                venda=venda,
+                produto=self.cerveja,
+                quantidade=Decimal("1"),
+                preco_unitario=Decimal("10.00"),
+            )
+
+        response = self.client.get("/api/produtos/giro/", {"dias": 30})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        cerveja, vinho = response.data["produtos"]
+        self.assertEqual(cerveja["vendido"], 60.0)
+        self.assertEqual(cerveja["velocidade"], 2.0)
+        self.assertEqual(cerveja["dias_cobertura"], 50.0)
+        self.assertEqual(cerveja["valor_estoque"], 600.0)
+        self.assertEqual(cerveja["classificacao"], "GIRO RÁPIDO")
+        self.assertEqual(vinho["classificacao"], "NUNCA VENDIDO")
+        self.assertIsNone(vinho["dias_cobertura"])
+
+        categorias = {c["categoria"]: c for c in response.data["categorias"]}
+        self.assertEqual(categorias["Bebidas"]["vendido"], 60.0)
+        self.assertEqual(categorias["Sem categoria"]["valor_estoque"], 200.0)
+
+    def test_giro_usa_cache_por_janela(self):
+        self.client.get("/api/produtos/giro/", {"dias": 7})
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/produtos/giro/", {"dias": 7})
+        self.assertEqual(response.data["dias"], 7)
+
+        response = self.client.get("/api/produtos/giro/", {"dias": 0})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,175 @@
+"""
+Testes para a resolução da empresa da requisição (request.empresa)
+"""
+
+from decimal import Decimal
+from importlib import import_module
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+from core.models import Caixa, InventarioSessao, Produto, Venda
+from core.services.empresa_service import EmpresaService
+from fiscal.models import Empresa, NotaFiscal
+
+
+class EmpresaCacheTestCase(TransactionTestCase):
+    """Linhas de Empresa em cache no processo, descartadas a cada save"""
+
+    def setUp(self):
+        EmpresaService.limpar_cache()
+        self.addCleanup(EmpresaService.limpar_cache)
+        self.empresa = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+
+    def test_empresa_lida_uma_vez_por_processo(self):
+        with self.assertNumQueries(2):
+            self.assertEqual(EmpresaService.padrao(), self.empresa)
+            self.assertEqual(EmpresaService.obter(self.empresa.id), self.empresa)
+
+        with self.assertNumQueries(0):
+            EmpresaService.padrao()
+            EmpresaService.obter(str(self.empresa.id))
+
+    def test_save_descarta_o_cache(self):
+        EmpresaService.obter(self.empresa.id)
+
+        self.empresa.nome_fantasia = "A Nova"
+        self.empresa.save()
+
+        self.assertEqual(EmpresaService.obter(self.empresa.id).nome_fantasia, "A Nova")
+
+    def test_leitura_dentro_de_transacao_nao_vai_para_o_cache(self):
+        with transaction.atomic():
+            EmpresaService.padrao()
+
+        with self.assertNumQueries(1):
+            EmpresaService.padrao()
+
+    def test_empresa_inexistente(self):
+        with self.assertRaises(ValidationError):
+            EmpresaService.obter("00000000-0000-0000-0000-000000000000")
+
+
+class EmpresaRequisicaoTestCase(APITestCase):
+    """request.empresa: cabeçalho, parâmetro ou empresa padrão"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client.force_authenticate(user=self.user)
+        self.empresa_a = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        self.empresa_b = Empresa.objects.create(
+            razao_social="Empresa B Ltda", nome_fantasia="B", cnpj="22222222000122"
+        )
+        self.nota_a = self._nota(self.empresa_a, "1")
+        self.nota_b = self._nota(self.empresa_b, "2")
+
+    def _nota(self, empresa, numero):
+        return NotaFiscal.objects.create(
+            empresa=empresa, numero=numero, serie="1", chave_acesso=numero.zfill(44)
+        )
+
+    def test_notas_da_empresa_do_cabecalho_ou_da_padrao(self):
+        response = self.client.get("/api/fiscal/notas/", HTTP_X_EMPRESA_ID=str(self.empresa_b.id))
+        self.assertEqual([nota["id"] for nota in response.data["results"]], [str(self.nota_b.id)])
+
+        response = self.client.get("/api/fiscal/notas/", {"empresa_id": self.empresa_a.id})
+        self.assertEqual([nota["id"] for nota in response.data["results"]], [str(self.nota_a.id)])
+
+        # Sem empresa informada: a primeira cadastrada
+        response = self.client.get("/api/fiscal/notas/")
+        self.assertEqual([nota["id"] for nota in response.data["results"]], [str(self.nota_a.id)])
+
+    def test_empresa_inexistente_retorna_400(self):
+        response = self.client.get(
+            "/api/fiscal/notas/", HTTP_X_EMPRESA_ID="00000000-0000-0000-0000-000000000000"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_inventario_criado_na_empresa_do_cabecalho(self):
+        response = self.client.post(
+            "/api/estoque/inventarios/",
+            {"titulo": "Contagem"},
+            format="json",
+            HTTP_X_EMPRESA_ID=str(self.empresa_b.id),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(InventarioSessao.objects.get().empresa, self.empresa_b)
+
+    def test_caixa_e_venda_gravados_na_empresa_da_requisicao(self):
+        produto = Produto.objects.create(
+            nome="Refrigerante", preco=Decimal("10.00"), estoque=Decimal("10"), empresa=self.empresa_b
+        )
+        cabecalho = {"HTTP_X_EMPRESA_ID": str(self.empresa_b.id)}
+
+        response = self.client.post(
+            "/api/caixa/abrir/", {"valor_inicial": "0.00"}, format="json", **cabecalho
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        caixa = Caixa.objects.get()
+        self.assertEqual(caixa.empresa, self.empresa_b)
+
+        # Outra empresa abre o próprio caixa
+        response = self.client.post("/api/caixa/abrir/", {"valor_inicial": "0.00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(
+            "/api/vendas/",
+            {
+                "itens": [{"produto_id": produto.id, "quantidade": "1"}],
+                "forma_pagamento": "DINHEIRO",
+            },
+            format="json",
+            **cabecalho,
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Venda.objects.get().empresa, self.empresa_b)
+        caixa.refresh_from_db()
+        self.assertEqual(caixa.total_dinheiro, Decimal("10.00"))
+        self.assertEqual(
+            Caixa.objects.get(empresa=self.empresa_a).total_dinheiro, Decimal("0.00")
+        )
+
+    def test_caixa_aberto_legado_recebe_a_empresa_padrao(self):
+        migracao = import_module("core.migrations.0032_empresa_padrao_caixas_vendas")
+        produto = Produto.objects.create(
+            nome="Refrigerante", preco=Decimal("10.00"), estoque=Decimal("10")
+        )
+        caixa = Caixa.objects.create(valor_inicial=Decimal("0.00"))
+        Venda.objects.create(
+            forma_pagamento="DINHEIRO", status="FINALIZADA", total=Decimal("5.00")
+        )
+        caixa.refresh_from_db()
+        self.assertIsNone(caixa.empresa_id)
+        self.assertEqual(caixa.total_dinheiro, Decimal("5.00"))
+
+        migracao.atribuir_empresa_padrao(apps, None)
+
+        response = self.client.get("/api/caixa/status/")
+        self.assertEqual(response.data["id"], caixa.id)
+        response = self.client.post("/api/caixa/abrir/", {"valor_inicial": "0.00"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(
+            "/api/vendas/",
+            {"itens": [{"produto_id": produto.id, "quantidade": "1"}], "forma_pagamento": "DINHEIRO"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        caixa.refresh_from_db()
+        self.assertEqual(caixa.total_dinheiro, Decimal("15.00"))
+
+        response = self.client.post(
+            f"/api/caixa/{caixa.id}/fechar/", {"valor_final_informado": "15.00"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        caixa.refresh_from_db()
+        self.assertEqual(caixa.diferenca, Decimal("0.00"))
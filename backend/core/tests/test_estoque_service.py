@@ -0,0 +1,64 @@
+"""
+Testes para EstoqueService - UPDATE condicional com F() e relatório de falhas
+"""
+
+from decimal import Decimal
+from django.test import TestCase
+from core.models import Produto
+from core.services.estoque_service import EstoqueInsuficienteError, EstoqueService
+
+
+class EstoqueServiceTestCase(TestCase):
+    """Testes das mutações atômicas de estoque"""
+
+    def setUp(self):
+        self.arroz = Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.00"), estoque=Decimal("10.00")
+        )
+        self.feijao = Produto.objects.create(
+            nome="Feijão", preco=Decimal("8.00"), estoque=Decimal("3.00")
+        )
+
+    def test_baixar_varios_produtos_em_um_update(self):
+        with self.assertNumQueries(3):  # SAVEPOINT + UPDATE + RELEASE
+            atualizados = EstoqueService.baixar(
+                [(self.arroz.id, "4"), (self.feijao.id, "3"), (self.arroz.id, "1")]
+            )
+
+        self.assertEqual(atualizados, 2)
+        self.arroz.refresh_from_db()
+        self.feijao.refresh_from_db()
+        self.assertEqual(self.arroz.estoque, Decimal("5.00"))
+        self.assertEqual(self.feijao.estoque, Decimal("0.00"))
+
+    def test_baixar_informa_falhas_e_nao_altera_nada(self):
+        with self.assertRaises(EstoqueInsuficienteError) as ctx:
+            EstoqueService.baixar({self.arroz.id: 2, self.feijao.id: 5})
+
+        self.assertEqual(ctx.exception.falhas, {self.feijao.id: Decimal("3.00")})
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.estoque, Decimal("10.00"))
+
+    def test_instancias_desatualizadas_nao_perdem_baixas(self):
+        """Dois PDVs com a mesma leitura do produto não sobrescrevem um ao outro"""
+        terminal_1 = Produto.objects.get(pk=self.arroz.pk)
+        terminal_2 = Produto.objects.get(pk=self.arroz.pk)
+
+        EstoqueService.baixar({terminal_1.id: 6})
+        with self.assertRaises(EstoqueInsuficienteError):
+            EstoqueService.baixar({terminal_2.id: 6})
+        EstoqueService.baixar({terminal_2.id: 4})
+
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.estoque, Decimal("0.00"))
+
+    def test_ajustar_limitado_em_zero(self):
+        EstoqueService.ajustar(
+            {self.arroz.id: Decimal("2.5"), self.feijao.id: Decimal("-7")},
+            limitar_em_zero=True,
+        )
+
+        self.arroz.refresh_from_db()
+        self.feijao.refresh_from_db()
+        self.assertEqual(self.arroz.estoque, Decimal("12.50"))
+        self.assertEqual(self.feijao.estoque, Decimal("0.00"))
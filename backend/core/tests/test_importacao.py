@@ -0,0 +1,140 @@
+"""
+Testes para a importação de produtos via CSV (/produtos/importar/)
+"""
+
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import Categoria, Fornecedor, Lote, Produto
+from fiscal.models import Empresa
+
+CSV = (
+    "nome;codigo_barras;preco;preco_custo;estoque;categoria;fornecedor\n"
+    "Arroz 5kg;7891000100103;25,90;18,00;10;Mercearia;Camil\n"
+    "Feijão 1kg;7891000200200;9,50;;20;mercearia;\n"
+    "Café 500g;7891000300300;abc;;;Bebidas;\n"
+    "Sal;;3,00;;5;;\n"
+)
+
+
+class ImportacaoProdutosTestCase(APITestCase):
+    """Importação em lote com dry-run, matching por código de barras"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.mercearia = Categoria.objects.create(nome="Mercearia")
+        self.arroz = Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.00"), codigo_barras="7891000100103",
+            categoria=self.mercearia,
+        )
+
+    def _importar(self, conteudo, **params):
+        arquivo = SimpleUploadedFile("produtos.csv", conteudo.encode("utf-8"), "text/csv")
+        return self.client.post(
+            "/api/produtos/importar/", {"arquivo": arquivo, **params}, format="multipart"
+        )
+
+    def test_dry_run_relata_diferencas_sem_gravar(self):
+        response = self._importar(CSV, dry_run="true")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["linhas"], 4)
+        self.assertEqual(response.data["criados"], 2)
+        self.assertEqual(response.data["atualizados"], 1)
+        self.assertEqual(response.data["erros"], [{"linha": 4, "erro": "preco inválido: abc"}])
+        self.assertEqual(response.data["fornecedores_novos"], ["Camil"])
+        self.assertEqual(response.data["categorias_novas"], ["Bebidas"])
+        campos = response.data["alteracoes"][0]["campos"]
+        self.assertEqual(campos["nome"], {"de": "Arroz", "para": "Arroz 5kg"})
+        self.assertEqual(campos["preco"], {"de": "20.00", "para": "25.90"})
+        self.assertNotIn("categoria", campos)
+
+        self.assertEqual(Produto.objects.count(), 1)
+        self.assertFalse(Fornecedor.objects.exists())
+
+    def test_importacao_com_queries_por_lote(self):
+        linhas = "".join(
+            f"Produto {i};78900000{i:05d};{i},50;;{i};Categoria {i % 3};\n" for i in range(120)
+        )
+        conteudo = "nome;codigo_barras;preco;preco_custo;estoque;categoria;fornecedor\n" + linhas
+
+        # Mapas iniciais + criação de categorias + lote: não cresce com as linhas
+        with self.assertNumQueries(8):
+            response = self._importar(conteudo)
+
+        self.assertEqual(response.data["criados"], 120)
+        produto = Produto.objects.get(codigo_barras="7890000000042")
+        self.assertEqual(produto.preco, Decimal("42.50"))
+        self.assertEqual(produto.categoria.nome, "Categoria 0")
+        self.assertEqual(Categoria.objects.count(), 4)
+
+    def test_atualiza_existentes_e_respeita_lotes(self):
+        Lote.objects.create(produto=self.arroz, quantidade=Decimal("3"))
+        self.arroz.refresh_from_db()
+        estoque_lotes = self.arroz.estoque
+        response = self._importar(CSV)
+
+        self.assertEqual(len(response.data["avisos"]), 1)
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.arroz.nome, "Arroz 5kg")
+        self.assertEqual(self.arroz.preco, Decimal("25.90"))
+        self.assertEqual(self.arroz.fornecedor.nome, "Camil")
+        # Estoque de produto com lotes não é sobrescrito
+        self.assertEqual(self.arroz.estoque, estoque_lotes)
+        feijao = Produto.objects.get(codigo_barras="7891000200200")
+        self.assertEqual(feijao.categoria_id, self.mercearia.id)
+        self.assertTrue(Produto.objects.filter(nome="Sal", codigo_barras="").exists())
+
+    def test_importa_na_empresa_do_cabecalho(self):
+        empresa = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        arquivo = SimpleUploadedFile("produtos.csv", CSV.encode("utf-8"), "text/csv")
+
+        response = self.client.post(
+            "/api/produtos/importar/",
+            {"arquivo": arquivo},
+            format="multipart",
+            HTTP_X_EMPRESA_ID=str(empresa.id),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Produto.objects.filter(empresa=empresa).count(), 3)
+
+        arquivo = SimpleUploadedFile("produtos.csv", CSV.encode("utf-8"), "text/csv")
+        response = self.client.post(
+            "/api/produtos/importar/?empresa_id=nao-e-uuid", {"arquivo": arquivo}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_arquivo_invalido_e_comando(self):
+        response = self._importar("descricao_qualquer;valor\nx;1\n")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as arquivo:
+            arquivo.write(CSV)
+        try:
+            saida = StringIO()
+            call_command("importar_produtos", arquivo.name, "--dry-run", stdout=saida)
+            self.assertIn("[DRY-RUN] 4 linha(s): 2 criado(s)", saida.getvalue())
+            self.assertEqual(Produto.objects.count(), 1)
+
+            empresa = Empresa.objects.create(
+                razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+            )
+            call_command(
+                "importar_produtos", arquivo.name, "--empresa", str(empresa.id), stdout=StringIO()
+            )
+            # O Arroz já cadastrado não tem empresa: na empresa nova vira criação
+            self.assertEqual(Produto.objects.filter(empresa=empresa).count(), 3)
+        finally:
+            os.unlink(arquivo.name)
@@ -1,12 +1,22 @@
 from decimal import Decimal
 from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
+from django.contrib import admin
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.utils import timezone
 
+from core.admin import LoteAdmin
 from core.models import Produto, Lote
+from core.services.lote_service import LoteService
 
 
 class LoteAPITestCase(APITestCase):
@@ -169,3 +179,199 @@ class LoteAPITestCase(APITestCase):
         )
         self.assertEqual(resp_por_produto.status_code, status.HTTP_200_OK)
         self.assertEqual(resp_por_produto.data["total_lotes"], 2)
+
+
+class AlocacaoFefoEmLoteTestCase(TestCase):
+    """Motor FEFO em lote: trava, calcula em memória e persiste com bulk_update"""
+
+    def setUp(self):
+        hoje = timezone.localdate()
+        self.produto_a = Produto.objects.create(
+            nome="Iogurte", preco=Decimal("4.00"), estoque=Decimal("15.00")
+        )
+        self.produto_b = Produto.objects.create(
+            nome="Leite", preco=Decimal("6.00"), estoque=Decimal("8.00")
+        )
+        self.lote_a_tarde = Lote.objects.create(
+            produto=self.produto_a,
+            quantidade=Decimal("10.00"),
+            data_validade=hoje + timedelta(days=20),
+        )
+        self.lote_a_cedo = Lote.objects.create(
+            produto=self.produto_a,
+            quantidade=Decimal("5.00"),
+            data_validade=hoje + timedelta(days=2),
+        )
+        self.lote_b = Lote.objects.create(
+            produto=self.produto_b,
+            quantidade=Decimal("8.00"),
+            data_validade=hoje + timedelta(days=5),
+        )
+
+    def test_aloca_cesta_inteira_por_fefo(self):
+        alocacoes = LoteService.alocar_fefo(
+            [(self.produto_a, Decimal("7")), (self.produto_b, Decimal("3"))]
+        )
+
+        self.assertEqual(
+            [(a["lote_id"], a["quantidade"]) for a in alocacoes[0]],
+            [(self.lote_a_cedo.id, 5.0), (self.lote_a_tarde.id, 2.0)],
+        )
+        self.assertEqual(
+            [(a["lote_id"], a["quantidade"]) for a in alocacoes[1]],
+            [(self.lote_b.id, 3.0)],
+        )
+
+        self.lote_a_cedo.refresh_from_db()
+        self.lote_a_tarde.refresh_from_db()
+        self.produto_a.refresh_from_db()
+        self.produto_b.refresh_from_db()
+        self.assertEqual(self.lote_a_cedo.quantidade, Decimal("0.00"))
+        self.assertFalse(self.lote_a_cedo.ativo)
+        self.assertEqual(self.lote_a_tarde.quantidade, Decimal("8.00"))
+        self.assertEqual(self.produto_a.estoque, Decimal("8.00"))
+        self.assertEqual(self.produto_b.estoque, Decimal("5.00"))
+
+    def test_numero_de_queries_nao_depende_da_cesta(self):
+        # SELECT ... FOR UPDATE + bulk_update lotes + bulk_update produtos
+        # (mais SAVEPOINT/RELEASE do atomic dentro do TestCase)
+        with self.assertNumQueries(5):
+            LoteService.alocar_fefo([(self.produto_a, Decimal("1"))])
+
+        with self.assertNumQueries(5):
+            LoteService.alocar_fefo(
+                [
+                    (self.produto_a, Decimal("2")),
+                    (self.produto_b, Decimal("1")),
+                    (self.produto_a, Decimal("1")),
+                ]
+            )
+
+    def test_estoque_insuficiente_nao_altera_nada(self):
+        with self.assertRaises(ValueError):
+            LoteService.alocar_fefo(
+                [(self.produto_a, Decimal("10")), (self.produto_a, Decimal("6"))]
+            )
+
+        self.lote_a_cedo.refresh_from_db()
+        self.produto_a.refresh_from_db()
+        self.assertEqual(self.lote_a_cedo.quantidade, Decimal("5.00"))
+        self.assertEqual(self.produto_a.estoque, Decimal("15.00"))
+
+
+class ProdutoUsaLotesTestCase(TestCase):
+    """Flag desnormalizada Produto.usa_lotes mantida pelo ciclo de vida dos lotes"""
+
+    def setUp(self):
+        self.produto = Produto.objects.create(
+            nome="Queijo", preco=Decimal("12.00"), estoque=Decimal("0")
+        )
+
+    def _usa_lotes(self):
+        return Produto.objects.values_list("usa_lotes", flat=True).get(pk=self.produto.pk)
+
+    def test_flag_acompanha_criacao_consumo_e_exclusao(self):
+        self.assertFalse(self._usa_lotes())
+
+        Lote.objects.create(produto=self.produto, quantidade=Decimal("3.00"))
+        self.assertTrue(self._usa_lotes())
+
+        # Instância carregada antes do lote não apaga a flag ao salvar
+        self.produto.nome = "Queijo Minas"
+        self.produto.save()
+        self.assertTrue(self._usa_lotes())
+
+        LoteService.alocar_fefo([(self.produto, Decimal("3"))])
+        self.assertFalse(self._usa_lotes())
+
+        LoteService.devolver_estoque(self.produto, Decimal("1"))
+        self.assertTrue(self._usa_lotes())
+
+        Lote.objects.filter(produto=self.produto).delete()
+        self.assertFalse(self._usa_lotes())
+
+    def test_comando_recalcula_flag(self):
+        Lote.objects.create(produto=self.produto, quantidade=Decimal("2.00"))
+        Produto.objects.update(usa_lotes=False)
+
+        call_command("recalcular_usa_lotes", stdout=StringIO())
+
+        self.assertTrue(self._usa_lotes())
+
+    def test_acoes_do_admin_recalculam_flag(self):
+        Lote.objects.create(produto=self.produto, quantidade=Decimal("2.00"))
+        lote_admin = LoteAdmin(Lote, admin.site)
+        request = mock.Mock()
+
+        lote_admin.desativar_lotes(request, Lote.objects.all())
+        self.assertFalse(self._usa_lotes())
+
+        lote_admin.ativar_lotes(request, Lote.objects.all())
+        self.assertTrue(self._usa_lotes())
+
+
+class ProdutoListaLotesAnotadosTestCase(APITestCase):
+    """Listagem de produtos com lotes sem queries por produto"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def _criar_produtos(self, quantidade):
+        hoje = timezone.localdate()
+        for i in range(quantidade):
+            produto = Produto.objects.create(
+                nome=f"Produto {i}", preco=Decimal("10.00"), estoque=Decimal("0")
+            )
+            Lote.objects.create(
+                produto=produto,
+                quantidade=Decimal("4.00"),
+                data_validade=hoje + timedelta(days=3),
+            )
+            Lote.objects.create(
+                produto=produto,
+                quantidade=Decimal("2.00"),
+                data_validade=hoje - timedelta(days=1),
+            )
+            Lote.objects.create(produto=produto, quantidade=Decimal("1.00"), ativo=False)
+
+    def _contar_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries), response
+
+    def test_queries_nao_dependem_do_tamanho_da_pagina(self):
+        self._criar_produtos(3)
+        poucos, _ = self._contar_queries("/api/produtos/")
+        self._criar_produtos(6)
+        muitos, response = self._contar_queries("/api/produtos/")
+
+        self.assertEqual(response.data["count"], 9)
+        self.assertEqual(poucos, muitos)
+
+    def test_campos_de_lotes_vem_das_anotacoes(self):
+        self._criar_produtos(1)
+        _, response = self._contar_queries("/api/produtos/")
+        produto = response.data["results"][0]
+
+        self.assertEqual(produto["total_lotes"], 2)
+        self.assertEqual(produto["estoque_lotes"], 6.0)
+        # Lote inativo não é pré-carregado nem serializado
+        self.assertEqual(len(produto["lotes"]), 2)
+        vencimentos = {lote["dias_para_vencer"]: lote for lote in produto["lotes"]}
+        self.assertTrue(vencimentos[3]["proximo_vencimento"])
+        self.assertTrue(vencimentos[-1]["esta_vencido"])
+
+    def test_baixo_estoque_sem_queries_por_produto(self):
+        self._criar_produtos(2)
+        poucos, _ = self._contar_queries("/api/produtos/baixo_estoque/")
+        cache.clear()
+        self._criar_produtos(4)
+        muitos, response = self._contar_queries("/api/produtos/baixo_estoque/")
+
+        self.assertEqual(len(response.data), 6)
+        self.assertEqual(poucos, muitos)
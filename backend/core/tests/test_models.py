@@ -3,6 +3,8 @@ Testes para Models - Valida lógica de negócio
 """
 
 from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
 from django.test import TestCase
 from django.utils import timezone
 from core.models import Cliente, Produto, Venda, Categoria
@@ -71,6 +73,62 @@ class ClienteModelTestCase(TestCase):
         self.assertFalse(self.cliente.pode_comprar_fiado(Decimal("300.00")))
 
 
+class ClienteSaldoEmAbertoTestCase(TestCase):
+    """Saldo devedor incremental mantido pelas vendas fiado"""
+
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nome="Maria", limite_credito=Decimal("500.00")
+        )
+        self.produto = Produto.objects.create(
+            nome="Pão", preco=Decimal("10.00"), estoque=Decimal("100")
+        )
+
+    def _venda_fiado(self, quantidade):
+        venda = Venda.objects.create()
+        venda.itens.create(
+            produto=self.produto,
+            quantidade=Decimal(quantidade),
+            preco_unitario=self.produto.preco,
+        )
+        venda.calcular_total()
+        venda.finalizar("FIADO", cliente_id=self.cliente.id)
+        return venda
+
+    def test_saldo_acompanha_finalizacao_recebimento_e_cancelamento(self):
+        venda_1 = self._venda_fiado("3")
+        venda_2 = self._venda_fiado("5")
+        self.assertEqual(self.cliente.saldo_devedor(), Decimal("80.00"))
+
+        venda_1.receber_pagamento()
+        self.assertEqual(self.cliente.saldo_devedor(), Decimal("50.00"))
+
+        venda_2.status = "CANCELADA"
+        venda_2.save()
+        self.assertEqual(self.cliente.saldo_devedor(), Decimal("0.00"))
+
+    def test_exclusao_de_venda_pendente_abate_saldo(self):
+        self._venda_fiado("2")
+        Venda.objects.filter(cliente=self.cliente).delete()
+
+        self.assertEqual(self.cliente.saldo_devedor(), Decimal("0.00"))
+
+    def test_save_completo_do_cliente_nao_sobrescreve_saldo(self):
+        self._venda_fiado("4")
+        self.cliente.nome = "Maria Souza"
+        self.cliente.save()
+
+        self.assertEqual(self.cliente.saldo_devedor(), Decimal("40.00"))
+
+    def test_reconciliar_corrige_divergencias(self):
+        self._venda_fiado("2")
+        Cliente.objects.filter(pk=self.cliente.pk).update(saldo_em_aberto=Decimal("999"))
+
+        call_command("reconciliar_saldos", stdout=StringIO())
+
+        self.assertEqual(self.cliente.saldo_devedor(), Decimal("20.00"))
+
+
 class ProdutoModelTestCase(TestCase):
     """Testes para o model Produto"""
 
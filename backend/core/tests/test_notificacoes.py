@@ -0,0 +1,149 @@
+"""
+Testes para a fila de notificações de alertas (WhatsApp)
+"""
+
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+from core.models import Alerta, NotificacaoAlerta
+from core.notifications.whatsapp import StubTransport, WhatsappNotifier, WhatsappSettings
+from core.services.alert_service import AlertService
+from core.services.notificacao_service import NotificacaoService
+from fiscal.models import Empresa
+
+NUMERO_PADRAO = "whatsapp:+5511999990000"
+
+
+class NotificacaoServiceTestCase(TestCase):
+    """Enfileiramento sem chamadas externas e envio em lote pelo worker"""
+
+    def setUp(self):
+        patcher = mock.patch.object(
+            WhatsappNotifier,
+            "settings",
+            WhatsappSettings(enabled=True, transport="stub", default_to_number="11999990000"),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.transporte = StubTransport()
+        self.empresa = Empresa.objects.create(
+            razao_social="Empresa A Ltda",
+            nome_fantasia="A",
+            cnpj="11111111000111",
+            telefone_contato="(21) 98888-7777",
+        )
+
+    def _alerta(self, titulo, prioridade="ALTA", tipo="ESTOQUE_BAIXO", empresa=None):
+        alerta = Alerta.objects.create(
+            tipo=tipo,
+            prioridade=prioridade,
+            titulo=titulo,
+            mensagem=f"Mensagem de {titulo}",
+            empresa=empresa,
+        )
+        NotificacaoService.enfileirar([alerta])
+        return alerta
+
+    def test_sincronizar_enfileira_sem_enviar(self):
+        candidatos = [
+            Alerta(
+                tipo="ESTOQUE_BAIXO",
+                prioridade="ALTA",
+                titulo="Estoque baixo: Arroz",
+                mensagem="",
+                empresa=self.empresa,
+            ),
+        ]
+        with mock.patch.object(StubTransport, "send") as send:
+            (alerta,) = AlertService.sincronizar("ESTOQUE_BAIXO", candidatos)
+            AlertService.sincronizar(
+                "PRODUTO_SEM_PRECO",
+                [Alerta(tipo="PRODUTO_SEM_PRECO", prioridade="MEDIA", titulo="Sem preço", mensagem="")],
+            )
+
+        send.assert_not_called()
+        notificacao = NotificacaoAlerta.objects.get()
+        self.assertEqual(notificacao.alerta, alerta)
+        self.assertEqual(notificacao.destinatario, "whatsapp:+5521988887777")
+        self.assertEqual(notificacao.status, "PENDENTE")
+
+        # Reenfileirar o mesmo alerta não duplica a notificação pendente
+        self.assertEqual(NotificacaoService.enfileirar([alerta]), 0)
+
+    def test_alertas_do_mesmo_destinatario_viram_um_resumo(self):
+        for indice in range(3):
+            self._alerta(f"Estoque baixo {indice}")
+        self._alerta("Conta vencida", tipo="CONTA_VENCIDA", prioridade="CRITICA")
+        self._alerta("Estoque baixo da empresa", empresa=self.empresa)
+
+        resultado = NotificacaoService.processar(transporte=self.transporte)
+
+        self.assertEqual(resultado["mensagens"], 2)
+        self.assertEqual(resultado["enviadas"], 5)
+        mensagens = dict(self.transporte.sent)
+        self.assertIn("*🔔 4 alertas*", mensagens[NUMERO_PADRAO])
+        self.assertIn("*Estoque Baixo* (3)", mensagens[NUMERO_PADRAO])
+        self.assertIn("*Conta Vencida* (1)", mensagens[NUMERO_PADRAO])
+        self.assertTrue(
+            mensagens["whatsapp:+5521988887777"].startswith("*Estoque baixo da empresa*")
+        )
+        self.assertFalse(Alerta.objects.filter(notificado=False).exists())
+        self.assertFalse(NotificacaoAlerta.objects.exclude(status="ENVIADA").exists())
+
+    def test_resumo_limita_as_linhas_por_tipo(self):
+        alertas = [
+            Alerta(tipo="ESTOQUE_BAIXO", prioridade="ALTA", titulo=f"Produto {i}", mensagem="")
+            for i in range(NotificacaoService.MAX_LINHAS_RESUMO + 3)
+        ]
+
+        mensagem = NotificacaoService.montar_mensagem(alertas)
+
+        self.assertIn("• ... e mais 3", mensagem)
+        self.assertNotIn(f"Produto {NotificacaoService.MAX_LINHAS_RESUMO}\n", mensagem)
+
+    def test_falha_reagenda_com_backoff_e_desiste_no_limite(self):
+        alerta = self._alerta("Estoque baixo: Arroz")
+        self.transporte.failing_numbers.add(NUMERO_PADRAO)
+
+        antes = timezone.now()
+        resultado = NotificacaoService.processar(transporte=self.transporte)
+
+        self.assertEqual(resultado["falhas"], 1)
+        notificacao = NotificacaoAlerta.objects.get()
+        self.assertEqual(notificacao.status, "PENDENTE")
+        self.assertEqual(notificacao.tentativas, 1)
+        self.assertIn("Falha simulada", notificacao.ultimo_erro)
+        self.assertGreaterEqual(
+            notificacao.proxima_tentativa,
+            antes + timedelta(seconds=NotificacaoService.BACKOFF_BASE),
+        )
+
+        # Ainda no backoff: nada a processar
+        self.assertEqual(NotificacaoService.processar(transporte=self.transporte)["falhas"], 0)
+
+        NotificacaoAlerta.objects.update(
+            tentativas=NotificacaoService.MAX_TENTATIVAS - 1, proxima_tentativa=timezone.now()
+        )
+        resultado = NotificacaoService.processar(transporte=self.transporte)
+
+        self.assertEqual(resultado["descartadas"], 1)
+        self.assertEqual(NotificacaoAlerta.objects.get().status, "FALHA")
+        alerta.refresh_from_db()
+        self.assertFalse(alerta.notificado)
+
+    def test_backoff_exponencial_limitado(self):
+        self.assertEqual(NotificacaoService._backoff(1), NotificacaoService.BACKOFF_BASE)
+        self.assertEqual(NotificacaoService._backoff(3), 4 * NotificacaoService.BACKOFF_BASE)
+        self.assertEqual(NotificacaoService._backoff(20), NotificacaoService.BACKOFF_MAXIMO)
+
+    def test_comando_processa_a_fila(self):
+        self._alerta("Estoque baixo: Arroz")
+        out = StringIO()
+
+        call_command("enviar_notificacoes", stdout=out)
+
+        self.assertIn("1 mensagem(ns) enviada(s) para 1 alerta(s)", out.getvalue())
+        self.assertEqual(NotificacaoAlerta.objects.get().status, "ENVIADA")
@@ -0,0 +1,111 @@
+"""
+Testes para a reprecificação em massa (/produtos/reprecificar/)
+"""
+
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import Categoria, Fornecedor, Produto
+from core.services.cache_service import CacheService
+from core.services.precificacao_service import PrecificacaoService
+from fiscal.models import Empresa
+
+
+class ReprecificacaoTestCase(APITestCase):
+    """Reprecificação por seleção com UPDATE único ou bulk_update"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.bebidas = Categoria.objects.create(nome="Bebidas")
+        self.fornecedor = Fornecedor.objects.create(nome="Ambev")
+        self.cerveja = Produto.objects.create(
+            nome="Cerveja", preco=Decimal("5.00"), preco_custo=Decimal("3.00"),
+            categoria=self.bebidas, fornecedor=self.fornecedor,
+        )
+        self.refri = Produto.objects.create(
+            nome="Refrigerante", preco=Decimal("8.15"), preco_custo=Decimal("0"),
+            categoria=self.bebidas,
+        )
+        self.arroz = Produto.objects.create(nome="Arroz", preco=Decimal("20.00"))
+
+    def _reprecificar(self, **dados):
+        return self.client.post("/api/produtos/reprecificar/", dados, format="json")
+
+    def test_percentual_por_categoria_em_um_update(self):
+        chave_antiga = CacheService.chave("produtos_mais_lucrativos", ["estoque", "vendas"])
+        cache.set(chave_antiga, ["antigo"])
+
+        # UPDATE + SAVEPOINT/RELEASE do atomic aninhado no TestCase
+        with self.assertNumQueries(3):
+            response = self._reprecificar(
+                categoria_id=self.bebidas.id, regra="percentual", valor="10"
+            )
+
+        self.assertEqual(response.data["total"], 2)
+        self.cerveja.refresh_from_db()
+        self.refri.refresh_from_db()
+        self.arroz.refresh_from_db()
+        self.assertEqual(self.cerveja.preco, Decimal("5.50"))
+        self.assertEqual(self.refri.preco, Decimal("8.97"))
+        self.assertEqual(self.arroz.preco, Decimal("20.00"))
+        self.assertNotEqual(
+            CacheService.chave("produtos_mais_lucrativos", ["estoque", "vendas"]), chave_antiga
+        )
+
+    def test_preview_de_margem_nao_grava(self):
+        response = self._reprecificar(
+            fornecedor_id=self.fornecedor.id, regra="margem", valor="50",
+            arredondar_99=True, preview=True,
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["produtos"][0]["preco_novo"], "4.99")
+        self.assertEqual(response.data["produtos"][0]["preco_atual"], "5.00")
+        self.cerveja.refresh_from_db()
+        self.assertEqual(self.cerveja.preco, Decimal("5.00"))
+
+    def test_margem_com_arredondamento_em_lotes(self):
+        response = self._reprecificar(
+            ids=[self.cerveja.id, self.refri.id], regra="margem", valor="50", arredondar_99=True
+        )
+
+        # Refrigerante sem custo fica de fora da regra de margem
+        self.assertEqual(response.data, {"total": 1, "ignorados": 1, "preview": False})
+        self.cerveja.refresh_from_db()
+        self.assertEqual(self.cerveja.preco, Decimal("4.99"))
+
+    def test_restrita_a_empresa_do_cabecalho(self):
+        empresa = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        Produto.objects.filter(pk=self.cerveja.pk).update(empresa=empresa)
+
+        response = self.client.post(
+            "/api/produtos/reprecificar/",
+            {"categoria_id": self.bebidas.id, "regra": "percentual", "valor": "10"},
+            format="json",
+            HTTP_X_EMPRESA_ID=str(empresa.id),
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.cerveja.refresh_from_db()
+        self.refri.refresh_from_db()
+        self.assertEqual(self.cerveja.preco, Decimal("5.50"))
+        self.assertEqual(self.refri.preco, Decimal("8.15"))
+
+    def test_validacoes(self):
+        response = self._reprecificar(regra="percentual", valor="10")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self._reprecificar(ids=[self.arroz.id], regra="percentual", valor="-100")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_arredondar_99(self):
+        self.assertEqual(PrecificacaoService.arredondar_99(Decimal("10.20")), Decimal("10.99"))
+        self.assertEqual(PrecificacaoService.arredondar_99(Decimal("11.00")), Decimal("10.99"))
+        self.assertEqual(PrecificacaoService.arredondar_99(Decimal("0.30")), Decimal("0.99"))
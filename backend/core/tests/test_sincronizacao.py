@@ -0,0 +1,173 @@
+"""
+Testes para a sincronização incremental do catálogo (/sync/...)
+"""
+
+import gzip
+import json
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework import status
+from core.models import Categoria, Cliente, Produto
+from core.services.estoque_service import EstoqueService
+from core.services.saldo_service import SaldoClienteService
+from fiscal.models import Empresa
+
+
+class SincronizacaoCatalogoTestCase(APITestCase):
+    """Delta de produtos, clientes e categorias desde um token"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.arroz = Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.00"), estoque=Decimal("10")
+        )
+        self.feijao = Produto.objects.create(
+            nome="Feijão", preco=Decimal("8.00"), estoque=Decimal("10")
+        )
+        self.sal = Produto.objects.create(
+            nome="Sal", preco=Decimal("3.00"), estoque=Decimal("10")
+        )
+        self.inativo = Produto.objects.create(
+            nome="Inativo", preco=Decimal("1.00"), ativo=False
+        )
+
+    def _envelhecer(self, model):
+        """Simula registros sincronizados há uma hora"""
+        model.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+    def test_carga_inicial_traz_apenas_ativos(self):
+        response = self.client.get("/api/sync/produtos/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data["completo"])
+        self.assertEqual(
+            [p["id"] for p in response.data["alterados"]],
+            [self.arroz.id, self.feijao.id, self.sal.id],
+        )
+        self.assertEqual(response.data["removidos"], [])
+        self.assertNotIn("lotes", response.data["alterados"][0])
+
+    def test_delta_traz_alterados_desativados_e_excluidos(self):
+        token = self.client.get("/api/sync/produtos/").data["token"]
+        self._envelhecer(Produto)
+
+        EstoqueService.baixar({self.arroz.id: 2})
+        self.feijao.ativo = False
+        self.feijao.save()
+        sal_id = self.sal.id
+        self.sal.delete()
+
+        # Alterados (com categoria/fornecedor) + desativados + lápides
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/sync/produtos/", {"since": token})
+
+        self.assertFalse(response.data["completo"])
+        self.assertEqual([p["id"] for p in response.data["alterados"]], [self.arroz.id])
+        self.assertEqual(response.data["alterados"][0]["estoque"], "8.00")
+        self.assertEqual(response.data["removidos"], sorted([self.feijao.id, sal_id]))
+        self.assertNotEqual(response.data["token"], token)
+
+    def test_clientes_e_categorias_seguem_o_mesmo_contrato(self):
+        cliente = Cliente.objects.create(nome="Maria")
+        categoria = Categoria.objects.create(nome="Bebidas")
+        self._envelhecer(Cliente)
+        self._envelhecer(Categoria)
+        token = timezone.now().isoformat()
+
+        SaldoClienteService.aplicar({cliente.id: Decimal("15.00")})
+        categoria_id = categoria.id
+        categoria.delete()
+
+        response = self.client.get("/api/sync/clientes/", {"since": token})
+        self.assertEqual(response.data["alterados"][0]["saldo_devedor"], 15.0)
+
+        response = self.client.get("/api/sync/categorias/", {"since": token})
+        self.assertEqual(response.data["alterados"], [])
+        self.assertEqual(response.data["removidos"], [categoria_id])
+
+    def test_catalogo_da_empresa_do_cabecalho(self):
+        empresa = Empresa.objects.create(
+            razao_social="Empresa A Ltda", nome_fantasia="A", cnpj="11111111000111"
+        )
+        Produto.objects.filter(pk=self.sal.pk).update(empresa=empresa)
+
+        response = self.client.get("/api/sync/produtos/", HTTP_X_EMPRESA_ID=str(empresa.id))
+
+        self.assertEqual([p["id"] for p in response.data["alterados"]], [self.sal.id])
+
+        response = self.client.get("/api/sync/produtos/", HTTP_X_EMPRESA_ID="nao-e-uuid")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_token_invalido(self):
+        response = self.client.get("/api/sync/fornecedores/", {"since": "ontem"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SnapshotCatalogoTestCase(APITestCase):
+    """Snapshot colunar compactado para a carga inicial do PDV"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.categoria = Categoria.objects.create(nome="Mercearia")
+        self.arroz = Produto.objects.create(
+            nome="Arroz", preco=Decimal("20.50"), estoque=Decimal("10"),
+            codigo_barras="789100", categoria=self.categoria,
+        )
+        self.sal = Produto.objects.create(
+            nome="Sal", preco=Decimal("3.00"), ativo=False
+        )
+
+    def _snapshot(self, **headers):
+        return self.client.get(
+            "/api/produtos/snapshot/", HTTP_ACCEPT_ENCODING="gzip", **headers
+        )
+
+    def test_payload_colunar_compactado(self):
+        response = self._snapshot()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        dados = json.loads(gzip.decompress(response.content))
+        colunas = dict(zip(dados["campos"], dados["colunas"]))
+        self.assertEqual(dados["total"], 2)
+        self.assertEqual(colunas["id"], [self.arroz.id, self.sal.id])
+        self.assertEqual(colunas["preco"], [20.5, 3.0])
+        self.assertEqual(colunas["codigo_barras"], ["789100", ""])
+        self.assertEqual(colunas["ativo"], [True, False])
+        self.assertEqual(colunas["categoria_id"], [self.categoria.id, None])
+        # O token continua a sincronização incremental
+        self.assertEqual(
+            self.client.get("/api/sync/produtos/", {"since": dados["token"]}).status_code,
+            status.HTTP_200_OK,
+        )
+
+        sem_gzip = self.client.get("/api/produtos/snapshot/")
+        self.assertNotIn("Content-Encoding", sem_gzip)
+        self.assertEqual(json.loads(sem_gzip.content), dados)
+
+    def test_etag_304_e_nova_versao_apos_alteracao(self):
+        etag = self._snapshot()["ETag"]
+
+        # Em cache: só a consulta da versão do catálogo
+        with self.assertNumQueries(1):
+            response = self._snapshot(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        EstoqueService.baixar({self.arroz.id: 2})
+
+        response = self._snapshot(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+        dados = json.loads(gzip.decompress(response.content))
+        self.assertEqual(dados["colunas"][dados["campos"].index("estoque")][0], 8.0)
@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.contrib.auth.models import User
@@ -220,3 +222,185 @@ class VendaAPITestCase(APITestCase):
         response = self.client.get("/api/produtos/", {"search": "Produto"})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreaterEqual(len(response.data["results"]), 2)
+
+
+class VendaCheckoutEmLoteTestCase(APITestCase):
+    """Checkout em lote: número de queries não depende da quantidade de itens"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="caixa", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.produtos = [
+            Produto.objects.create(
+                nome=f"Produto {i}", preco=Decimal("2.50"), estoque=Decimal("100")
+            )
+            for i in range(30)
+        ]
+
+    def _vender(self, produtos):
+        data = {
+            "forma_pagamento": "DINHEIRO",
+            "itens": [{"produto_id": p.id, "quantidade": 2} for p in produtos],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/vendas/", data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        return response, len(ctx.captured_queries)
+
+    def test_queries_constantes_por_venda(self):
+        # Primeira venda do dia cria a linha do resumo diário
+        self._vender(self.produtos[:1])
+
+        _, queries_um_item = self._vender(self.produtos[:1])
+        _, queries_trinta_itens = self._vender(self.produtos)
+
+        self.assertEqual(queries_um_item, queries_trinta_itens)
+
+    def test_itens_gravados_com_subtotal_e_total(self):
+        response, _ = self._vender(self.produtos[:3])
+
+        venda = Venda.objects.get(id=response.data["id"])
+        self.assertEqual(venda.total, Decimal("15.00"))
+        self.assertEqual(venda.status, "FINALIZADA")
+        self.assertEqual(
+            sorted(venda.itens.values_list("subtotal", flat=True)),
+            [Decimal("5.00")] * 3,
+        )
+        self.produtos[0].refresh_from_db()
+        self.assertEqual(self.produtos[0].estoque, Decimal("98.00"))
+
+    def test_produto_repetido_soma_quantidades_no_estoque(self):
+        produto = self.produtos[0]
+        produto.estoque = Decimal("3")
+        produto.save()
+
+        data = {
+            "forma_pagamento": "DINHEIRO",
+            "itens": [
+                {"produto_id": produto.id, "quantidade": 2},
+                {"produto_id": produto.id, "quantidade": 2},
+            ],
+        }
+        response = self.client.post("/api/vendas/", data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("Estoque insuficiente", str(response.data))
+        produto.refresh_from_db()
+        self.assertEqual(produto.estoque, Decimal("3"))
+
+
+class VendaLoteSincronizacaoTestCase(APITestCase):
+    """POST /vendas/lote/: sincronização offline com chave de idempotência"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="terminal", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.produto = Produto.objects.create(
+            nome="Água", preco=Decimal("3.00"), estoque=Decimal("5")
+        )
+
+    def _venda(self, chave, quantidade=1):
+        return {
+            "chave_idempotencia": chave,
+            "forma_pagamento": "PIX",
+            "itens": [{"produto_id": self.produto.id, "quantidade": quantidade}],
+        }
+
+    def test_cria_vendas_e_reconhece_reenvio(self):
+        payload = {"vendas": [self._venda("a1", 2), self._venda("a2", 1)]}
+
+        response = self.client.post("/api/vendas/lote/", payload, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["criadas"], 2)
+        self.assertEqual(
+            [r["status"] for r in response.data["resultados"]], ["CRIADA", "CRIADA"]
+        )
+
+        # Reenvio após falha de rede: nada é duplicado
+        response = self.client.post("/api/vendas/lote/", payload, format="json")
+        self.assertEqual(response.data["duplicadas"], 2)
+        self.assertEqual(
+            response.data["resultados"][0]["venda_id"],
+            Venda.objects.get(idempotencia__chave="a1").id,
+        )
+        self.assertEqual(Venda.objects.count(), 2)
+
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, Decimal("2.00"))
+
+    def test_erro_em_uma_venda_nao_afeta_as_demais(self):
+        payload = {
+            "vendas": [
+                self._venda("b1", 4),
+                self._venda("b2", 4),  # estoque já consumido pela b1
+                self._venda("b3", 1),
+            ]
+        }
+
+        response = self.client.post("/api/vendas/lote/", payload, format="json")
+
+        self.assertEqual(
+            [r["status"] for r in response.data["resultados"]],
+            ["CRIADA", "ERRO", "CRIADA"],
+        )
+        self.assertEqual(Venda.objects.count(), 2)
+        self.produto.refresh_from_db()
+        self.assertEqual(self.produto.estoque, Decimal("0.00"))
+
+    def test_chave_idempotencia_obrigatoria(self):
+        venda = self._venda("c1")
+        del venda["chave_idempotencia"]
+
+        response = self.client.post(
+            "/api/vendas/lote/", {"vendas": [venda]}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Venda.objects.exists())
+
+
+class VendaPaginacaoCursorTestCase(APITestCase):
+    """Paginação keyset opcional (?paginacao=cursor) da listagem de vendas"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="testuser", password="testpassword"
+        )
+        self.client.force_authenticate(user=self.user)
+        self.vendas = [
+            Venda.objects.create(
+                numero=f"V-CURSOR-{i}",
+                forma_pagamento="PIX",
+                status="FINALIZADA",
+                total=Decimal("10.00"),
+            )
+            for i in range(5)
+        ]
+
+    def test_percorre_paginas_sem_count(self):
+        url = "/api/vendas/?paginacao=cursor&page_size=2"
+        ids = []
+        with CaptureQueriesContext(connection) as ctx:
+            while url:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertNotIn("count", response.data)
+                ids.extend(venda["id"] for venda in response.data["results"])
+                url = response.data["next"]
+
+        self.assertEqual(ids, [venda.id for venda in reversed(self.vendas)])
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in ctx.captured_queries)
+        )
+
+    def test_total_opcional_e_modo_padrao_inalterado(self):
+        response = self.client.get("/api/vendas/?paginacao=cursor&com_total=true")
+        self.assertEqual(response.data["count"], 5)
+
+        response = self.client.get("/api/vendas/")
+        self.assertEqual(response.data["count"], 5)
+        self.assertIn("previous", response.data)
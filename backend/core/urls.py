@@ -15,6 +15,7 @@ from .views import (
     AlertaViewSet,
     LoteViewSet,
     InventarioSessaoViewSet,
+    SincronizacaoViewSet,
     login,
     logout,
     me,
@@ -32,6 +33,7 @@ router.register("categorias", CategoriaViewSet, basename="categoria")
 router.register("alertas", AlertaViewSet, basename="alerta")
 router.register("lotes", LoteViewSet, basename="lote")
 router.register("estoque/inventarios", InventarioSessaoViewSet, basename="inventario")
+router.register("sync", SincronizacaoViewSet, basename="sync")
 
 urlpatterns = [
     path("", include(router.urls)),
@@ -2,23 +2,34 @@
 Views da API - HMConveniencia
 """
 
+import gzip
 import logging
 from django.core.management import call_command
 from django.contrib.auth import authenticate
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import AllowAny
-from django.db.models import Sum, Count, Q, OuterRef, Subquery
+from django.db.models import (
+    Sum,
+    Count,
+    F,
+    Q,
+    OuterRef,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.http import HttpResponse
 from django.utils import timezone
-from django.db import connection, transaction
+from django.utils.http import parse_etags
+from django.db import IntegrityError, connection, transaction
 from datetime import timedelta
 from decimal import Decimal
 from django_ratelimit.decorators import ratelimit
 from django.utils.decorators import method_decorator
-from django.core.cache import cache
 from fiscal.models import NotaFiscal, Empresa, EstoqueMovimento, EstoqueOrigem
 from fiscal.serializers import EmpresaSerializer
 from .models import (
@@ -26,6 +37,7 @@ from .models import (
     Fornecedor,
     Produto,
     Venda,
+    VendaIdempotencia,
     Caixa,
     Categoria,
     Alerta,
@@ -37,6 +49,7 @@ from .serializers import (
     ProdutoSerializer,
     VendaSerializer,
     VendaCreateSerializer,
+    VendaLoteSerializer,
     CaixaSerializer,
     MovimentacaoCaixaSerializer,
     CategoriaSerializer,
@@ -45,8 +58,30 @@ from .serializers import (
     OpenFoodFactsProductSerializer,
     InventarioSessaoSerializer,
     InventarioItemSerializer,
+    ProdutoSyncSerializer,
+    ReprecificacaoSerializer,
+    ClienteSyncSerializer,
+    CategoriaSyncSerializer,
+    FornecedorSyncSerializer,
 )
 from .services.alert_service import AlertService
+from .services.busca_service import BuscaService
+from .services.cache_service import CacheService
+from .services.caixa_service import CaixaService
+from .services.codigo_barras_service import IndiceCodigoBarrasService
+from .services.estoque_service import EstoqueService
+from .services.giro_service import GiroEstoqueService
+from .services.importacao_service import ErroImportacao, ImportacaoProdutosService
+from .services.empresa_service import EmpresaService
+from .services.lote_service import LoteService
+from .services.painel_service import PainelService
+from .services.precificacao_service import PrecificacaoService
+from .services.resumo_service import ResumoDiarioService
+from .services.snapshot_service import SnapshotCatalogoService
+from .services.sincronizacao_service import (
+    SincronizacaoService,
+    TokenSincronizacaoInvalido,
+)
 from .services import openfoodfacts
 from .services.openfoodfacts import OpenFoodFactsError
 from .models import InventarioSessao, InventarioItem
@@ -65,15 +100,8 @@ class InventarioSessaoViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        empresa_id = (
-            self.request.query_params.get("empresa_id")
-            or self.request.headers.get("X-Empresa-Id")
-        )
-        if empresa_id:
-            return qs.filter(empresa_id=empresa_id)
-
-        empresa = Empresa.objects.first()
-        return qs.filter(empresa=empresa) if empresa else qs.none()
+        empresa = self.request.empresa
+        return qs.filter(empresa_id=empresa.pk) if empresa else qs.none()
 
     def perform_create(self, serializer):
         serializer.save(empresa=self._obter_empresa())
@@ -101,18 +129,18 @@ class InventarioSessaoViewSet(viewsets.ModelViewSet):
                 )
 
                 # Reverte os ajustes de estoque
+                reversoes = []
                 for item in instance.itens.select_related("produto"):
                     if item.produto and item.diferenca != 0:
                         # Reverte a diferença (faz o inverso do ajuste)
                         diferenca_reversa = -item.diferenca
-                        produto = item.produto
-                        produto.estoque = (produto.estoque or Decimal("0")) + diferenca_reversa
-                        produto.save(update_fields=["estoque"])
+                        reversoes.append((item.produto_id, diferenca_reversa))
 
                         logger.info(
                             f"Revertido ajuste de {item.diferenca} → {diferenca_reversa} "
-                            f"no produto {produto.nome} (ID: {produto.id})"
+                            f"no produto {item.produto.nome} (ID: {item.produto_id})"
                         )
+                EstoqueService.ajustar(reversoes)
 
                 # Deleta os movimentos de estoque relacionados a esta sessão
                 movimentos_deletados = EstoqueMovimento.objects.filter(
@@ -132,14 +160,8 @@ class InventarioSessaoViewSet(viewsets.ModelViewSet):
             instance.delete()
 
     def _obter_empresa(self) -> Empresa:
-        empresa_id = (
-            self.request.data.get("empresa_id")
-            or self.request.headers.get("X-Empresa-Id")
-        )
-        if empresa_id:
-            return Empresa.objects.get(id=empresa_id)
-
-        empresa = Empresa.objects.first()
+        empresa_id = self.request.data.get("empresa_id")
+        empresa = EmpresaService.obter(empresa_id) if empresa_id else self.request.empresa
         if not empresa:
             raise Empresa.DoesNotExist("Nenhuma empresa configurada.")
         return empresa
@@ -476,52 +498,23 @@ class ClienteViewSet(viewsets.ModelViewSet):
         if ativo is not None:
             queryset = queryset.filter(ativo=ativo.lower() == "true")
 
-        # Busca por nome
+        # Busca sem acentos, ranqueada (nome; CPF/telefone por prefixo)
         search = self.request.query_params.get("search", None)
         if search:
-            queryset = queryset.filter(nome__icontains=search)
+            queryset = BuscaService.filtrar(queryset, search)
 
-        # Otimização: annotate saldo_devedor para evitar N+1 queries
-        queryset = queryset.annotate(
-            total_divida=Sum(
-                "vendas__total",
-                filter=Q(vendas__status="FINALIZADA", vendas__status_pagamento="PENDENTE")
-            )
-        )
+        # Saldo devedor vem do saldo em aberto mantido pelas vendas (sem JOIN/GROUP BY)
+        queryset = queryset.annotate(total_divida=F("saldo_em_aberto"))
 
         return queryset
 
     @action(detail=False, methods=["get"])
     def com_dividas(self, request):
-        """Retorna clientes com vendas pendentes - Cache 5 minutos"""
-        cache_key = "clientes_com_dividas"
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        # Otimizado: usa annotate em vez de N+1 queries
-        clientes = (
-            Cliente.objects.filter(
-                vendas__status_pagamento="PENDENTE",
-                vendas__status="FINALIZADA",
-                ativo=True,
-            )
-            .annotate(
-                total_divida=Sum("vendas__total"), qtd_vendas_pendentes=Count("vendas")
-            )
-            .distinct()
-            .order_by("nome")
+        """Retorna clientes com vendas pendentes - Cache 5 minutos por empresa"""
+        return Response(
+            PainelService.clientes_com_dividas(EmpresaService.id_da_requisicao(request))
         )
 
-        serializer = ClienteSerializer(clientes, many=True)
-        data = serializer.data
-
-        # Salva no cache por 5 minutos (300 segundos)
-        cache.set(cache_key, data, 300)
-
-        return Response(data)
-
 
 class FornecedorViewSet(viewsets.ModelViewSet):
     """ViewSet para Fornecedores"""
@@ -537,14 +530,10 @@ class FornecedorViewSet(viewsets.ModelViewSet):
         if ativo is not None:
             queryset = queryset.filter(ativo=ativo.lower() == "true")
 
-        # Busca por nome
+        # Busca sem acentos, ranqueada (nome/nome fantasia; CNPJ por prefixo)
         search = self.request.query_params.get("search", None)
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search)
-                | Q(nome_fantasia__icontains=search)
-                | Q(cnpj__icontains=search)
-            )
+            queryset = BuscaService.filtrar(queryset, search)
 
         ultima_nf = NotaFiscal.objects.filter(fornecedor_id=OuterRef("pk")).order_by(
             "-data_emissao", "-created_at"
@@ -559,7 +548,8 @@ class FornecedorViewSet(viewsets.ModelViewSet):
             ultima_nota_chave=Subquery(ultima_nf.values("chave_acesso")[:1]),
         )
 
-        return queryset.order_by("nome")
+        # Com busca, mantém a ordenação por relevância
+        return queryset if search else queryset.order_by("nome")
 
     @action(detail=True, methods=["get"])
     def lotes(self, request, pk=None):
@@ -595,23 +585,27 @@ class FornecedorViewSet(viewsets.ModelViewSet):
 class ProdutoViewSet(viewsets.ModelViewSet):
     """ViewSet para Produtos"""
 
-    queryset = Produto.objects.select_related("categoria").all()
+    queryset = Produto.objects.select_related("categoria", "fornecedor").all()
     serializer_class = ProdutoSerializer
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # "Hoje" único por requisição para os campos de vencimento
+        context["hoje"] = timezone.localdate()
+        return context
+
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = LoteService.anotar_produtos(super().get_queryset())
 
         # Filtro por ativos
         ativo = self.request.query_params.get("ativo", None)
         if ativo is not None:
             queryset = queryset.filter(ativo=ativo.lower() == "true")
 
-        # Busca por nome ou código (otimizada com Q)
+        # Busca sem acentos, ranqueada, com prefixo do código de barras primeiro
         search = self.request.query_params.get("search", None)
         if search:
-            queryset = queryset.filter(
-                Q(nome__icontains=search) | Q(codigo_barras__icontains=search)
-            )
+            queryset = BuscaService.filtrar(queryset, search)
 
         return queryset
 
@@ -653,72 +647,147 @@ class ProdutoViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def baixo_estoque(self, request):
-        """Retorna produtos com estoque baixo (< 10) - Cache 5 minutos"""
-        cache_key = "produtos_baixo_estoque"
-        cached_data = cache.get(cache_key)
+        """Retorna produtos com estoque baixo (< 10) - Cache 5 minutos por empresa"""
+        return Response(
+            PainelService.produtos_baixo_estoque(EmpresaService.id_da_requisicao(request))
+        )
 
-        if cached_data:
-            return Response(cached_data)
+    @action(detail=False, methods=["get"])
+    def mais_lucrativos(self, request):
+        """Retorna os produtos mais lucrativos - Cache 15 minutos por empresa"""
+        return Response(
+            PainelService.produtos_mais_lucrativos(EmpresaService.id_da_requisicao(request))
+        )
 
-        produtos = self.queryset.filter(estoque__lt=10, ativo=True)
-        serializer = ProdutoSerializer(produtos, many=True)
-        data = serializer.data
+    @action(detail=False, methods=["get"])
+    def giro(self, request):
+        """
+        Giro de estoque por produto e por categoria na janela informada
+        (?dias=30, empresa opcional por X-Empresa-Id ou ?empresa_id=)
+        - Cache 5 minutos por (empresa, janela)
+        """
+        try:
+            dias = int(request.query_params.get("dias", GiroEstoqueService.DIAS_PADRAO))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Parâmetro 'dias' inválido"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not 1 <= dias <= GiroEstoqueService.DIAS_MAXIMO:
+            return Response(
+                {"error": f"'dias' deve estar entre 1 e {GiroEstoqueService.DIAS_MAXIMO}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        # Salva no cache por 5 minutos (300 segundos)
-        cache.set(cache_key, data, 300)
+        return Response(
+            GiroEstoqueService.obter(dias, EmpresaService.id_da_requisicao(request))
+        )
 
-        return Response(data)
+    @action(detail=False, methods=["get"], url_path=r"por-codigo/(?P<codigo>[^/]+)")
+    def por_codigo(self, request, codigo=None):
+        """
+        Busca exata por código de barras para o leitor do PDV
+        (empresa opcional por X-Empresa-Id ou ?empresa_id=). Servida pelo
+        índice em cache, com fallback para o filtro exato indexado em
+        codigo_barras.
+        """
+        produto = IndiceCodigoBarrasService.buscar(
+            codigo,
+            empresa_id=EmpresaService.id_da_requisicao(request),
+            queryset=Produto.objects.select_related("categoria", "fornecedor"),
+        )
+        if produto is None:
+            return Response(
+                {"error": f"Código {codigo} não cadastrado"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(ProdutoSyncSerializer(produto).data)
 
     @action(detail=False, methods=["get"])
-    def mais_lucrativos(self, request):
-        """Retorna os produtos mais lucrativos - Cache 15 minutos"""
-        from django.db.models import F
-        from core.models import ItemVenda
-
-        # Cache key
-        cache_key = "produtos_mais_lucrativos"
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        # Agrega os dados de vendas por produto
-        produtos_lucro = (
-            ItemVenda.objects.filter(
-                venda__status="FINALIZADA",
-                produto__preco_custo__gt=0,  # Considera apenas produtos com custo definido
-            )
-            .values("produto__nome", "produto__preco", "produto__preco_custo")
-            .annotate(
-                total_vendido=Sum("quantidade"),
-                receita_total=Sum(F("quantidade") * F("preco_unitario")),
-                custo_total=Sum(F("quantidade") * F("produto__preco_custo")),
-                lucro_total=Sum(
-                    F("quantidade") * (F("preco_unitario") - F("produto__preco_custo"))
-                ),
+    def snapshot(self, request):
+        """
+        Snapshot colunar compactado do catálogo para a carga inicial do PDV
+        (empresa opcional por X-Empresa-Id ou ?empresa_id=). Responde 304
+        quando o ETag não mudou.
+        """
+        snapshot = SnapshotCatalogoService.obter(EmpresaService.id_da_requisicao(request))
+
+        usar_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+        # ETag forte por representação (com e sem gzip)
+        etag = f'"{snapshot["etag"]}-gzip"' if usar_gzip else f'"{snapshot["etag"]}"'
+
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif usar_gzip:
+            response = HttpResponse(snapshot["gzip"], content_type="application/json")
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(
+                gzip.decompress(snapshot["gzip"]), content_type="application/json"
             )
-            .order_by("-lucro_total")
+
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @action(detail=False, methods=["post"])
+    def reprecificar(self, request):
+        """
+        Reprecificação em massa por categoria, fornecedor ou IDs:
+        percentual, margem sobre o custo ou arredondamento para ,99.
+        Com preview=true devolve os produtos afetados sem gravar. A empresa
+        vem de X-Empresa-Id ou ?empresa_id= (sem empresa: todas).
+        """
+        serializer = ReprecificacaoSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        dados = serializer.validated_data
+
+        produtos = PrecificacaoService.selecionar(
+            categoria_id=dados.get("categoria_id"),
+            fornecedor_id=dados.get("fornecedor_id"),
+            ids=dados.get("ids"),
+            empresa_id=EmpresaService.id_da_requisicao(request),
         )
+        resultado = PrecificacaoService.reprecificar(
+            produtos,
+            dados["regra"],
+            valor=dados.get("valor"),
+            arredondar_99=dados["arredondar_99"],
+            preview=dados["preview"],
+        )
+        return Response(resultado)
 
-        # Formata a saída
-        results = []
-        for item in produtos_lucro:
-            results.append(
-                {
-                    "nome_produto": item["produto__nome"],
-                    "preco_venda": float(item["produto__preco"]),
-                    "preco_custo": float(item["produto__preco_custo"]),
-                    "total_vendido": float(item["total_vendido"]),
-                    "receita_total": float(item["receita_total"]),
-                    "custo_total": float(item["custo_total"]),
-                    "lucro_total": float(item["lucro_total"]),
-                }
+    @action(
+        detail=False,
+        methods=["post"],
+        parser_classes=[MultiPartParser, FormParser],
+    )
+    def importar(self, request):
+        """
+        Importa produtos de um CSV (campo 'arquivo'). Com dry_run=true apenas
+        devolve o relatório do que seria criado/alterado. Os produtos ficam na
+        empresa do cabeçalho X-Empresa-Id / ?empresa_id=.
+        """
+        arquivo = request.FILES.get("arquivo")
+        if not arquivo:
+            return Response(
+                {"error": "Envie o arquivo CSV no campo 'arquivo'"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Salva no cache por 15 minutos (900 segundos)
-        cache.set(cache_key, results, 900)
+        dry_run = (
+            request.query_params.get("dry_run") or request.data.get("dry_run") or ""
+        ).lower() in ("true", "1")
 
-        return Response(results)
+        try:
+            relatorio = ImportacaoProdutosService.importar(
+                arquivo.file, empresa_id=EmpresaService.id_da_requisicao(request), dry_run=dry_run
+            )
+        except ErroImportacao as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(relatorio)
 
     @action(detail=False, methods=["post"], url_path="excluir-todos")
     def excluir_todos(self, request):
@@ -766,8 +835,7 @@ class ProdutoViewSet(viewsets.ModelViewSet):
                 Produto.objects.all().delete()
 
                 # Limpa o cache
-                cache.delete("produtos_baixo_estoque")
-                cache.delete("produtos_mais_lucrativos")
+                CacheService.invalidar("estoque", "vendas")
 
                 logger.warning(
                     f"[OPERAÇÃO CRÍTICA] Exclusão completa realizada com sucesso. "
@@ -800,6 +868,12 @@ class VendaViewSet(viewsets.ModelViewSet):
         Venda.objects.select_related("cliente").prefetch_related("itens__produto").all()
     )
 
+    # Paginação keyset opcional (?paginacao=cursor) pelo venda_empresa_created_idx
+    cursor_ordering = ("-created_at", "-id")
+
+    # Vendas por transação na sincronização em lote (POST /vendas/lote/)
+    TAMANHO_BLOCO_LOTE = 50
+
     def get_serializer_class(self):
         if self.action == "create":
             return VendaCreateSerializer
@@ -810,24 +884,127 @@ class VendaViewSet(viewsets.ModelViewSet):
         """Cria nova venda - Rate limited: 30 vendas por minuto por usuário"""
         create_serializer = self.get_serializer(data=request.data)
         create_serializer.is_valid(raise_exception=True)
-        venda = create_serializer.save()
+        venda = create_serializer.save(empresa_id=EmpresaService.id_efetivo(request))
 
         # Invalida caches relacionados
-        self._invalidate_vendas_cache()
+        self._invalidate_vendas_cache(venda)
 
+        # Carrega itens e produtos em 2 queries para a resposta (evita N+1)
+        prefetch_related_objects([venda], "itens__produto")
         read_serializer = VendaSerializer(venda)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
 
-    def _invalidate_vendas_cache(self):
-        """Invalida todos os caches relacionados a vendas"""
-        hoje = timezone.now().date()
-        cache_keys = [
-            f"dashboard_{hoje.isoformat()}",
-            "produtos_mais_lucrativos",
-            "clientes_com_dividas",
-            "produtos_baixo_estoque",
-        ]
-        cache.delete_many(cache_keys)
+    @action(detail=False, methods=["post"], url_path="lote")
+    @method_decorator(ratelimit(key="user", rate="10/m", method="POST", block=True))
+    def lote(self, request):
+        """
+        Sincroniza vendas offline em lote - Rate limited: 10 lotes por minuto.
+
+        Cada venda traz uma chave_idempotencia gerada pelo terminal; reenvios
+        são reconhecidos pelo índice único e devolvidos como DUPLICADA.
+        Processa em blocos de TAMANHO_BLOCO_LOTE vendas, uma transação por
+        bloco e um savepoint por venda, carregando produtos e chaves
+        existentes uma única vez por bloco.
+        """
+        lote_serializer = VendaLoteSerializer(data=request.data)
+        lote_serializer.is_valid(raise_exception=True)
+        vendas = lote_serializer.validated_data["vendas"]
+        empresa_id = EmpresaService.id_efetivo(request)
+
+        resultados = []
+        for inicio in range(0, len(vendas), self.TAMANHO_BLOCO_LOTE):
+            resultados.extend(
+                self._processar_bloco_lote(
+                    vendas[inicio:inicio + self.TAMANHO_BLOCO_LOTE], empresa_id
+                )
+            )
+
+        resumo = {"CRIADA": 0, "DUPLICADA": 0, "ERRO": 0}
+        for resultado in resultados:
+            resumo[resultado["status"]] += 1
+
+        if resumo["CRIADA"]:
+            self._invalidate_vendas_cache()
+
+        logger.info(
+            f"Sincronização em lote por {request.user.username}: "
+            f"{resumo['CRIADA']} criadas, {resumo['DUPLICADA']} duplicadas, {resumo['ERRO']} com erro"
+        )
+
+        return Response(
+            {
+                "criadas": resumo["CRIADA"],
+                "duplicadas": resumo["DUPLICADA"],
+                "erros": resumo["ERRO"],
+                "resultados": resultados,
+            }
+        )
+
+    def _processar_bloco_lote(self, bloco, empresa_id=None):
+        """Processa um bloco de vendas do lote em uma única transação"""
+        from .services.venda_service import VendaService
+
+        existentes = VendaService.vendas_por_chave(
+            venda["chave_idempotencia"] for venda in bloco
+        )
+
+        produto_ids = set()
+        for venda in bloco:
+            for item in venda.get("itens") or []:
+                try:
+                    produto_ids.add(int(item["produto_id"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+        produtos = VendaService.carregar_produtos(produto_ids)
+
+        resultados = []
+        with transaction.atomic():
+            for dados in bloco:
+                chave = dados["chave_idempotencia"]
+                if chave in existentes:
+                    resultados.append(
+                        {"chave_idempotencia": chave, "status": "DUPLICADA", **existentes[chave]}
+                    )
+                    continue
+
+                create_serializer = VendaCreateSerializer(
+                    data=dados, context={"produtos": produtos}
+                )
+                if not create_serializer.is_valid():
+                    resultados.append(
+                        {"chave_idempotencia": chave, "status": "ERRO", "erros": create_serializer.errors}
+                    )
+                    continue
+
+                try:
+                    with transaction.atomic():
+                        venda = create_serializer.save(empresa_id=empresa_id)
+                        VendaIdempotencia.objects.create(chave=chave, venda=venda)
+                except ValidationError as e:
+                    resultados.append(
+                        {"chave_idempotencia": chave, "status": "ERRO", "erros": e.detail}
+                    )
+                    continue
+                except IntegrityError:
+                    # Outro terminal/requisição gravou a mesma chave em paralelo
+                    existentes.update(VendaService.vendas_por_chave([chave]))
+                    resultados.append(
+                        {"chave_idempotencia": chave, "status": "DUPLICADA", **existentes.get(chave, {})}
+                    )
+                    continue
+
+                existentes[chave] = {"venda_id": venda.id, "numero": venda.numero}
+                resultados.append(
+                    {"chave_idempotencia": chave, "status": "CRIADA", **existentes[chave]}
+                )
+
+        return resultados
+
+    def _invalidate_vendas_cache(self, venda=None):
+        """Invalida os caches que dependem de vendas, estoque e saldos de clientes"""
+        CacheService.invalidar(
+            "vendas", "estoque", "clientes", empresa_id=getattr(venda, "empresa_id", None)
+        )
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -851,184 +1028,19 @@ class VendaViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-    # ========== MÉTODOS PRIVADOS DO DASHBOARD ==========
-
-    def _calcular_vendas_hoje(self, hoje):
-        """Calcula total e quantidade de vendas do dia"""
-        vendas = Venda.objects.filter(
-            created_at__date=hoje, status="FINALIZADA"
-        ).aggregate(total=Sum("total"), quantidade=Count("id"))
-        return {
-            "total": float(vendas["total"] or 0),
-            "quantidade": vendas["quantidade"],
-        }
-
-    def _calcular_lucro_hoje(self, hoje):
-        """Calcula lucro do dia baseado em itens vendidos"""
-        from core.models import ItemVenda
-        from django.db.models import F
-
-        lucro = ItemVenda.objects.filter(
-            venda__created_at__date=hoje,
-            venda__status="FINALIZADA",
-            produto__preco_custo__gt=0,
-        ).aggregate(
-            lucro=Sum(
-                F("quantidade") * (F("preco_unitario") - F("produto__preco_custo"))
-            )
-        )[
-            "lucro"
-        ] or Decimal(
-            "0"
-        )
-
-        return float(lucro)
-
-    def _calcular_vendas_por_pagamento(self, hoje):
-        """Retorna vendas agrupadas por forma de pagamento"""
-        vendas = (
-            Venda.objects.filter(created_at__date=hoje, status="FINALIZADA")
-            .values("forma_pagamento")
-            .annotate(total=Sum("total"), quantidade=Count("id"))
-        )
-        return list(vendas)
-
-    def _calcular_estoque(self):
-        """Retorna contadores de produtos por status de estoque"""
-        return {"baixo": Produto.objects.filter(estoque__lt=10, ativo=True).count()}
-
-    def _calcular_produtos_validade(self, hoje):
-        """Retorna contadores de LOTES vencidos e vencendo"""
-        data_limite = hoje + timedelta(days=7)
-
-        # Conta lotes distintos (evita contar o mesmo produto múltiplas vezes)
-        lotes_vencidos = (
-            Lote.objects.filter(
-                data_validade__lt=hoje, ativo=True, data_validade__isnull=False
-            )
-            .values("produto")
-            .distinct()
-            .count()
-        )
-
-        lotes_vencendo = (
-            Lote.objects.filter(
-                data_validade__gte=hoje,
-                data_validade__lte=data_limite,
-                ativo=True,
-                data_validade__isnull=False,
-            )
-            .values("produto")
-            .distinct()
-            .count()
-        )
-
-        return {"vencidos": lotes_vencidos, "vencendo": lotes_vencendo}
-
-    def _calcular_contas_receber(self, hoje):
-        """Calcula informações de contas a receber"""
-        contas_pendentes = Venda.objects.filter(
-            status="FINALIZADA", status_pagamento="PENDENTE"
-        )
-
-        contas_vencidas = contas_pendentes.filter(data_vencimento__lt=hoje)
-        contas_vencendo_hoje = contas_pendentes.filter(data_vencimento=hoje)
-
-        return {
-            "total": float(
-                contas_pendentes.aggregate(total=Sum("total"))["total"] or Decimal("0")
-            ),
-            "quantidade": contas_pendentes.count(),
-            "vencidas": {
-                "total": float(
-                    contas_vencidas.aggregate(total=Sum("total"))["total"]
-                    or Decimal("0")
-                ),
-                "quantidade": contas_vencidas.count(),
-            },
-            "vencendo_hoje": {"quantidade": contas_vencendo_hoje.count()},
-        }
-
-    def _calcular_info_caixa(self):
-        """Retorna informações do caixa aberto (se houver)"""
-        caixa_aberto = Caixa.objects.filter(status="ABERTO").first()
-        if not caixa_aberto:
-            return None
-
-        # Calcula vendas em dinheiro desde abertura
-        vendas_dinheiro = Venda.objects.filter(
-            created_at__gte=caixa_aberto.data_abertura,
-            forma_pagamento="DINHEIRO",
-            status="FINALIZADA",
-        ).aggregate(total=Sum("total"))["total"] or Decimal("0")
-
-        # Movimentações
-        movimentacoes = caixa_aberto.movimentacoes.aggregate(
-            sangrias=Sum("valor", filter=Q(tipo="SANGRIA")),
-            suprimentos=Sum("valor", filter=Q(tipo="SUPRIMENTO")),
-        )
-        total_sangrias = movimentacoes["sangrias"] or Decimal("0")
-        total_suprimentos = movimentacoes["suprimentos"] or Decimal("0")
-
-        valor_atual = (
-            caixa_aberto.valor_inicial
-            + vendas_dinheiro
-            + total_suprimentos
-            - total_sangrias
-        )
-
-        return {
-            "id": caixa_aberto.id,
-            "aberto_desde": caixa_aberto.data_abertura,
-            "valor_inicial": float(caixa_aberto.valor_inicial),
-            "valor_atual": float(valor_atual),
-            "vendas_dinheiro": float(vendas_dinheiro),
-        }
-
     # ========== ENDPOINT DASHBOARD ==========
 
     @action(detail=False, methods=["get"])
     def dashboard(self, request):
-        """Retorna estatísticas para o dashboard - Cache 2 minutos"""
-        hoje = timezone.now().date()
-
-        # Cache key única por dia
-        cache_key = f"dashboard_{hoje.isoformat()}"
-        cached_data = cache.get(cache_key)
-
-        if cached_data:
-            return Response(cached_data)
-
-        # Usa transaction.atomic() para manter conexão aberta e melhorar performance
-        with transaction.atomic():
-            # Calcula todas as métricas usando métodos privados
-            estoque = self._calcular_estoque()
-            validade = self._calcular_produtos_validade(hoje)
-
-            dashboard_data = {
-                "vendas_hoje": self._calcular_vendas_hoje(hoje),
-                "lucro_hoje": self._calcular_lucro_hoje(hoje),
-                "estoque_baixo": estoque["baixo"],
-                "produtos_vencidos": validade["vencidos"],
-                "produtos_vencendo": validade["vencendo"],
-                "vendas_por_pagamento": self._calcular_vendas_por_pagamento(hoje),
-                "contas_receber": self._calcular_contas_receber(hoje),
-                "caixa": self._calcular_info_caixa(),
-                "data": hoje.isoformat(),
-                "cached": False,
-            }
-
-        # Salva no cache por 2 minutos (120 segundos)
-        cache.set(cache_key, dashboard_data, 120)
-
-        return Response(dashboard_data)
+        """Retorna estatísticas para o dashboard - Cache 2 minutos por empresa"""
+        return Response(
+            PainelService.dashboard(EmpresaService.id_da_requisicao(request))
+        )
 
     @action(detail=True, methods=["post"])
     @transaction.atomic
     def cancelar(self, request, pk=None):
         """Cancela uma venda e devolve estoque atomicamente"""
-        from .services.lote_service import LoteService
-
         venda = self.get_object()
 
         if venda.status == "CANCELADA":
@@ -1037,8 +1049,14 @@ class VendaViewSet(viewsets.ModelViewSet):
             )
 
         if venda.status == "FINALIZADA":
+            itens = list(venda.itens.select_related("produto"))
+
+            # Retira a venda do resumo diário do dia em que foi feita
+            ResumoDiarioService.estornar_venda(venda, itens)
+
             # Devolve o estoque respeitando o sistema de lotes
-            for item in venda.itens.select_related("produto"):
+            devolucoes_diretas = {}
+            for item in itens:
                 produto = item.produto
                 quantidade = item.quantidade
 
@@ -1052,12 +1070,14 @@ class VendaViewSet(viewsets.ModelViewSet):
                     )
                 else:
                     # Produto sem lotes: devolve diretamente
-                    produto.estoque += quantidade
-                    produto.save(update_fields=["estoque", "updated_at"])
+                    devolucoes_diretas[produto.id] = (
+                        devolucoes_diretas.get(produto.id, Decimal("0")) + quantidade
+                    )
                     logger.info(
                         f"Venda {venda.numero} cancelada: {quantidade} un de "
                         f"{produto.nome} devolvida ao estoque direto"
                     )
+            EstoqueService.repor(devolucoes_diretas, empresa_id=venda.empresa_id)
 
         venda.status = "CANCELADA"
         venda.save()
@@ -1069,7 +1089,7 @@ class VendaViewSet(viewsets.ModelViewSet):
         )
 
         # Invalida caches
-        self._invalidate_vendas_cache()
+        self._invalidate_vendas_cache(venda)
 
         serializer = VendaSerializer(venda)
         return Response(serializer.data)
@@ -1107,7 +1127,7 @@ class VendaViewSet(viewsets.ModelViewSet):
             )
 
             # Invalida caches
-            self._invalidate_vendas_cache()
+            self._invalidate_vendas_cache(venda)
 
             serializer = VendaSerializer(venda)
             return Response(serializer.data)
@@ -1124,8 +1144,10 @@ class CaixaViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"])
     def status(self, request):
-        """Retorna o caixa aberto atual ou informa que não há caixa aberto"""
-        caixa_aberto = Caixa.objects.filter(status="ABERTO").first()
+        """Retorna o caixa aberto da empresa ou informa que não há caixa aberto"""
+        caixa_aberto = Caixa.objects.filter(
+            status="ABERTO", empresa_id=EmpresaService.id_efetivo(request)
+        ).first()
         if not caixa_aberto:
             return Response({"status": "FECHADO", "message": "Nenhum caixa aberto"})
 
@@ -1134,8 +1156,9 @@ class CaixaViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["post"])
     def abrir(self, request):
-        """Abre um novo caixa com validação de entrada"""
-        if Caixa.objects.filter(status="ABERTO").exists():
+        """Abre um novo caixa da empresa com validação de entrada"""
+        empresa_id = EmpresaService.id_efetivo(request)
+        if Caixa.objects.filter(status="ABERTO", empresa_id=empresa_id).exists():
             return Response(
                 {"error": "Já existe um caixa aberto"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -1154,7 +1177,7 @@ class CaixaViewSet(viewsets.ViewSet):
                 {"error": "Valor inicial inválido"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        caixa = Caixa.objects.create(valor_inicial=valor_inicial)
+        caixa = Caixa.objects.create(valor_inicial=valor_inicial, empresa_id=empresa_id)
 
         # Log de auditoria
         logger.info(
@@ -1176,60 +1199,21 @@ class CaixaViewSet(viewsets.ViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Calcula vendas por forma de pagamento (mesmo cálculo do fechamento)
-        vendas_periodo = Venda.objects.filter(
-            created_at__gte=caixa.data_abertura, status="FINALIZADA"
-        )
-
-        total_dinheiro = vendas_periodo.filter(forma_pagamento="DINHEIRO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_debito = vendas_periodo.filter(forma_pagamento="DEBITO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_credito = vendas_periodo.filter(forma_pagamento="CREDITO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_pix = vendas_periodo.filter(forma_pagamento="PIX").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_fiado = vendas_periodo.filter(forma_pagamento="FIADO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_vendas = (
-            total_dinheiro + total_debito + total_credito + total_pix + total_fiado
-        )
-
-        # Movimentações
-        movimentacoes = caixa.movimentacoes.aggregate(
-            sangrias=Sum("valor", filter=Q(tipo="SANGRIA")),
-            suprimentos=Sum("valor", filter=Q(tipo="SUPRIMENTO")),
-        )
-        total_sangrias = movimentacoes["sangrias"] or Decimal(0)
-        total_suprimentos = movimentacoes["suprimentos"] or Decimal(0)
-
-        # Valor esperado em caixa (físico)
-        valor_esperado = (
-            caixa.valor_inicial + total_dinheiro + total_suprimentos - total_sangrias
-        )
+        # Contadores mantidos a cada venda/movimentação: leitura O(1)
+        valor_esperado = CaixaService.valor_esperado(caixa)
 
         return Response({
             "caixa_id": caixa.id,
             "data_abertura": caixa.data_abertura,
             "valor_inicial": caixa.valor_inicial,
-            "total_dinheiro": total_dinheiro,
-            "total_debito": total_debito,
-            "total_credito": total_credito,
-            "total_pix": total_pix,
-            "total_fiado": total_fiado,
-            "total_vendas": total_vendas,
-            "total_sangrias": total_sangrias,
-            "total_suprimentos": total_suprimentos,
+            "total_dinheiro": caixa.total_dinheiro,
+            "total_debito": caixa.total_debito,
+            "total_credito": caixa.total_credito,
+            "total_pix": caixa.total_pix,
+            "total_fiado": caixa.total_fiado,
+            "total_vendas": caixa.total_vendas,
+            "total_sangrias": caixa.total_sangrias,
+            "total_suprimentos": caixa.total_suprimentos,
             "valor_esperado_caixa": valor_esperado,
         })
 
@@ -1262,53 +1246,16 @@ class CaixaViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Calcula vendas por forma de pagamento desde a abertura
-        vendas_periodo = Venda.objects.filter(
-            created_at__gte=caixa.data_abertura, status="FINALIZADA"
-        )
-
-        # Totaliza por cada forma de pagamento
-        total_dinheiro = vendas_periodo.filter(forma_pagamento="DINHEIRO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_debito = vendas_periodo.filter(forma_pagamento="DEBITO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_credito = vendas_periodo.filter(forma_pagamento="CREDITO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_pix = vendas_periodo.filter(forma_pagamento="PIX").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        total_fiado = vendas_periodo.filter(forma_pagamento="FIADO").aggregate(
-            total=Sum("total")
-        )["total"] or Decimal(0)
-
-        # Total geral de vendas (todas as formas)
-        total_vendas = (
-            total_dinheiro + total_debito + total_credito + total_pix + total_fiado
-        )
-
-        # Calcula movimentações de caixa (sangria/suprimento)
-        movimentacoes = caixa.movimentacoes.aggregate(
-            sangrias=Sum("valor", filter=Q(tipo="SANGRIA")),
-            suprimentos=Sum("valor", filter=Q(tipo="SUPRIMENTO")),
-        )
-        total_sangrias = movimentacoes["sangrias"] or Decimal(0)
-        total_suprimentos = movimentacoes["suprimentos"] or Decimal(0)
+        # Confere os contadores contra o agregado das vendas e movimentações
+        # (corrige a instância se houver divergência)
+        CaixaService.conferir(caixa)
 
         # Valor final do sistema considera:
         # - Valor inicial
         # + Vendas em DINHEIRO (outras formas não entram no caixa físico)
         # + Suprimentos
         # - Sangrias
-        valor_final_sistema = (
-            caixa.valor_inicial + total_dinheiro + total_suprimentos - total_sangrias
-        )
+        valor_final_sistema = CaixaService.valor_esperado(caixa)
 
         # Atualiza o caixa com todos os totais
         caixa.data_fechamento = timezone.now()
@@ -1317,15 +1264,6 @@ class CaixaViewSet(viewsets.ViewSet):
         caixa.diferenca = valor_final_informado - valor_final_sistema
         caixa.status = "FECHADO"
         caixa.observacoes = request.data.get("observacoes", "")
-
-        # Salva detalhamento por forma de pagamento
-        caixa.total_dinheiro = total_dinheiro
-        caixa.total_debito = total_debito
-        caixa.total_credito = total_credito
-        caixa.total_pix = total_pix
-        caixa.total_fiado = total_fiado
-        caixa.total_vendas = total_vendas
-
         caixa.save()
 
         # Log de auditoria
@@ -1339,6 +1277,7 @@ class CaixaViewSet(viewsets.ViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=["post"])
+    @transaction.atomic
     def movimentar(self, request, pk=None):
         """Adiciona uma movimentação (sangria/suprimento) ao caixa"""
         try:
@@ -1488,6 +1427,65 @@ class CaixaViewSet(viewsets.ViewSet):
         )
 
 
+class SincronizacaoViewSet(viewsets.ViewSet):
+    """
+    Sincronização incremental do catálogo para o cache offline do PDV.
+
+    GET /sync/<modelo>/?since=<token> devolve os registros (da empresa do
+    cabeçalho X-Empresa-Id / ?empresa_id=, quando informada) alterados desde
+    o token, os IDs desativados/excluídos e um novo token.
+    Sem ?since= devolve o catálogo ativo completo.
+    """
+
+    SERIALIZERS = {
+        "produto": (ProdutoSyncSerializer, ["categoria", "fornecedor"]),
+        "cliente": (ClienteSyncSerializer, []),
+        "categoria": (CategoriaSyncSerializer, []),
+        "fornecedor": (FornecedorSyncSerializer, []),
+    }
+
+    def _delta(self, request, modelo):
+        try:
+            delta = SincronizacaoService.delta(
+                modelo,
+                since=request.query_params.get("since"),
+                empresa_id=EmpresaService.id_da_requisicao(request),
+            )
+        except TokenSincronizacaoInvalido as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer_class, relacionados = self.SERIALIZERS[modelo]
+        alterados = delta["alterados"].select_related(*relacionados).order_by("id")
+        return Response(
+            {
+                "token": delta["token"],
+                "completo": delta["completo"],
+                "alterados": serializer_class(alterados, many=True).data,
+                "removidos": delta["removidos"],
+            }
+        )
+
+    @action(detail=False, methods=["get"])
+    def produtos(self, request):
+        """Delta de produtos"""
+        return self._delta(request, "produto")
+
+    @action(detail=False, methods=["get"])
+    def clientes(self, request):
+        """Delta de clientes"""
+        return self._delta(request, "cliente")
+
+    @action(detail=False, methods=["get"])
+    def categorias(self, request):
+        """Delta de categorias"""
+        return self._delta(request, "categoria")
+
+    @action(detail=False, methods=["get"])
+    def fornecedores(self, request):
+        """Delta de fornecedores"""
+        return self._delta(request, "fornecedor")
+
+
 # ========== AUTENTICAÇÃO ==========
 
 
@@ -1515,7 +1513,7 @@ def login(request):
     # Cria ou recupera o token
     token, created = Token.objects.get_or_create(user=user)
 
-    empresa = Empresa.objects.order_by("created_at").first()
+    empresa = request.empresa
     empresa_data = EmpresaSerializer(empresa).data if empresa else None
 
     return Response(
@@ -1632,6 +1630,8 @@ class AlertaViewSet(viewsets.ModelViewSet):
         "cliente", "produto", "venda", "caixa", "lote"
     ).all()
     serializer_class = AlertaSerializer
+    # Paginação keyset opcional (?paginacao=cursor) pelo alerta_empresa_idx
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         """Filtra alertas por parâmetros de query"""
@@ -1660,8 +1660,8 @@ class AlertaViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def resumo(self, request):
-        """Retorna resumo de alertas"""
-        resumo = AlertService.obter_resumo()
+        """Retorna resumo de alertas (em cache até a próxima escrita de alertas)"""
+        resumo = AlertService.obter_resumo(EmpresaService.id_da_requisicao(request))
         return Response(resumo)
 
     @action(detail=False, methods=["post"])
@@ -1671,7 +1671,7 @@ class AlertaViewSet(viewsets.ModelViewSet):
         return Response(
             {
                 "total_criados": resultado["total_criados"],
-                "resumo": AlertService.obter_resumo(),
+                "resumo": AlertService.obter_resumo(EmpresaService.id_da_requisicao(request)),
             }
         )
 
@@ -1697,26 +1697,32 @@ class AlertaViewSet(viewsets.ModelViewSet):
         alertas = Alerta.objects.filter(lido=False, resolvido=False)
         count = alertas.count()
         alertas.update(lido=True)
+        CacheService.invalidar("alertas")
         return Response(
             {"message": f"{count} alerta(s) marcado(s) como lido(s)", "count": count}
         )
 
     @action(detail=False, methods=["get"])
     def por_prioridade(self, request):
-        """Retorna alertas agrupados por prioridade"""
-        alertas = Alerta.objects.filter(resolvido=False)
+        """
+        Retorna alertas agrupados por prioridade, paginados em cada grupo
+        (?limite=20&pagina=1; os totais de cada grupo vêm do resumo)
+        """
+        try:
+            limite = int(request.query_params.get("limite", AlertService.LIMITE_POR_PRIORIDADE))
+            pagina = int(request.query_params.get("pagina", 1))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Parâmetros 'limite' e 'pagina' devem ser inteiros"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
+        grupos = AlertService.listar_por_prioridade(
+            limite, pagina, EmpresaService.id_da_requisicao(request)
+        )
         resultado = {
-            "CRITICA": AlertaSerializer(
-                alertas.filter(prioridade="CRITICA"), many=True
-            ).data,
-            "ALTA": AlertaSerializer(alertas.filter(prioridade="ALTA"), many=True).data,
-            "MEDIA": AlertaSerializer(
-                alertas.filter(prioridade="MEDIA"), many=True
-            ).data,
-            "BAIXA": AlertaSerializer(
-                alertas.filter(prioridade="BAIXA"), many=True
-            ).data,
+            prioridade: AlertaSerializer(alertas, many=True).data
+            for prioridade, alertas in grupos.items()
         }
 
         return Response(resultado)
@@ -1727,6 +1733,8 @@ class LoteViewSet(viewsets.ModelViewSet):
 
     queryset = Lote.objects.all()
     serializer_class = LoteSerializer
+    # Paginação keyset opcional (?paginacao=cursor) pelo lote_empresa_created_idx
+    cursor_ordering = ("-created_at", "-id")
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -1832,8 +1840,7 @@ class LoteViewSet(viewsets.ModelViewSet):
             )
 
             # Atualiza o estoque total do produto
-            produto.estoque += quantidade
-            produto.save(update_fields=["estoque"])
+            EstoqueService.repor({produto.id: quantidade})
 
             logger.info(
                 f"Entrada de estoque: Lote {lote.id} criado para produto {produto.nome} (+{quantidade} un)"
@@ -1868,27 +1875,30 @@ class LoteViewSet(viewsets.ModelViewSet):
             )
 
         with transaction.atomic():
-            # Baixa do lote
-            lote._skip_signal_update = True
-            try:
-                lote.quantidade -= quantidade
-                lote.save(update_fields=["quantidade"])
-            finally:
-                if hasattr(lote, "_skip_signal_update"):
-                    delattr(lote, "_skip_signal_update")
+            # Baixa do lote com UPDATE condicional (quantidade >= n)
+            baixados = Lote.objects.filter(
+                pk=lote.pk, quantidade__gte=quantidade
+            ).update(quantidade=F("quantidade") - quantidade, updated_at=timezone.now())
+            if not baixados:
+                lote.refresh_from_db(fields=["quantidade"])
+                return Response(
+                    {
+                        "error": f"Quantidade insuficiente no lote. Disponível: {lote.quantidade}"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-            # Desativa se zerou
-            if lote.quantidade == 0:
-                lote.ativo = False
-                lote.save(update_fields=["ativo"])
+            # Desativa se zerou (update() não dispara signals: recalcula a flag)
+            if Lote.objects.filter(pk=lote.pk, quantidade=0).update(ativo=False):
+                LoteService.atualizar_usa_lotes([lote.produto_id])
 
             # Atualiza estoque do produto
-            produto = lote.produto
-            produto.estoque -= quantidade
-            produto.save(update_fields=["estoque"])
+            EstoqueService.ajustar({lote.produto_id: -quantidade})
 
             logger.info(f"Baixa de estoque: Lote {lote.id} -{quantidade} un")
 
+        lote.refresh_from_db()
+
         serializer = self.get_serializer(lote)
         return Response(serializer.data)
 
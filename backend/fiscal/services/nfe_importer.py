@@ -698,8 +698,10 @@ class NFeEntradaImporter:
         Sistema Híbrido: calcula validade baseado na categoria ou deixa None
         """
         from core.models import Lote
+        from core.services.estoque_service import EstoqueService
         from datetime import date, timedelta
 
+        entradas = []
         for item in itens:
             produto = item.produto
             quantidade = item.quantidade
@@ -747,15 +749,17 @@ class NFeEntradaImporter:
                 observacao=f"Entrada NF-e {nota.chave_acesso} - Lote #{lote.id}",
             )
 
-            # Atualiza estoque total do produto
-            produto.estoque = (produto.estoque or Decimal("0")) + quantidade
-            produto.save(update_fields=["estoque", "updated_at"])
+            # Acumula a entrada para atualizar o estoque total de uma vez
+            entradas.append((produto.id, quantidade))
 
             logger.info(
                 f"NF-e {nota.numero}: Lote #{lote.id} criado para {produto.nome} "
                 f"({quantidade} un, validade: {'ESTIMADA' if validade_estimada else 'NÃO DEFINIDA'})"
             )
 
+        # Atualiza estoque total dos produtos com um único UPDATE (F())
+        EstoqueService.repor(entradas, empresa_id=self.empresa.id)
+
     def _armazenar_xml(
         self,
         nota: NotaFiscal,
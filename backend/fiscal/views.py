@@ -11,6 +11,7 @@ from fiscal.models import Empresa, NotaFiscal
 from fiscal.serializers import EmpresaSerializer, NotaFiscalSerializer
 from fiscal.services.nfe_importer import ImportNFeError, NFeEntradaImporter
 from core.models import Lote
+from core.services.empresa_service import EmpresaService
 
 logger = logging.getLogger(__name__)
 
@@ -64,15 +65,12 @@ class ImportarNFeEntradaView(APIView):
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def _obter_empresa(self, request) -> Empresa:
-        empresa_id = (
-            request.headers.get("X-Empresa-Id")
-            or request.query_params.get("empresa_id")
-            or request.data.get("empresa_id")
-        )
-        if empresa_id:
-            return Empresa.objects.get(id=empresa_id)
+        # empresa_id no formulário vale quando não veio no cabeçalho/query
+        empresa_id = request.data.get("empresa_id")
+        if empresa_id and EmpresaService.id_da_requisicao(request) is None:
+            return EmpresaService.obter(empresa_id)
 
-        empresa = Empresa.objects.first()
+        empresa = request.empresa
         if not empresa:
             raise Empresa.DoesNotExist
         return empresa
@@ -90,16 +88,9 @@ class NotaFiscalViewSet(viewsets.ReadOnlyModelViewSet):
         queryset = super().get_queryset()
 
         # Filtra por empresa
-        empresa_id = (
-            self.request.headers.get("X-Empresa-Id")
-            or self.request.query_params.get("empresa_id")
-        )
-        if empresa_id:
-            queryset = queryset.filter(empresa_id=empresa_id)
-        else:
-            empresa = Empresa.objects.first()
-            if empresa:
-                queryset = queryset.filter(empresa=empresa)
+        empresa = self.request.empresa
+        if empresa:
+            queryset = queryset.filter(empresa_id=empresa.pk)
 
         # Filtra por tipo (NFE ou NFCE)
         tipo = self.request.query_params.get("tipo")
@@ -185,10 +176,7 @@ class EmpresaViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        empresa_id = (
-            self.request.headers.get("X-Empresa-Id")
-            or self.request.query_params.get("empresa_id")
-        )
+        empresa_id = EmpresaService.id_da_requisicao(self.request)
         if empresa_id:
             queryset = queryset.filter(id=empresa_id)
         return queryset
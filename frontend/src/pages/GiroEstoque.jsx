@@ -1,29 +1,44 @@
 import { useState, useEffect, useCallback } from 'react';
-import { getProdutos, getVendas } from '../services/api';
+import { getGiroEstoque } from '../services/api';
 import { Card, Grid, Title, Stack, Text, Badge, Table, ScrollArea, Group, Select, Paper, Center } from '@mantine/core';
 import { notifications } from '@mantine/notifications';
 import { FaBox, FaExclamationTriangle, FaClock, FaTimes, FaFire } from 'react-icons/fa';
 
+const CORES_CLASSIFICACAO = {
+  'NUNCA VENDIDO': 'gray',
+  'PARADO': 'red',
+  'SEM VENDAS': 'orange',
+  'GIRO LENTO': 'yellow',
+  'GIRO MÉDIO': 'blue',
+  'GIRO RÁPIDO': 'green',
+};
+
 function GiroEstoque() {
-  const [produtos, setProdutos] = useState([]);
-  const [vendas, setVendas] = useState([]);
   const [loading, setLoading] = useState(true);
   const [periodo, setPeriodo] = useState('30'); // Dias para análise
   const [analise, setAnalise] = useState([]);
 
+  // O cálculo é feito no servidor (/produtos/giro/) sobre todas as vendas do período
   const loadData = useCallback(async () => {
     setLoading(true);
     try {
-      const [produtosRes, vendasRes] = await Promise.all([
-        getProdutos(),
-        getVendas()
-      ]);
-
-      const produtosData = produtosRes.data.results || produtosRes.data;
-      const vendasData = vendasRes.data.results || vendasRes.data;
+      const response = await getGiroEstoque({ dias: periodo });
 
-      setProdutos(produtosData);
-      setVendas(vendasData);
+      setAnalise(response.data.produtos.map(produto => ({
+        id: produto.id,
+        nome: produto.nome,
+        estoque: produto.estoque,
+        preco: produto.preco,
+        valorEstoque: produto.valor_estoque,
+        ultimaVenda: produto.ultima_venda,
+        diasSemVender: produto.dias_sem_vender,
+        totalVendido: produto.vendido,
+        velocidade: produto.velocidade,
+        tempoEstoque: produto.dias_cobertura,
+        classificacao: produto.classificacao,
+        corClassificacao: CORES_CLASSIFICACAO[produto.classificacao] || 'gray',
+        categoria: produto.categoria,
+      })));
     } catch (error) {
       console.error('Erro ao carregar dados:', error);
       notifications.show({
@@ -35,108 +50,12 @@ function GiroEstoque() {
     } finally {
       setLoading(false);
     }
-  }, []);
-
-  const calcularGiro = useCallback(() => {
-    const diasAnalise = parseInt(periodo);
-    const dataLimite = new Date();
-    dataLimite.setDate(dataLimite.getDate() - diasAnalise);
-
-    const analiseData = produtos.map(produto => {
-      // Filtra vendas do produto no período
-      const vendasProduto = vendas.filter(venda => {
-        const vendaDate = new Date(venda.created_at);
-        return vendaDate >= dataLimite && venda.itens?.some(item =>
-          item.produto?.id === produto.id || item.produto_id === produto.id
-        );
-      });
-
-      // Encontra última venda (independente do período)
-      const todasVendasProduto = vendas.filter(venda =>
-        venda.itens?.some(item =>
-          item.produto?.id === produto.id || item.produto_id === produto.id
-        )
-      );
-
-      let ultimaVendaData = null;
-      let diasSemVender = null;
-
-      if (todasVendasProduto.length > 0) {
-        const datasVendas = todasVendasProduto.map(v => new Date(v.created_at));
-        ultimaVendaData = new Date(Math.max(...datasVendas));
-        diasSemVender = Math.floor((new Date() - ultimaVendaData) / (1000 * 60 * 60 * 24));
-      }
-
-      // Calcula total vendido no período
-      const totalVendido = vendasProduto.reduce((total, venda) => {
-        const item = venda.itens?.find(i =>
-          i.produto?.id === produto.id || i.produto_id === produto.id
-        );
-        return total + (item?.quantidade || 0);
-      }, 0);
-
-      // Velocidade de venda (unidades por dia)
-      const velocidade = totalVendido / diasAnalise;
-
-      // Tempo estimado para acabar estoque (em dias)
-      const tempoEstoque = velocidade > 0 ? (produto.estoque / velocidade) : null;
-
-      // Classificação
-      let classificacao = 'PARADO';
-      let corClassificacao = 'red';
-
-      if (diasSemVender === null) {
-        classificacao = 'NUNCA VENDIDO';
-        corClassificacao = 'gray';
-      } else if (diasSemVender > 60) {
-        classificacao = 'PARADO';
-        corClassificacao = 'red';
-      } else if (velocidade === 0) {
-        classificacao = 'SEM VENDAS';
-        corClassificacao = 'orange';
-      } else if (velocidade < 0.5) {
-        classificacao = 'GIRO LENTO';
-        corClassificacao = 'yellow';
-      } else if (velocidade < 2) {
-        classificacao = 'GIRO MÉDIO';
-        corClassificacao = 'blue';
-      } else {
-        classificacao = 'GIRO RÁPIDO';
-        corClassificacao = 'green';
-      }
-
-      return {
-        id: produto.id,
-        nome: produto.nome,
-        estoque: produto.estoque,
-        preco: produto.preco,
-        ultimaVenda: ultimaVendaData,
-        diasSemVender,
-        totalVendido,
-        velocidade,
-        tempoEstoque,
-        classificacao,
-        corClassificacao,
-        categoria: produto.categoria_nome || 'Sem categoria'
-      };
-    });
-
-    // Ordena por velocidade (maior primeiro)
-    analiseData.sort((a, b) => b.velocidade - a.velocidade);
-
-    setAnalise(analiseData);
-  }, [periodo, produtos, vendas]);
+  }, [periodo]);
 
   useEffect(() => {
     loadData();
   }, [loadData]);
 
-  useEffect(() => {
-    if (produtos.length > 0 && vendas.length > 0) {
-      calcularGiro();
-    }
-  }, [produtos.length, vendas.length, calcularGiro]);
-
   const formatDate = (date) => {
     if (!date) return 'Nunca';
     return new Date(date).toLocaleDateString('pt-BR');
@@ -148,7 +67,7 @@ function GiroEstoque() {
   const produtosGiroRapido = analise.filter(a => a.classificacao === 'GIRO RÁPIDO').length;
   const valorEstoqueParado = analise
     .filter(a => a.classificacao === 'PARADO' || a.classificacao === 'NUNCA VENDIDO' || a.diasSemVender > 60)
-    .reduce((sum, a) => sum + (a.estoque * parseFloat(a.preco)), 0);
+    .reduce((sum, a) => sum + a.valorEstoque, 0);
 
   const rows = analise.map((item) => (
     <Table.Tr key={item.id}>
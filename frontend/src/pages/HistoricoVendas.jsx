@@ -8,6 +8,8 @@ import Comprovante from '../components/Comprovante';
 
 function HistoricoVendas() {
   const [vendas, setVendas] = useState([]);
+  const [proximoCursor, setProximoCursor] = useState(null);
+  const [carregandoMais, setCarregandoMais] = useState(false);
   const [vendaDetalhe, setVendaDetalhe] = useState(null);
   const [comprovanteAberto, setComprovanteAberto] = useState(false);
 
@@ -21,11 +23,17 @@ function HistoricoVendas() {
     loadVendas();
   }, []);
 
-  const loadVendas = async () => {
+  // Paginação por cursor: cada página custa o mesmo, mesmo no fim do histórico
+  const loadVendas = async (cursor = null) => {
     try {
-      const response = await getVendas();
+      const params = { paginacao: 'cursor' };
+      if (cursor) params.cursor = cursor;
+      const response = await getVendas(params);
       const vendasData = response.data.results || response.data;
-      setVendas(vendasData);
+      setVendas((anteriores) => (cursor ? [...anteriores, ...vendasData] : vendasData));
+      setProximoCursor(
+        response.data.next ? new URL(response.data.next).searchParams.get('cursor') : null
+      );
     } catch (error) {
       console.error('Erro ao carregar vendas:', error);
       notifications.show({
@@ -37,6 +45,12 @@ function HistoricoVendas() {
     }
   };
 
+  const carregarMais = async () => {
+    setCarregandoMais(true);
+    await loadVendas(proximoCursor);
+    setCarregandoMais(false);
+  };
+
   const aplicarFiltros = () => {
     loadVendas();
   };
@@ -324,6 +338,14 @@ function HistoricoVendas() {
         </Stack>
       </div>
 
+      {proximoCursor && (
+        <Group justify="center" mt="md">
+          <Button variant="light" onClick={carregarMais} loading={carregandoMais}>
+            Carregar mais vendas
+          </Button>
+        </Group>
+      )}
+
       {/* Modal do Comprovante */}
       <Modal
         opened={comprovanteAberto}
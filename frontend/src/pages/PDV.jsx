@@ -1,8 +1,9 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getProdutos, createVenda, getClientes, getCaixaStatus } from '../services/api';
+import { createVenda, getCaixaStatus, getProdutoPorCodigo } from '../services/api';
 import { localDB } from '../utils/db';
 import { syncManager } from '../utils/syncManager';
+import { sincronizarCatalogo } from '../utils/catalogoSync';
 import { AppShell, Card, TextInput, Stack, Paper, Group, Text, NumberInput, ActionIcon, Select, Button, Title, Center, Modal, ScrollArea, Divider, Badge, Alert, Loader, SimpleGrid } from '@mantine/core';
 import { DatePickerInput } from '@mantine/dates';
 import { useHotkeys, useMediaQuery } from '@mantine/hooks';
@@ -95,16 +96,14 @@ function PDV() {
     if (cachedProdutos.length > 0) setProdutos(cachedProdutos);
     if (cachedClientes.length > 0) setClientes(cachedClientes);
 
-    // Sincroniza com servidor em background
+    // Sincroniza com servidor em background (apenas o que mudou desde a última vez)
     try {
       const [produtosData, clientesData] = await Promise.all([
-        getProdutos({ ativo: true }).then(res => res.data.results || res.data),
-        getClientes({ ativo: true }).then(res => res.data.results || res.data)
+        sincronizarCatalogo('produtos'),
+        sincronizarCatalogo('clientes')
       ]);
       setProdutos(produtosData);
       setClientes(clientesData);
-      await localDB.cacheProdutos(produtosData);
-      await localDB.cacheClientes(clientesData);
     } catch (error) {
       // Mantém dados do cache se servidor falhar
       console.warn('Servidor offline, usando cache local');
@@ -224,9 +223,17 @@ function PDV() {
     setScannerAberto(true);
   };
 
-  const handleBarcodeScanned = (codigoBarras) => {
-    // Busca produto pelo código de barras
-    const produto = produtos.find(p => p.codigo_barras === codigoBarras);
+  const handleBarcodeScanned = async (codigoBarras) => {
+    // Busca exata no servidor (índice de códigos de barras); offline, usa o catálogo local
+    let produto = null;
+    try {
+      const response = await getProdutoPorCodigo(codigoBarras);
+      produto = response.data;
+    } catch (error) {
+      if (error.response?.status !== 404) {
+        produto = produtos.find(p => p.codigo_barras === codigoBarras) || null;
+      }
+    }
 
     if (produto) {
       adicionarAoCarrinho(produto);
@@ -748,6 +755,15 @@ function PDV() {
             leftSection={<FaSearch />}
             value={busca}
             onChange={(e) => setBusca(e.target.value)}
+            onKeyDown={(e) => {
+              // Leitores USB digitam o código e enviam Enter
+              const codigo = busca.trim();
+              if (e.key === 'Enter' && /^\d{8,14}$/.test(codigo)) {
+                e.preventDefault();
+                setBusca('');
+                handleBarcodeScanned(codigo);
+              }
+            }}
             size="md"
             autoFocus={!isMobile}
             style={{ flex: 1 }}
@@ -57,6 +57,23 @@ export const createProduto = (data) => api.post('/produtos/', data);
 export const updateProduto = (id, data) => api.put(`/produtos/${id}/`, data);
 export const deleteProduto = (id) => api.delete(`/produtos/${id}/`);
 export const getProdutosMaisLucrativos = () => api.get('/produtos/mais_lucrativos/');
+// Sincronização incremental do catálogo (modelo: produtos, clientes, categorias, fornecedores)
+export const syncCatalogo = (modelo, since = null) =>
+  api.get(`/sync/${modelo}/`, { params: since ? { since } : {} });
+export const getCatalogoSnapshot = () => api.get('/produtos/snapshot/');
+export const getProdutoPorCodigo = (codigo) =>
+  api.get(`/produtos/por-codigo/${encodeURIComponent(codigo)}/`);
+export const getGiroEstoque = (params = {}) => api.get('/produtos/giro/', { params });
+export const reprecificarProdutos = (data) => api.post('/produtos/reprecificar/', data);
+export const importarProdutos = (file, dryRun = false) => {
+  const formData = new FormData();
+  formData.append('arquivo', file);
+  formData.append('dry_run', dryRun ? 'true' : 'false');
+
+  return api.post('/produtos/importar/', formData, {
+    headers: { 'Content-Type': 'multipart/form-data' },
+  });
+};
 export const excluirTodosProdutos = () => api.post('/produtos/excluir-todos/', { confirmar: true }); // Excluir todos os produtos
 export const searchOpenFoodProducts = (params = {}) =>
   api.get('/produtos/buscar-openfood/', { params });
@@ -90,6 +107,7 @@ export const deleteInventarioItem = (sessaoId, itemId) => api.delete(`/estoque/i
 export const getVendas = (params = {}) => api.get('/vendas/', { params });
 export const getVenda = (id) => api.get(`/vendas/${id}/`);
 export const createVenda = (data) => api.post('/vendas/', data);
+export const createVendasLote = (vendas) => api.post('/vendas/lote/', { vendas });
 export const cancelarVenda = (id) => api.post(`/vendas/${id}/cancelar/`);
 
 // Contas a Receber
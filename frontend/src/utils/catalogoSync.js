@@ -0,0 +1,41 @@
+import { localDB } from './db'
+import { getCatalogoSnapshot, syncCatalogo } from '../services/api'
+
+// Endpoint de sincronização -> store do cache local e leitura do cache
+const STORES = {
+  produtos: { store: 'produtos_cache', ler: () => localDB.getCachedProdutos() },
+  clientes: { store: 'clientes_cache', ler: () => localDB.getCachedClientes() },
+  categorias: { store: 'categorias_cache', ler: () => localDB.getCachedCategorias() },
+  fornecedores: { store: 'fornecedores_cache', ler: () => localDB.getCachedFornecedores() },
+}
+
+// Converte o snapshot colunar ({ campos, colunas }) em registros do catálogo
+// ativo, no mesmo formato de uma carga completa da sincronização
+const snapshotParaCarga = ({ token, campos, colunas }) => {
+  const alterados = []
+  const total = colunas[0]?.length || 0
+  for (let linha = 0; linha < total; linha += 1) {
+    const registro = {}
+    campos.forEach((campo, indice) => {
+      registro[campo] = colunas[indice][linha]
+    })
+    if (registro.ativo) alterados.push(registro)
+  }
+  return { token, completo: true, alterados, removidos: [] }
+}
+
+// Atualiza o cache local com o delta desde o último token e retorna o cache
+// atualizado. Sem token (primeiro acesso) o servidor devolve o catálogo completo;
+// para produtos, a carga inicial usa o snapshot colunar compactado.
+export const sincronizarCatalogo = async (modelo) => {
+  const { store, ler } = STORES[modelo]
+  const token = await localDB.getSyncToken(store)
+
+  const carga = !token && modelo === 'produtos'
+    ? snapshotParaCarga((await getCatalogoSnapshot()).data)
+    : (await syncCatalogo(modelo, token)).data
+  await localDB.aplicarDeltaCache(store, carga)
+  await localDB.setSyncToken(store, carga.token)
+
+  return ler()
+}
@@ -1,6 +1,14 @@
 // IndexedDB para armazenamento local offline
 const DB_NAME = 'HMConvenienciaDB'
-const DB_VERSION = 4 // Incrementado para adicionar inventario_cache e itens_pendentes
+const DB_VERSION = 5 // Incrementado para adicionar sync_tokens (sincronização incremental)
+
+// Gera chave única por venda offline (usada como chave de idempotência)
+export const gerarChaveIdempotencia = () => {
+  if (typeof crypto !== 'undefined' && crypto.randomUUID) {
+    return crypto.randomUUID()
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`
+}
 
 class LocalDB {
   constructor() {
@@ -81,6 +89,11 @@ class LocalDB {
           itensStore.createIndex('timestamp', 'timestamp', { unique: false })
           itensStore.createIndex('synced', 'synced', { unique: false })
         }
+
+        // Store para tokens da sincronização incremental do catálogo
+        if (!db.objectStoreNames.contains('sync_tokens')) {
+          db.createObjectStore('sync_tokens', { keyPath: 'store' })
+        }
       }
     })
   }
@@ -95,6 +108,8 @@ class LocalDB {
 
       const venda = {
         ...vendaData,
+        // Chave de idempotência: o backend ignora reenvios da mesma venda
+        chave_idempotencia: vendaData.chave_idempotencia || gerarChaveIdempotencia(),
         timestamp: new Date().toISOString(),
         synced: false
       }
@@ -153,6 +168,21 @@ class LocalDB {
     })
   }
 
+  // Atualizar venda pendente (ex.: gravar chave de idempotência)
+  async updateVendaPendente(venda) {
+    if (!this.db) await this.init()
+
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction(['vendas_pendentes'], 'readwrite')
+      const store = transaction.objectStore('vendas_pendentes')
+
+      const request = store.put(venda)
+
+      request.onsuccess = () => resolve(true)
+      request.onerror = () => reject(request.error)
+    })
+  }
+
   // Deletar venda sincronizada
   async deleteVendaSynced(id) {
     if (!this.db) await this.init()
@@ -173,11 +203,12 @@ class LocalDB {
     if (!this.db) await this.init()
 
     return new Promise((resolve, reject) => {
-      const transaction = this.db.transaction(['produtos_cache'], 'readwrite')
+      const transaction = this.db.transaction(['produtos_cache', 'sync_tokens'], 'readwrite')
       const store = transaction.objectStore('produtos_cache')
 
-      // Limpa cache antigo
+      // Limpa cache antigo (e o token: a próxima sincronização volta a ser completa)
       store.clear()
+      transaction.objectStore('sync_tokens').delete('produtos_cache')
 
       // Adiciona novos produtos
       produtos.forEach((produto) => {
@@ -212,11 +243,12 @@ class LocalDB {
     if (!this.db) await this.init()
 
     return new Promise((resolve, reject) => {
-      const transaction = this.db.transaction(['clientes_cache'], 'readwrite')
+      const transaction = this.db.transaction(['clientes_cache', 'sync_tokens'], 'readwrite')
       const store = transaction.objectStore('clientes_cache')
 
-      // Limpa cache antigo
+      // Limpa cache antigo (e o token: a próxima sincronização volta a ser completa)
       store.clear()
+      transaction.objectStore('sync_tokens').delete('clientes_cache')
 
       // Adiciona novos clientes
       clientes.forEach((cliente) => {
@@ -271,11 +303,12 @@ class LocalDB {
     if (!this.db) await this.init()
 
     return new Promise((resolve, reject) => {
-      const transaction = this.db.transaction(['categorias_cache'], 'readwrite')
+      const transaction = this.db.transaction(['categorias_cache', 'sync_tokens'], 'readwrite')
       const store = transaction.objectStore('categorias_cache')
 
-      // Limpa cache antigo
+      // Limpa cache antigo (e o token: a próxima sincronização volta a ser completa)
       store.clear()
+      transaction.objectStore('sync_tokens').delete('categorias_cache')
 
       // Adiciona novas categorias
       categorias.forEach((categoria) => {
@@ -310,11 +343,12 @@ class LocalDB {
     if (!this.db) await this.init()
 
     return new Promise((resolve, reject) => {
-      const transaction = this.db.transaction(['fornecedores_cache'], 'readwrite')
+      const transaction = this.db.transaction(['fornecedores_cache', 'sync_tokens'], 'readwrite')
       const store = transaction.objectStore('fornecedores_cache')
 
-      // Limpa cache antigo
+      // Limpa cache antigo (e o token: a próxima sincronização volta a ser completa)
       store.clear()
+      transaction.objectStore('sync_tokens').delete('fornecedores_cache')
 
       // Adiciona novos fornecedores
       fornecedores.forEach((fornecedor) => {
@@ -344,6 +378,53 @@ class LocalDB {
     })
   }
 
+  // ========== SINCRONIZAÇÃO INCREMENTAL ==========
+
+  // Aplica um delta do servidor: remove os IDs excluídos/desativados e
+  // grava os registros alterados (completo = substitui o cache inteiro)
+  async aplicarDeltaCache(storeName, { alterados, removidos, completo }) {
+    if (!this.db) await this.init()
+
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction([storeName], 'readwrite')
+      const store = transaction.objectStore(storeName)
+      const timestamp = new Date().toISOString()
+
+      if (completo) store.clear()
+      removidos.forEach((id) => store.delete(id))
+      alterados.forEach((registro) => store.put({ ...registro, timestamp }))
+
+      transaction.oncomplete = () => resolve(true)
+      transaction.onerror = () => reject(transaction.error)
+    })
+  }
+
+  // Buscar o token da última sincronização de um store
+  async getSyncToken(storeName) {
+    if (!this.db) await this.init()
+
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction(['sync_tokens'], 'readonly')
+      const request = transaction.objectStore('sync_tokens').get(storeName)
+
+      request.onsuccess = () => resolve(request.result ? request.result.token : null)
+      request.onerror = () => reject(request.error)
+    })
+  }
+
+  // Salvar o token devolvido pelo servidor
+  async setSyncToken(storeName, token) {
+    if (!this.db) await this.init()
+
+    return new Promise((resolve, reject) => {
+      const transaction = this.db.transaction(['sync_tokens'], 'readwrite')
+      transaction.objectStore('sync_tokens').put({ store: storeName, token })
+
+      transaction.oncomplete = () => resolve(true)
+      transaction.onerror = () => reject(transaction.error)
+    })
+  }
+
   // ========== INVENTÁRIO ==========
 
   // Cachear inventários
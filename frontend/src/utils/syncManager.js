@@ -1,7 +1,10 @@
-import { localDB } from './db'
-import { createVenda } from '../services/api'
+import { localDB, gerarChaveIdempotencia } from './db'
+import { createVendasLote } from '../services/api'
 import { notificationManager } from './notifications'
 
+// Vendas por requisição em POST /vendas/lote/ (backend aceita até 500)
+const TAMANHO_LOTE = 100
+
 // Helper para logging condicional (apenas em desenvolvimento)
 const isDev = import.meta.env.DEV
 const log = (...args) => isDev && console.log(...args)
@@ -83,36 +86,66 @@ class SyncManager {
       let syncedCount = 0
       let failedCount = 0
 
+      // Garante chave de idempotência persistida antes do envio,
+      // para que um reenvio após falha de rede não duplique a venda
       for (const venda of vendasPendentes) {
+        if (!venda.chave_idempotencia) {
+          venda.chave_idempotencia = gerarChaveIdempotencia()
+          await localDB.updateVendaPendente(venda)
+        }
+      }
+
+      for (let inicio = 0; inicio < vendasPendentes.length; inicio += TAMANHO_LOTE) {
+        const lote = vendasPendentes.slice(inicio, inicio + TAMANHO_LOTE)
+        const porChave = new Map(lote.map((venda) => [venda.chave_idempotencia, venda]))
+
+        let resultados
         try {
           // Remove campos internos antes de enviar
-          const { id, timestamp, synced, syncedAt, ...vendaData } = venda
+          const payload = lote.map(({ id, timestamp, synced, syncedAt, syncError, ...vendaData }) => vendaData)
+
+          // Envia o lote inteiro para o backend
+          const response = await createVendasLote(payload)
+          resultados = response.data.resultados
+        } catch (error) {
+          failedCount += lote.length
+          console.error('[SyncManager] Erro ao sincronizar lote de vendas:', error)
+          // Sem resposta (rede): tenta de novo na próxima rodada com as mesmas chaves
+          if (!error.response) break
+          continue
+        }
 
-          // Envia para o backend
-          await createVenda(vendaData)
+        for (const resultado of resultados) {
+          const venda = porChave.get(resultado.chave_idempotencia)
+          if (!venda) continue
+
+          if (resultado.status === 'ERRO') {
+            failedCount++
+            console.error(`[SyncManager] Erro ao sincronizar venda ${venda.id}:`, resultado.erros)
+
+            // Erro de validação: marca como erro permanente
+            await localDB.updateVendaPendente({
+              ...venda,
+              syncError: resultado.erros,
+              synced: true,
+              syncedAt: new Date().toISOString()
+            })
+            continue
+          }
 
-          // Marca como sincronizada
-          await localDB.deleteVendaSynced(id)
+          // CRIADA ou DUPLICADA (já estava no servidor): remove da fila local
+          await localDB.deleteVendaSynced(venda.id)
 
           syncedCount++
-          log(`[SyncManager] Venda ${id} sincronizada com sucesso`)
+          log(`[SyncManager] Venda ${venda.id} sincronizada (${resultado.status})`)
 
           // Notifica listeners
           this.notifyListeners({
             type: 'VENDA_SYNCED',
-            vendaId: id,
+            vendaId: venda.id,
             syncedCount,
             totalPendentes: vendasPendentes.length
           })
-        } catch (error) {
-          failedCount++
-          console.error(`[SyncManager] Erro ao sincronizar venda ${venda.id}:`, error)
-
-          // Se erro de validação, marca como erro permanente
-          if (error.response && error.response.status === 400) {
-            venda.syncError = error.response.data
-            await localDB.markVendaSynced(venda.id)
-          }
         }
       }
 